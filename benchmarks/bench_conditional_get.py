@@ -0,0 +1,113 @@
+"""Бенчмарк условного GET на страницах постов.
+
+Сравнивает повторный визит без валидатора (полный ответ 200) и с
+If-None-Match (ответ 304 без построения страницы)::
+
+    python benchmarks/bench_conditional_get.py [--repeat 200]
+"""
+import argparse
+
+from utils import (
+    benchmark_environment,
+    measure,
+    print_table,
+    setup_django,
+    summary,
+)
+
+POSTS_COUNT = 50
+COMMENTS_COUNT = 20
+
+
+def create_dataset():
+    from posts.models import Comment, Group, Post, User
+
+    author = User.objects.create_user(username='bench_author')
+    reader = User.objects.create_user(username='bench_reader')
+    group = Group.objects.create(
+        title='Bench group',
+        slug='bench_group',
+        description='Benchmark group',
+    )
+    posts = [
+        Post.objects.create(
+            text=f'Benchmark post #{i}',
+            author=author,
+            group=group,
+        )
+        for i in range(POSTS_COUNT)
+    ]
+    for i in range(COMMENTS_COUNT):
+        Comment.objects.create(
+            text=f'Benchmark comment #{i}',
+            author=reader,
+            post=posts[-1],
+        )
+    return reader, author, group, posts[-1]
+
+
+def run(repeat):
+    from django.test import Client
+    from django.urls import reverse
+
+    reader, author, group, post = create_dataset()
+    addresses = {
+        'index': reverse('posts:index'),
+        'group_list': reverse(
+            'posts:group_list',
+            kwargs={'slug': group.slug},
+        ),
+        'profile': reverse(
+            'posts:profile',
+            kwargs={'username': author.username},
+        ),
+        'post_detail': reverse(
+            'posts:post_detail',
+            kwargs={'post_id': post.id},
+        ),
+    }
+    clients = {'anon': Client()}
+    clients['auth'] = Client()
+    clients['auth'].force_login(reader)
+
+    rows = []
+    for viewer, client in clients.items():
+        for name, address in addresses.items():
+            first = client.get(address)
+            etag = first['ETag']
+
+            full = summary(measure(lambda: client.get(address), repeat))
+            conditional = summary(measure(
+                lambda: client.get(address, HTTP_IF_NONE_MATCH=etag),
+                repeat,
+            ))
+            not_modified = client.get(address, HTTP_IF_NONE_MATCH=etag)
+            assert not_modified.status_code == 304, address
+
+            rows.append([
+                viewer,
+                name,
+                f'{full["mean"]:.2f}',
+                f'{conditional["mean"]:.2f}',
+                f'{full["mean"] / conditional["mean"]:.1f}x',
+                len(first.content),
+            ])
+
+    print_table(
+        ['viewer', 'page', '200, ms', '304, ms', 'speedup', 'bytes saved'],
+        rows,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_environment():
+        run(args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+"""Бенчмарк потребления памяти потоковой выгрузкой постов.
+
+Для нескольких размеров таблицы постов сравнивает пик RSS выгрузки
+export_yatube (values_list().iterator()) с загрузкой той же выборки в
+память списком. База данных лежит во временном файле, а каждый замер
+выполняется в отдельном процессе, чтобы страницы SQLite в памяти и
+пик RSS одного замера не влияли на другой::
+
+    python benchmarks/bench_export.py [--rows 10000 100000 1000000]
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from utils import print_table, setup_django
+
+INSERT_BATCH_SIZE = 10000
+COMMENTS_PER_POST = 0.5
+
+
+def use_database(db_path):
+    from django.db import connection
+
+    connection.close()
+    connection.settings_dict['NAME'] = db_path
+
+
+def create_database(db_path):
+    from django.core.management import call_command
+
+    use_database(db_path)
+    call_command('migrate', verbosity=0)
+
+    from posts.models import User
+    User.objects.create_user(username='bench_author')
+
+
+def grow_dataset(db_path, start, stop):
+    """Добавляет посты с номерами от start до stop и комментарии к ним."""
+    from django.db import connection, transaction
+    from django.utils import timezone
+
+    from posts.models import User
+
+    use_database(db_path)
+    author_id = User.objects.get(username='bench_author').pk
+    now = timezone.now()
+    with transaction.atomic(), connection.cursor() as cursor:
+        for offset in range(start, stop, INSERT_BATCH_SIZE):
+            numbers = range(offset, min(offset + INSERT_BATCH_SIZE, stop))
+            cursor.executemany(
+                'INSERT INTO posts_post '
+                '(id, text, pub_date, author_id, image, image_variants) '
+                'VALUES (%s, %s, %s, %s, %s, %s)',
+                [
+                    (
+                        number + 1,
+                        f'Benchmark post #{number} ' * 5,
+                        now,
+                        author_id,
+                        f'posts/{number}.jpg' if number % 3 == 0 else '',
+                        '',
+                    )
+                    for number in numbers
+                ],
+            )
+            cursor.executemany(
+                'INSERT INTO posts_comment '
+                '(text, created, post_id, author_id) '
+                'VALUES (%s, %s, %s, %s)',
+                [
+                    (f'Comment #{number}', now, number + 1, author_id)
+                    for number in numbers
+                    if number % int(1 / COMMENTS_PER_POST) == 0
+                ],
+            )
+
+
+def peak_rss():
+    """Возвращает пик RSS процесса в мегабайтах (только Linux)."""
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError('В /proc/self/status нет VmHWM')
+
+
+def stream_export(db_path):
+    from django.core.management import call_command
+
+    use_database(db_path)
+    call_command('export_yatube', 'post', with_comments=True,
+                 output=os.devnull)
+
+
+def list_export(db_path):
+    from posts.exporter import EXPORT_FIELDS, render_jsonl
+    from posts.models import Post
+
+    use_database(db_path)
+    fields = EXPORT_FIELDS['post']
+    records = [
+        dict(zip(fields, row))
+        for row in Post.objects.order_by('pk').values_list(*fields.values())
+    ]
+    for record in records:
+        record['pub_date'] = record['pub_date'].isoformat()
+    with open(os.devnull, 'w') as target:
+        target.writelines(render_jsonl(records))
+
+
+def measure_peak(scenario, db_path, queue):
+    setup_django()
+    # Подключение и первые запросы не относятся к выгрузке
+    use_database(db_path)
+    from posts.models import Post
+    Post.objects.exists()
+    before = peak_rss()
+    started = time.perf_counter()
+    scenario(db_path)
+    elapsed = time.perf_counter() - started
+    queue.put((peak_rss() - before, elapsed))
+
+
+def run_in_process(context, scenario, db_path):
+    queue = context.Queue()
+    process = context.Process(
+        target=measure_peak,
+        args=(scenario, db_path, queue),
+    )
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def run(sizes, list_max_rows):
+    tmp_dir = tempfile.mkdtemp()
+    db_path = os.path.join(tmp_dir, 'bench.sqlite3')
+    try:
+        create_database(db_path)
+        context = multiprocessing.get_context('spawn')
+        rows = []
+        created = 0
+        for size in sorted(sizes):
+            grow_dataset(db_path, created, size)
+            created = size
+
+            stream_peak, stream_time = run_in_process(
+                context,
+                stream_export,
+                db_path,
+            )
+            list_peak = '-'
+            if size <= list_max_rows:
+                peak, _ = run_in_process(context, list_export, db_path)
+                list_peak = f'{peak:.1f}'
+            rows.append([
+                size,
+                f'{stream_peak:.1f}',
+                list_peak,
+                f'{size / stream_time:.0f}',
+            ])
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print_table(
+        ['posts', 'stream peak RSS, MB', 'list peak RSS, MB',
+         'stream rows/s'],
+        rows,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--rows',
+        type=int,
+        nargs='+',
+        default=[10_000, 100_000, 1_000_000],
+    )
+    parser.add_argument(
+        '--list-max-rows',
+        type=int,
+        default=100_000,
+        help='Наибольший размер, для которого замеряется загрузка списком.',
+    )
+    args = parser.parse_args()
+
+    setup_django()
+    run(args.rows, args.list_max_rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Бенчмарк пикового потребления памяти при загрузке картинки.
+
+Сравнивает полное декодирование картинки Pillow с проверкой той же
+картинки в PostForm (чтение заголовка и уменьшение через draft/reduce).
+Каждый замер выполняется в отдельном процессе, чтобы пик RSS одного
+замера не влиял на другой. Картинки больше допустимого разрешения
+PostForm отклоняет по заголовку, не декодируя::
+
+    python benchmarks/bench_image_upload.py [--megapixels 50]
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from utils import print_table, setup_django
+
+
+def create_images(tmp_dir, megapixels):
+    from PIL import Image
+
+    width = int((megapixels * 1_000_000 * 3 / 2) ** 0.5)
+    height = width * 2 // 3
+    image = Image.linear_gradient('L').resize((width, height)).convert('RGB')
+    images = {}
+    for image_format in ('JPEG', 'PNG'):
+        path = os.path.join(tmp_dir, f'upload.{image_format.lower()}')
+        image.save(path, image_format)
+        images[image_format] = path
+    return images, (width, height)
+
+
+def full_decode(path):
+    from PIL import Image
+
+    with open(path, 'rb') as image_file:
+        Image.open(image_file).load()
+    return 'decoded'
+
+
+def post_form(path):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+
+    from posts.forms import PostForm
+
+    with open(path, 'rb') as image_file:
+        upload = SimpleUploadedFile(os.path.basename(path), image_file.read())
+    form = PostForm(data={'text': 'Benchmark'}, files={'image': upload})
+    return 'accepted' if form.is_valid() else 'rejected'
+
+
+def peak_rss():
+    """Возвращает пик RSS процесса в мегабайтах (только Linux).
+
+    ru_maxrss не подходит: он наследуется через exec от родителя,
+    который сам создавал большие картинки.
+    """
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError('В /proc/self/status нет VmHWM')
+
+
+def measure_peak(scenario, path, queue):
+    setup_django()
+    before = peak_rss()
+    started = time.perf_counter()
+    result = scenario(path)
+    elapsed = time.perf_counter() - started
+    queue.put((peak_rss() - before, elapsed * 1000, result))
+
+
+def run(megapixels):
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        images, size = create_images(tmp_dir, megapixels)
+        context = multiprocessing.get_context('spawn')
+        rows = []
+        for image_format, path in images.items():
+            for name, scenario in (
+                ('full decode', full_decode),
+                ('PostForm', post_form),
+            ):
+                queue = context.Queue()
+                process = context.Process(
+                    target=measure_peak,
+                    args=(scenario, path, queue),
+                )
+                process.start()
+                peak, elapsed, result = queue.get()
+                process.join()
+                rows.append([
+                    image_format,
+                    name,
+                    result,
+                    f'{peak:.1f}',
+                    f'{elapsed:.0f}',
+                ])
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print(f'Картинка {size[0]}x{size[1]}')
+    print_table(
+        ['format', 'scenario', 'result', 'peak RSS, MB', 'time, ms'],
+        rows,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--megapixels', type=int, default=50)
+    args = parser.parse_args()
+    run(args.megapixels)
+
+
+if __name__ == '__main__':
+    main()
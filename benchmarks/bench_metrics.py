@@ -0,0 +1,134 @@
+"""Бенчмарк накладных расходов MetricsMiddleware.
+
+Сравнивает время ответа страниц с метриками запросов и без них. Замеры
+с метриками и без чередуются по раундам, чтобы прогрев и фоновая
+нагрузка одинаково влияли на обе стороны::
+
+    python benchmarks/bench_metrics.py [--repeat 200] [--rounds 5]
+"""
+import argparse
+
+from utils import (
+    benchmark_environment,
+    measure,
+    print_table,
+    setup_django,
+    summary,
+)
+
+POSTS_COUNT = 50
+COMMENTS_COUNT = 20
+METRICS_MIDDLEWARE = 'core.middleware.MetricsMiddleware'
+
+
+def create_dataset():
+    from posts.models import Comment, Group, Post, User
+
+    author = User.objects.create_user(username='bench_author')
+    reader = User.objects.create_user(username='bench_reader')
+    group = Group.objects.create(
+        title='Bench group',
+        slug='bench_group',
+        description='Benchmark group',
+    )
+    posts = [
+        Post.objects.create(
+            text=f'Benchmark post #{i}',
+            author=author,
+            group=group,
+        )
+        for i in range(POSTS_COUNT)
+    ]
+    for i in range(COMMENTS_COUNT):
+        Comment.objects.create(
+            text=f'Benchmark comment #{i}',
+            author=reader,
+            post=posts[-1],
+        )
+    return reader, author, group, posts[-1]
+
+
+def make_client(reader, with_metrics):
+    """Возвращает клиент со своей цепочкой промежуточных слоёв.
+
+    Цепочка собирается при первом запросе клиента, поэтому он должен
+    выполниться внутри override_settings.
+    """
+    from django.conf import settings
+    from django.test import Client
+    from django.test.utils import override_settings
+
+    middleware = [
+        name for name in settings.MIDDLEWARE
+        if with_metrics or name != METRICS_MIDDLEWARE
+    ]
+    client = Client()
+    client.force_login(reader)
+    with override_settings(MIDDLEWARE=middleware):
+        client.get('/')
+    return client
+
+
+def run(repeat, rounds):
+    from django.urls import reverse
+
+    reader, author, group, post = create_dataset()
+    addresses = {
+        'index': reverse('posts:index'),
+        'group_list': reverse(
+            'posts:group_list',
+            kwargs={'slug': group.slug},
+        ),
+        'profile': reverse(
+            'posts:profile',
+            kwargs={'username': author.username},
+        ),
+        'post_detail': reverse(
+            'posts:post_detail',
+            kwargs={'post_id': post.id},
+        ),
+        'follow_index': reverse('posts:follow_index'),
+    }
+    clients = {
+        with_metrics: make_client(reader, with_metrics)
+        for with_metrics in (False, True)
+    }
+
+    rows = []
+    for name, address in addresses.items():
+        timings = {False: [], True: []}
+        for _ in range(rounds):
+            for with_metrics, client in clients.items():
+                timings[with_metrics] += measure(
+                    lambda: client.get(address),
+                    repeat // rounds,
+                )
+        plain = summary(timings[False])
+        metered = summary(timings[True])
+        rows.append([
+            name,
+            f'{plain["p50"]:.3f}',
+            f'{metered["p50"]:.3f}',
+            f'{metered["p50"] - plain["p50"]:.3f}',
+            f'{(metered["p50"] / plain["p50"] - 1) * 100:+.1f}%',
+        ])
+
+    print_table(
+        ['page', 'p50 without, ms', 'p50 with, ms', 'delta, ms', 'overhead'],
+        rows,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_environment():
+        run(args.repeat, args.rounds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""Бенчмарк полнотекстового поиска по постам.
+
+Сравнивает первую страницу результатов поиска по индексу FTS5 с
+поиском через LIKE '%слово%', которым раньше пользовалась
+административная панель. Тексты постов собираются из словаря с
+распределением Ципфа, поэтому в запросах есть и частые, и редкие
+слова::
+
+    python benchmarks/bench_search.py [--posts 1000000] [--repeat 20]
+"""
+import argparse
+import itertools
+import random
+import time
+
+from utils import (
+    benchmark_environment,
+    measure,
+    print_table,
+    setup_django,
+    summary,
+)
+
+VOCABULARY_SIZE = 20000
+WORDS_PER_POST = 30
+INSERT_BATCH_SIZE = 10000
+SEED = 2026
+
+
+def make_vocabulary():
+    letters = 'абвгдежзиклмнопрстуфхцчшщэюя'
+    rnd = random.Random(SEED)
+    words = set()
+    while len(words) < VOCABULARY_SIZE:
+        words.add(''.join(rnd.choices(letters, k=rnd.randint(4, 10))))
+    return sorted(words)
+
+
+def create_dataset(posts_count, vocabulary):
+    from django.db import connection, transaction
+    from django.utils import timezone
+
+    from posts.models import User
+
+    author = User.objects.create_user(username='bench_author')
+    cum_weights = list(itertools.accumulate(
+        1 / rank for rank in range(1, len(vocabulary) + 1)
+    ))
+    rnd = random.Random(SEED)
+    now = timezone.now()
+    started = time.perf_counter()
+    with transaction.atomic(), connection.cursor() as cursor:
+        for offset in range(0, posts_count, INSERT_BATCH_SIZE):
+            rows = [
+                (
+                    ' '.join(rnd.choices(
+                        vocabulary,
+                        cum_weights=cum_weights,
+                        k=WORDS_PER_POST,
+                    )),
+                    now,
+                    author.pk,
+                    '',
+                    '',
+                )
+                for _ in range(min(INSERT_BATCH_SIZE, posts_count - offset))
+            ]
+            cursor.executemany(
+                'INSERT INTO posts_post '
+                '(text, pub_date, author_id, image, image_variants) '
+                'VALUES (%s, %s, %s, %s, %s)',
+                rows,
+            )
+    return time.perf_counter() - started
+
+
+def like_page(query):
+    from django.core.paginator import Paginator
+
+    from posts.constants import MAX_POSTS_ON_PAGE, SEARCH_MAX_RESULTS
+    from posts.models import Post
+
+    posts = Post.objects.select_related('author', 'group')
+    for term in query.split():
+        posts = posts.filter(text__icontains=term)
+    posts = posts.order_by('-pub_date', '-id')[:SEARCH_MAX_RESULTS]
+    page = Paginator(posts, MAX_POSTS_ON_PAGE).get_page(1)
+    return page.paginator.count, list(page)
+
+
+def fts_page(query):
+    from posts.models import Post
+    from posts.search import build_search_page
+
+    page = build_search_page(
+        Post.objects.select_related('author', 'group'),
+        query,
+        1,
+    )
+    return page.paginator.count, list(page)
+
+
+def run(posts_count, repeat):
+    vocabulary = make_vocabulary()
+    elapsed = create_dataset(posts_count, vocabulary)
+    print(f'Создано постов: {posts_count} за {elapsed:.1f} с')
+
+    queries = {
+        'частое слово': vocabulary[0],
+        'среднее слово': vocabulary[100],
+        'редкое слово': vocabulary[-1],
+        'два слова': f'{vocabulary[10]} {vocabulary[500]}',
+    }
+    rows = []
+    for name, query in queries.items():
+        found, _ = fts_page(query)
+        like_found, _ = like_page(query)
+        assert found == like_found, (found, like_found)
+
+        fts = summary(measure(lambda: fts_page(query), repeat))
+        like = summary(measure(lambda: like_page(query), repeat))
+        rows.append([
+            name,
+            found,
+            f'{like["p50"]:.2f}',
+            f'{fts["p50"]:.2f}',
+            f'{fts["p95"]:.2f}',
+            f'{like["p50"] / fts["p50"]:.1f}x',
+        ])
+
+    print_table(
+        ['query', 'found', 'LIKE p50, ms', 'FTS p50, ms', 'FTS p95, ms',
+         'speedup'],
+        rows,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_environment():
+        run(args.posts, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
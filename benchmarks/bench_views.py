@@ -0,0 +1,558 @@
+"""Сквозной бенчмарк страниц на наборах данных разного размера.
+
+Для каждого размера набор создаётся командой seed_yatube во временной
+базе в памяти, после чего каждый адрес из posts.urls, users.urls и
+about.urls запрашивается через тестовый Client от имени гостя и
+пользователей. Для каждой пары (адрес, зритель) записываются p50, p95
+и p99 времени ответа, количество SQL-запросов и пик памяти,
+выделенной за запрос (tracemalloc). С --server те же GET-запросы
+дополнительно идут через настоящий WSGI-сервер (wsgiref) по HTTP.
+
+Результаты печатаются таблицей и сохраняются в JSON, который
+benchmarks/test_regressions.py сравнивает с сохранённым эталоном::
+
+    python benchmarks/bench_views.py [--posts 1000 10000 100000]
+        [--repeat 100] [--server] [--no-cache] [--output results.json]
+
+Эталон записывается тем же скриптом для всех размеров по умолчанию::
+
+    python benchmarks/bench_views.py --output benchmarks/baseline/views.json
+
+Время ответа сравнивается с эталоном, только если он снят на той же
+машине с теми же версиями Python и SQLite. Иначе проверяются только
+количество SQL-запросов и пик памяти.
+"""
+import argparse
+import http.client
+import io
+import json
+import os
+import platform
+import sqlite3
+import threading
+import tracemalloc
+from collections import namedtuple
+from contextlib import contextmanager, nullcontext
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+from utils import (
+    benchmark_environment,
+    measure,
+    print_table,
+    setup_django,
+    summary,
+)
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_PATH = os.path.join(BENCHMARKS_DIR, 'results', 'views.json')
+BASELINE_PATH = os.path.join(BENCHMARKS_DIR, 'baseline', 'views.json')
+# Условия замера, без совпадения которых результаты несравнимы
+COMPARABLE_META = ('cache', 'repeat')
+# Окружение, без совпадения которого несравнимо только время ответа
+MACHINE_META = ('python', 'sqlite', 'host')
+URLCONFS = ('posts.urls', 'users.urls', 'about.urls')
+# Во сколько раз p95 может вырасти относительно эталона, прежде чем
+# тест сочтёт это регрессией, и сколько миллисекунд роста прощается
+# всегда: у быстрых страниц шум измерения сравним с самим временем
+LATENCY_TOLERANCE = 1.5
+LATENCY_SLACK_MS = 2.0
+# Допустимый рост пика выделенной памяти
+ALLOCATION_TOLERANCE = 1.25
+ALLOCATION_SLACK_KB = 64
+
+Scenario = namedtuple(
+    'Scenario',
+    'view viewer path method data before after',
+    defaults=('get', None, None, None),
+)
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def dataset_options(posts):
+    """Размеры набора seed_yatube для заданного количества постов."""
+    return {
+        'users': max(posts // 10, 10),
+        'groups': max(posts // 1000, 5),
+        'posts': posts,
+        'comments': posts,
+        'follows': posts,
+    }
+
+
+def url_names():
+    """Возвращает имена всех адресов приложений в виде app:name."""
+    from importlib import import_module
+
+    names = []
+    for urlconf in URLCONFS:
+        module = import_module(urlconf)
+        names += [
+            f'{module.app_name}:{pattern.name}'
+            for pattern in module.urlpatterns
+        ]
+    return names
+
+
+def pick_objects():
+    """Выбирает самые нагруженные объекты набора для запросов."""
+    from django.db.models import Count
+
+    from posts.models import Group, Post, User
+
+    reader = User.objects.order_by('-stats__following_count', 'pk').first()
+    author = User.objects.order_by('-stats__posts_count', 'pk').first()
+    return {
+        'reader': reader,
+        'author': author,
+        'stranger': User.objects.exclude(
+            following__user=reader,
+        ).exclude(pk=reader.pk).order_by('pk').first(),
+        'post': Post.objects.annotate(
+            comments_total=Count('comments'),
+        ).order_by('-comments_total', 'pk').select_related('author').first(),
+        'group': Group.objects.annotate(
+            posts_total=Count('posts'),
+        ).order_by('-posts_total', 'pk').first(),
+    }
+
+
+def build_scenarios(objects, clients):
+    """Возвращает сценарии для всех адресов приложений.
+
+    Сценарии, меняющие данные, идут последними, и изменения
+    подписок откатываются после каждого запроса.
+    """
+    from django.contrib.auth.tokens import default_token_generator
+    from django.urls import reverse
+    from django.utils.encoding import force_bytes
+    from django.utils.http import urlencode, urlsafe_base64_encode
+
+    reader, author = objects['reader'], objects['author']
+    post, group = objects['post'], objects['group']
+    stranger = {'username': objects['stranger'].username}
+    follow = reverse('posts:profile_follow', kwargs=stranger)
+    unfollow = reverse('posts:profile_unfollow', kwargs=stranger)
+    word = post.text.split()[0].rstrip('.')
+
+    public = {
+        'posts:index': reverse('posts:index'),
+        'posts:group_list': reverse(
+            'posts:group_list',
+            kwargs={'slug': group.slug},
+        ),
+        'posts:profile': reverse(
+            'posts:profile',
+            kwargs={'username': author.username},
+        ),
+        'posts:post_detail': reverse(
+            'posts:post_detail',
+            kwargs={'post_id': post.pk},
+        ),
+        'posts:search': f'{reverse("posts:search")}?{urlencode({"q": word})}',
+        'about:author': reverse('about:author'),
+        'about:tech': reverse('about:tech'),
+    }
+    scenarios = [
+        Scenario(view, viewer, path)
+        for view, path in public.items()
+        for viewer in ('anon', 'reader')
+    ]
+    scenarios += [
+        Scenario(view, 'anon', reverse(view))
+        for view in (
+            'users:signup',
+            'users:login',
+            'users:logout',
+            'users:password_reset',
+            'users:password_reset_done',
+            'users:password_reset_complete',
+        )
+    ]
+    scenarios += [
+        Scenario(
+            'posts:follow_index',
+            'reader',
+            reverse('posts:follow_index'),
+        ),
+        Scenario('posts:post_create', 'reader', reverse('posts:post_create')),
+        Scenario(
+            'posts:post_edit',
+            'post_author',
+            reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+        ),
+        Scenario('posts:export', 'author', reverse('posts:export')),
+        Scenario(
+            'users:password_change',
+            'reader',
+            reverse('users:password_change'),
+        ),
+        Scenario(
+            'users:password_change_done',
+            'reader',
+            reverse('users:password_change_done'),
+        ),
+        Scenario(
+            'users:password_reset_confirm',
+            'anon',
+            reverse('users:password_reset_confirm', kwargs={
+                'uidb64': urlsafe_base64_encode(force_bytes(reader.pk)),
+                'token': default_token_generator.make_token(reader),
+            }),
+        ),
+        Scenario(
+            'posts:profile_follow',
+            'reader',
+            follow,
+            after=lambda: clients['reader'].get(unfollow),
+        ),
+        Scenario(
+            'posts:profile_unfollow',
+            'reader',
+            unfollow,
+            before=lambda: clients['reader'].get(follow),
+        ),
+        Scenario(
+            'posts:add_comment',
+            'reader',
+            reverse('posts:add_comment', kwargs={'post_id': post.pk}),
+            method='post',
+            data={'text': 'Benchmark comment'},
+        ),
+    ]
+
+    missing = set(url_names()) - {scenario.view for scenario in scenarios}
+    if missing:
+        raise RuntimeError(f'Нет сценариев для адресов: {sorted(missing)}')
+    return scenarios
+
+
+def make_clients(objects):
+    from django.test import Client
+
+    clients = {'anon': Client()}
+    for viewer, user in (
+        ('reader', objects['reader']),
+        ('author', objects['author']),
+        ('post_author', objects['post'].author),
+    ):
+        clients[viewer] = Client()
+        clients[viewer].force_login(user)
+    return clients
+
+
+def client_request(client, scenario):
+    """Выполняет запрос сценария и дочитывает потоковый ответ."""
+    if scenario.before:
+        scenario.before()
+    response = getattr(client, scenario.method)(
+        scenario.path,
+        scenario.data or {},
+    )
+    if response.streaming:
+        b''.join(response.streaming_content)
+    if scenario.after:
+        scenario.after()
+    if response.status_code >= 500:
+        raise RuntimeError(f'{scenario.path}: {response.status_code}')
+    return response
+
+
+def count_queries(client, scenario):
+    """Возвращает количество SQL-запросов и код ответа.
+
+    CaptureQueriesContext здесь не подходит: журнал запросов
+    соединения очищается в начале каждого запроса Client.
+    """
+    from django.db import connection
+
+    from core.metrics import RequestMetrics
+
+    if scenario.before:
+        scenario.before()
+    counter = RequestMetrics()
+    with connection.execute_wrapper(counter):
+        response = getattr(client, scenario.method)(
+            scenario.path,
+            scenario.data or {},
+        )
+        if response.streaming:
+            b''.join(response.streaming_content)
+    if scenario.after:
+        scenario.after()
+    return counter.queries, response.status_code
+
+
+def peak_allocation(client, scenario):
+    """Возвращает пик памяти, выделенной за запрос, в килобайтах."""
+    if scenario.before:
+        scenario.before()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        response = getattr(client, scenario.method)(
+            scenario.path,
+            scenario.data or {},
+        )
+        if response.streaming:
+            b''.join(response.streaming_content)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    if scenario.after:
+        scenario.after()
+    return (peak - before) / 1024
+
+
+def measure_client(scenario, clients, repeat):
+    client = clients[scenario.viewer]
+    # Первый запрос прогревает кэш страниц и шаблонов
+    client_request(client, scenario)
+    timings = measure(lambda: client_request(client, scenario), repeat)
+    queries, status = count_queries(client, scenario)
+    return dict(
+        summary(timings),
+        queries=queries,
+        alloc_kb=peak_allocation(client, scenario),
+        status=status,
+    )
+
+
+def start_server():
+    from django.core.wsgi import get_wsgi_application
+
+    server = make_server(
+        '127.0.0.1',
+        0,
+        get_wsgi_application(),
+        handler_class=QuietHandler,
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def measure_server(server, scenario, clients, repeat):
+    """Замеряет GET-запрос сценария через WSGI-сервер по HTTP."""
+    cookies = '; '.join(
+        f'{name}={morsel.value}'
+        for name, morsel in clients[scenario.viewer].cookies.items()
+    )
+    host, port = server.server_address
+    status = []
+
+    def http_request():
+        if scenario.before:
+            scenario.before()
+        connection = http.client.HTTPConnection(host, port)
+        try:
+            connection.request(
+                'GET',
+                scenario.path,
+                headers={'Cookie': cookies},
+            )
+            response = connection.getresponse()
+            response.read()
+            status.append(response.status)
+        finally:
+            connection.close()
+        if scenario.after:
+            scenario.after()
+
+    http_request()
+    timings = measure(http_request, repeat)
+    return dict(summary(timings), status=status[-1])
+
+
+def run_size(posts, repeat, with_server):
+    from django.core.management import call_command
+
+    call_command('seed_yatube', stdout=io.StringIO(), **dataset_options(posts))
+    objects = pick_objects()
+    clients = make_clients(objects)
+    scenarios = build_scenarios(objects, clients)
+    server = start_server() if with_server else None
+    results = []
+    try:
+        for scenario in scenarios:
+            transports = {'client': lambda: measure_client(
+                scenario,
+                clients,
+                repeat,
+            )}
+            if server and scenario.method == 'get':
+                transports['wsgi'] = lambda: measure_server(
+                    server,
+                    scenario,
+                    clients,
+                    repeat,
+                )
+            for transport, run_transport in transports.items():
+                results.append(dict(
+                    run_transport(),
+                    size=posts,
+                    view=scenario.view,
+                    viewer=scenario.viewer,
+                    transport=transport,
+                ))
+    finally:
+        if server:
+            server.shutdown()
+            server.server_close()
+    return results
+
+
+def result_key(result):
+    return (
+        result['size'],
+        result['view'],
+        result['viewer'],
+        result['transport'],
+    )
+
+
+def compare_results(baseline, current, latency=True):
+    """Возвращает описания регрессий current относительно baseline.
+
+    Сравниваются только замеры, которые есть в обоих файлах. С
+    latency=False время ответа не сравнивается.
+    """
+    expected = {result_key(result): result for result in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        base = expected.get(result_key(result))
+        if base is None:
+            continue
+        name = '{} {} {} {}'.format(*result_key(result))
+        if latency and result['p95'] > max(
+            base['p95'] * LATENCY_TOLERANCE,
+            base['p95'] + LATENCY_SLACK_MS,
+        ):
+            regressions.append(
+                f'{name}: p95 {result["p95"]:.2f} мс, '
+                f'эталон {base["p95"]:.2f} мс'
+            )
+        if result.get('queries', 0) > base.get('queries', 0):
+            regressions.append(
+                f'{name}: {result["queries"]} SQL-запросов, '
+                f'эталон {base["queries"]}'
+            )
+        if result.get('alloc_kb', 0) > max(
+            base.get('alloc_kb', 0) * ALLOCATION_TOLERANCE,
+            base.get('alloc_kb', 0) + ALLOCATION_SLACK_KB,
+        ):
+            regressions.append(
+                f'{name}: пик памяти {result["alloc_kb"]:.0f} КБ, '
+                f'эталон {base["alloc_kb"]:.0f} КБ'
+            )
+    return regressions
+
+
+def print_results(results):
+    print_table(
+        ['posts', 'view', 'viewer', 'transport', 'p50, ms', 'p95, ms',
+         'p99, ms', 'queries', 'alloc, KB', 'status'],
+        [
+            [
+                result['size'],
+                result['view'],
+                result['viewer'],
+                result['transport'],
+                f'{result["p50"]:.2f}',
+                f'{result["p95"]:.2f}',
+                f'{result["p99"]:.2f}',
+                result.get('queries', '-'),
+                f'{result["alloc_kb"]:.0f}' if 'alloc_kb' in result else '-',
+                result['status'],
+            ]
+            for result in results
+        ],
+    )
+
+
+@contextmanager
+def disabled_cache():
+    """Отключает общий кэш и кэш страниц в памяти процесса."""
+    from django.test.utils import override_settings
+
+    from posts.cache import tiered_cache
+
+    caches = {'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    }}
+    max_entries = tiered_cache.max_entries
+    tiered_cache.max_entries = 0
+    try:
+        with override_settings(CACHES=caches):
+            yield
+    finally:
+        tiered_cache.max_entries = max_entries
+
+
+def run(sizes, repeat, with_server, no_cache):
+    results = []
+    for posts in sorted(sizes):
+        with benchmark_environment(), (
+            disabled_cache() if no_cache else nullcontext()
+        ):
+            results += run_size(posts, repeat, with_server)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        '--posts',
+        type=int,
+        nargs='+',
+        default=[1000, 10_000, 100_000],
+        help='Размеры наборов данных в постах.',
+    )
+    parser.add_argument('--repeat', type=int, default=100)
+    parser.add_argument(
+        '--server',
+        action='store_true',
+        help='Дополнительно замерять GET-запросы через WSGI-сервер.',
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Отключить кэш, чтобы каждая страница строилась заново.',
+    )
+    parser.add_argument('--output', default=RESULTS_PATH)
+    args = parser.parse_args()
+
+    setup_django()
+    import django
+
+    results = run(args.posts, args.repeat, args.server, args.no_cache)
+    print_results(results)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as output:
+        json.dump(
+            {
+                'meta': {
+                    'python': platform.python_version(),
+                    'django': django.get_version(),
+                    'sqlite': sqlite3.sqlite_version,
+                    'host': platform.node(),
+                    'repeat': args.repeat,
+                    'cache': 'dummy' if args.no_cache else 'default',
+                },
+                'results': results,
+            },
+            output,
+            ensure_ascii=False,
+            indent=1,
+        )
+    print(f'Результаты записаны в {args.output}')
+
+
+if __name__ == '__main__':
+    main()
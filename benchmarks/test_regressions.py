@@ -0,0 +1,81 @@
+"""Проверка результатов bench_views.py на регрессии.
+
+Сравнивает последние результаты бенчмарка с сохранённым эталоном и
+падает, если время ответа, количество SQL-запросов или пик памяти
+какой-либо страницы выросли сверх допусков из bench_views.py. Время
+ответа проверяется, только если эталон снят на той же машине
+(MACHINE_META). Без файла результатов проверка пропускается::
+
+    python benchmarks/bench_views.py --posts 1000 10000
+    python -m pytest benchmarks/test_regressions.py
+
+Пути к файлам можно переопределить переменными окружения
+BENCHMARK_RESULTS и BENCHMARK_BASELINE.
+"""
+import copy
+import json
+import os
+
+import pytest
+
+from bench_views import (
+    BASELINE_PATH,
+    COMPARABLE_META,
+    MACHINE_META,
+    RESULTS_PATH,
+    compare_results,
+)
+
+
+def load_results(variable, default):
+    path = os.environ.get(variable, default)
+    if not os.path.exists(path):
+        pytest.skip(f'Нет файла {path}')
+    with open(path, encoding='utf-8') as results:
+        return json.load(results)
+
+
+def test_views_have_no_regressions():
+    """Страницы не стали медленнее и тяжелее эталона."""
+    baseline = load_results('BENCHMARK_BASELINE', BASELINE_PATH)
+    current = load_results('BENCHMARK_RESULTS', RESULTS_PATH)
+    for key in COMPARABLE_META:
+        if baseline['meta'].get(key) != current['meta'].get(key):
+            pytest.skip(
+                f'Результаты сняты с {key}={current["meta"].get(key)}, '
+                f'эталон - с {key}={baseline["meta"].get(key)}'
+            )
+
+    same_machine = all(
+        baseline['meta'].get(key) == current['meta'].get(key)
+        for key in MACHINE_META
+    )
+
+    regressions = compare_results(baseline, current, latency=same_machine)
+
+    assert not regressions, 'Регрессии:\n' + '\n'.join(regressions)
+
+
+def test_compare_results_detects_regressions():
+    """Сравнение находит рост времени, запросов и памяти."""
+    baseline = {
+        'results': [{
+            'size': 1000,
+            'view': 'posts:index',
+            'viewer': 'anon',
+            'transport': 'client',
+            'p95': 10.0,
+            'queries': 2,
+            'alloc_kb': 100,
+        }],
+    }
+    current = copy.deepcopy(baseline)
+    assert compare_results(baseline, current) == []
+
+    current['results'][0].update(p95=20.0, queries=3, alloc_kb=400)
+    assert len(compare_results(baseline, current)) == 3
+
+    assert len(compare_results(baseline, current, latency=False)) == 2
+
+    current['results'][0]['size'] = 10_000
+    assert compare_results(baseline, current) == []
@@ -0,0 +1,101 @@
+"""Общие функции бенчмарков.
+
+Бенчмарки запускаются из корня репозитория, например::
+
+    python benchmarks/bench_conditional_get.py
+
+Каждый бенчмарк работает на временной базе данных в памяти и временном
+файле кэша, поэтому рабочие данные проекта не затрагиваются.
+"""
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+PROJECT_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'yatube',
+)
+
+
+def setup_django():
+    """Настраивает Django для запуска бенчмарка вне manage.py."""
+    sys.path.insert(0, PROJECT_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+    import django
+    django.setup()
+
+
+@contextmanager
+def benchmark_environment():
+    """Создаёт временные БД, кэш и каталог медиафайлов."""
+    from django.db import connection
+    from django.test.utils import (
+        override_settings,
+        setup_test_environment,
+        teardown_test_environment,
+    )
+
+    tmp_dir = tempfile.mkdtemp()
+    caches = {
+        'default': {
+            'BACKEND': 'core.cache_backends.sqlite.SQLiteCache',
+            'LOCATION': os.path.join(tmp_dir, 'cache.sqlite3'),
+        }
+    }
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        with override_settings(
+            CACHES=caches,
+            MEDIA_ROOT=tmp_dir,
+            ALLOWED_HOSTS=['*'],
+        ):
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def measure(func, repeat):
+    """Выполняет func repeat раз и возвращает время вызовов в секундах."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def percentile(timings, percent):
+    """Возвращает перцентиль времени выполнения."""
+    ordered = sorted(timings)
+    index = min(len(ordered) - 1, int(len(ordered) * percent / 100))
+    return ordered[index]
+
+
+def summary(timings):
+    """Возвращает среднее, p50, p95 и p99 в миллисекундах."""
+    return {
+        'mean': statistics.mean(timings) * 1000,
+        'p50': percentile(timings, 50) * 1000,
+        'p95': percentile(timings, 95) * 1000,
+        'p99': percentile(timings, 99) * 1000,
+    }
+
+
+def print_table(header, rows):
+    """Печатает результаты в виде выровненной таблицы."""
+    widths = [
+        max(len(str(row[i])) for row in [header] + rows)
+        for i in range(len(header))
+    ]
+    for row in [header] + rows:
+        print('  '.join(
+            str(cell).ljust(width) for cell, width in zip(row, widths)
+        ))
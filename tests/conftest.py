@@ -1,5 +1,7 @@
 import os
 
+import pytest
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 root_dir_content = os.listdir(BASE_DIR)
 PROJECT_DIR_NAME = 'yatube'
@@ -37,3 +39,18 @@ pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
 ]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # БД откатывается после каждого теста, а кэш страниц - нет. Поколение
+    # кэша меняется только после фиксации транзакции, которой в тестах нет.
+    from django.core.cache import cache
+
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def lazy_thumbnails(settings):
+    # Фоновые потоки миниатюр писали бы в БД, которую тест в это время очищает
+    settings.POSTS_EAGER_THUMBNAILS = False
@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        """Включает замер времени отрисовки шаблонов для метрик."""
+        from core.metrics import install_template_timer
+        install_template_timer()
@@ -0,0 +1,280 @@
+"""Кэш в файле SQLite, общий для всех процессов на сервере.
+
+База открывается в режиме WAL: чтения не блокируют запись, а все
+воркеры WSGI-сервера видят одни и те же записи и сбросы кэша.
+Сторонние сервисы не нужны.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# Не чаще, чем раз в столько секунд, обновляется время последнего
+# обращения к записи: каждое чтение не должно превращаться в запись
+ACCESS_RESOLUTION = 1.0
+# Через сколько записей в кэш проверяется превышение MAX_ENTRIES
+CULL_CHECK_INTERVAL = 100
+# Сколько секунд ждать освобождения блокировки базы
+BUSY_TIMEOUT = 5.0
+# Сколько ключей запрашивать одним SELECT в get_many
+FETCH_BATCH_SIZE = 500
+# Целые числа в этих пределах хранятся в SQLite как INTEGER
+MIN_INTEGER, MAX_INTEGER = -2 ** 63, 2 ** 63 - 1
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    ' key TEXT PRIMARY KEY,'
+    ' value BLOB NOT NULL,'
+    ' expires REAL,'
+    ' accessed REAL NOT NULL'
+    ') WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+)
+
+
+class SQLiteCache(BaseCache):
+    """Кэш с вытеснением давно не использованных записей (LRU).
+
+    Параметры OPTIONS:
+        MAX_ENTRIES - предельное количество записей;
+        CULL_FREQUENCY - при превышении удаляется 1/CULL_FREQUENCY записей;
+        CULL_CHECK_INTERVAL - через сколько записей проверять предел.
+
+    Целые числа хранятся без сериализации, поэтому incr выполняется
+    одним UPDATE внутри транзакции и атомарен между процессами.
+    """
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._cull_check_interval = int(
+            options.get('CULL_CHECK_INTERVAL', CULL_CHECK_INTERVAL)
+        )
+        self._local = threading.local()
+
+    def _connection(self):
+        # Соединение нельзя переносить между потоками и в дочерний процесс
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(
+                self._path,
+                timeout=BUSY_TIMEOUT,
+                isolation_level=None,
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                connection.execute(statement)
+            local.connection = connection
+            local.pid = os.getpid()
+            local.writes = 0
+        return local.connection
+
+    def _encode(self, value):
+        if type(value) is int and MIN_INTEGER <= value <= MAX_INTEGER:
+            return value
+        return sqlite3.Binary(pickle.dumps(value, self.pickle_protocol))
+
+    def _decode(self, value):
+        if isinstance(value, int):
+            return value
+        return pickle.loads(value)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _after_write(self, connection, count=1):
+        self._local.writes += count
+        if self._local.writes >= self._cull_check_interval:
+            self._local.writes = 0
+            self._cull(connection)
+
+    def _cull(self, connection):
+        """Удаляет просроченные и давно не использованные записи."""
+        connection.execute(
+            'DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?',
+            (time.time(),),
+        )
+        count = connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            connection.execute('DELETE FROM cache')
+            return
+        connection.execute(
+            'DELETE FROM cache WHERE key IN ('
+            ' SELECT key FROM cache ORDER BY accessed LIMIT ?'
+            ')',
+            (max(count // self._cull_frequency, count - self._max_entries),),
+        )
+
+    def _fetch(self, connection, keys):
+        now = time.time()
+        placeholders = ', '.join('?' * len(keys))
+        rows = connection.execute(
+            f'SELECT key, value, expires, accessed FROM cache '
+            f'WHERE key IN ({placeholders})',
+            keys,
+        ).fetchall()
+
+        found, expired, touched = {}, [], []
+        for key, value, expires, accessed in rows:
+            if expires is not None and expires <= now:
+                expired.append((key, now))
+                continue
+            found[key] = self._decode(value)
+            if now - accessed > ACCESS_RESOLUTION:
+                touched.append((now, key))
+
+        if expired:
+            connection.executemany(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                expired,
+            )
+        if touched:
+            connection.executemany(
+                'UPDATE cache SET accessed = ? WHERE key = ?',
+                touched,
+            )
+        return found
+
+    def _store(self, connection, key, value, timeout):
+        connection.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires, accessed) '
+            'VALUES (?, ?, ?, ?)',
+            (
+                key,
+                self._encode(value),
+                self.get_backend_timeout(timeout),
+                time.time(),
+            ),
+        )
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        connection = self._connection()
+        now = time.time()
+        # Вставка или замена только просроченной записи одним запросом
+        cursor = connection.execute(
+            'INSERT INTO cache (key, value, expires, accessed) '
+            'VALUES (?, ?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET '
+            ' value = excluded.value,'
+            ' expires = excluded.expires,'
+            ' accessed = excluded.accessed '
+            'WHERE cache.expires IS NOT NULL AND cache.expires <= ?',
+            (
+                key,
+                self._encode(value),
+                self.get_backend_timeout(timeout),
+                now,
+                now,
+            ),
+        )
+        added = cursor.rowcount == 1
+        if added:
+            self._after_write(connection)
+        return added
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        return self._fetch(self._connection(), [key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys_map = {self._key(key, version): key for key in keys}
+        connection = self._connection()
+        found = {}
+        made_keys = list(keys_map)
+        for start in range(0, len(made_keys), FETCH_BATCH_SIZE):
+            found.update(self._fetch(
+                connection,
+                made_keys[start:start + FETCH_BATCH_SIZE],
+            ))
+        return {keys_map[key]: value for key, value in found.items()}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        connection = self._connection()
+        self._store(connection, key, value, timeout)
+        self._after_write(connection)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            for key, value in data.items():
+                self._store(
+                    connection,
+                    self._key(key, version),
+                    value,
+                    timeout,
+                )
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        self._after_write(connection, len(data))
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        cursor = self._connection().execute(
+            'UPDATE cache SET expires = ? '
+            'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), key, time.time()),
+        )
+        return cursor.rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            cursor = connection.execute(
+                "UPDATE cache SET value = value + ? WHERE key = ? "
+                "AND typeof(value) = 'integer' "
+                "AND (expires IS NULL OR expires > ?)",
+                (delta, key, time.time()),
+            )
+            if cursor.rowcount != 1:
+                raise ValueError(f"Key '{key}' not found")
+            value = connection.execute(
+                'SELECT value FROM cache WHERE key = ?',
+                (key,),
+            ).fetchone()[0]
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        return value
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return self._connection().execute(
+            'SELECT 1 FROM cache '
+            'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (key, time.time()),
+        ).fetchone() is not None
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        self._connection().execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def delete_many(self, keys, version=None):
+        keys = [(self._key(key, version),) for key in keys]
+        if keys:
+            self._connection().executemany(
+                'DELETE FROM cache WHERE key = ?',
+                keys,
+            )
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
@@ -0,0 +1,235 @@
+"""Метрики обработки запросов по представлениям.
+
+Для каждого запроса MetricsMiddleware собирает время обработки,
+количество и суммарное время SQL-запросов и время отрисовки шаблонов и
+раскладывает их по гистограммам с меткой view - именем представления
+из resolver_match.
+
+Гистограммы копятся в памяти процесса и не чаще раза в FLUSH_INTERVAL
+секунд добавляются к общей копии в кэше. Запись идёт под блокировкой
+в кэше; если блокировку держит другой процесс, данные остаются в
+памяти до следующей попытки, и запрос не ждёт. Так все воркеры видят
+общие гистограммы, а страница /metrics отдаёт их в текстовом формате
+Prometheus.
+"""
+import bisect
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.core.cache import cache
+from django.db import connections
+from django.template.base import Template
+
+# Границы корзин гистограмм времени, в секундах
+DURATION_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+# Границы корзин гистограммы количества SQL-запросов
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+# Гистограммы: описание и границы корзин
+METRICS = {
+    'request_duration_seconds': (
+        'Время обработки запроса',
+        DURATION_BUCKETS,
+    ),
+    'db_queries': (
+        'Количество SQL-запросов за один запрос',
+        QUERY_BUCKETS,
+    ),
+    'db_query_duration_seconds': (
+        'Суммарное время SQL-запросов за один запрос',
+        DURATION_BUCKETS,
+    ),
+    'template_render_seconds': (
+        'Время отрисовки шаблонов за один запрос',
+        DURATION_BUCKETS,
+    ),
+}
+METRICS_PREFIX = 'yatube_'
+# Метка запросов, для которых не нашлось представления
+UNRESOLVED_VIEW = 'unresolved'
+# Как часто процесс добавляет накопленные метрики к общим, в секундах
+FLUSH_INTERVAL = 10
+# Ключ общих гистограмм и блокировки их обновления в кэше
+CACHE_KEY = 'core:metrics'
+LOCK_KEY = 'core:metrics:lock'
+LOCK_TIMEOUT = 10
+
+_state = threading.local()
+
+
+def new_histogram(buckets):
+    """Возвращает пустую гистограмму: счётчики корзин, сумма и число."""
+    return {'buckets': [0] * (len(buckets) + 1), 'sum': 0.0, 'count': 0}
+
+
+def observe(histogram, buckets, value):
+    histogram['buckets'][bisect.bisect_left(buckets, value)] += 1
+    histogram['sum'] += value
+    histogram['count'] += 1
+
+
+def merge(target, source):
+    """Добавляет гистограммы source к target."""
+    for series, histogram in source.items():
+        total = target.get(series)
+        if total is None:
+            target[series] = histogram
+            continue
+        total['buckets'] = [
+            left + right
+            for left, right in zip(total['buckets'], histogram['buckets'])
+        ]
+        total['sum'] += histogram['sum']
+        total['count'] += histogram['count']
+    return target
+
+
+class MetricsRegistry:
+    """Гистограммы процесса, ещё не добавленные к общим в кэше."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._flushed_at = time.monotonic()
+
+    def observe(self, view, values):
+        """Записывает значения метрик одного запроса."""
+        with self._lock:
+            for metric, value in values.items():
+                buckets = METRICS[metric][1]
+                histogram = self._pending.get((metric, view))
+                if histogram is None:
+                    histogram = new_histogram(buckets)
+                    self._pending[(metric, view)] = histogram
+                observe(histogram, buckets, value)
+
+    def flush(self, force=False):
+        """Добавляет накопленные гистограммы к общим в кэше.
+
+        Возвращает False, если время ещё не пришло или блокировку
+        держит другой процесс.
+        """
+        if not force and (
+            time.monotonic() - self._flushed_at < FLUSH_INTERVAL
+        ):
+            return False
+        if not cache.add(LOCK_KEY, 1, LOCK_TIMEOUT):
+            return False
+        try:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._flushed_at = time.monotonic()
+            if pending:
+                shared = cache.get(CACHE_KEY) or {}
+                cache.set(CACHE_KEY, merge(shared, pending), None)
+        finally:
+            cache.delete(LOCK_KEY)
+        return True
+
+    def snapshot(self):
+        """Возвращает общие гистограммы вместе с данными процесса."""
+        self.flush(force=True)
+        shared = cache.get(CACHE_KEY) or {}
+        with self._lock:
+            # Блокировку держал другой процесс: досчитываем своё без записи
+            pending = {
+                series: dict(histogram, buckets=list(histogram['buckets']))
+                for series, histogram in self._pending.items()
+            }
+        return merge(shared, pending)
+
+
+registry = MetricsRegistry()
+
+
+class RequestMetrics:
+    """Счётчики одного запроса; вызывается как execute_wrapper."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.rendering = False
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+
+@contextmanager
+def collect(request_metrics):
+    """Собирает SQL-запросы и отрисовку шаблонов в request_metrics."""
+    _state.request_metrics = request_metrics
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(request_metrics)
+                )
+            yield request_metrics
+    finally:
+        _state.request_metrics = None
+
+
+def install_template_timer():
+    """Оборачивает Template.render, чтобы считать время отрисовки.
+
+    Вложенные шаблоны (include, extends) отрисовываются внутри
+    внешнего, поэтому время считается только для внешнего вызова.
+    """
+    render = Template.render
+    if getattr(render, 'timed', False):
+        return
+
+    def timed_render(self, context):
+        request_metrics = getattr(_state, 'request_metrics', None)
+        if request_metrics is None or request_metrics.rendering:
+            return render(self, context)
+        request_metrics.rendering = True
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            request_metrics.template_time += time.perf_counter() - started
+            request_metrics.rendering = False
+
+    timed_render.timed = True
+    Template.render = timed_render
+
+
+def _label(value):
+    return (
+        value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    )
+
+
+def render_prometheus(histograms):
+    """Возвращает гистограммы в текстовом формате Prometheus."""
+    lines = []
+    for metric, (description, buckets) in METRICS.items():
+        name = f'{METRICS_PREFIX}{metric}'
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} histogram')
+        views = sorted(
+            view for series_metric, view in histograms
+            if series_metric == metric
+        )
+        for view in views:
+            histogram = histograms[(metric, view)]
+            label = f'view="{_label(view)}"'
+            cumulative = 0
+            bounds = [str(bound) for bound in buckets] + ['+Inf']
+            for bound, count in zip(bounds, histogram['buckets']):
+                cumulative += count
+                lines.append(
+                    f'{name}_bucket{{{label},le="{bound}"}} {cumulative}'
+                )
+            lines.append(f'{name}_sum{{{label}}} {histogram["sum"]:.6f}')
+            lines.append(f'{name}_count{{{label}}} {histogram["count"]}')
+    return '\n'.join(lines) + '\n'
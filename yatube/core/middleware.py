@@ -0,0 +1,35 @@
+"""Промежуточные слои приложения Core."""
+import time
+
+from core import metrics
+
+
+class MetricsMiddleware:
+    """Записывает метрики запроса в гистограммы его представления.
+
+    Стоит первым в MIDDLEWARE, чтобы время обработки включало все
+    остальные слои.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        with metrics.collect(metrics.RequestMetrics()) as request_metrics:
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        metrics.registry.observe(
+            resolver_match.view_name if resolver_match
+            else metrics.UNRESOLVED_VIEW,
+            {
+                'request_duration_seconds': duration,
+                'db_queries': request_metrics.queries,
+                'db_query_duration_seconds': request_metrics.db_time,
+                'template_render_seconds': request_metrics.template_time,
+            },
+        )
+        metrics.registry.flush()
+        return response
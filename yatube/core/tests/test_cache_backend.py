@@ -0,0 +1,98 @@
+import multiprocessing
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core.cache_backends.sqlite import SQLiteCache
+
+PROCESSES_COUNT = 4
+INCREMENTS_PER_PROCESS = 50
+
+
+def _increment(path):
+    cache = SQLiteCache(path, {})
+    for _ in range(INCREMENTS_PER_PROCESS):
+        cache.incr('counter')
+
+
+class TestSQLiteCache(SimpleTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = f'{self.tmp_dir}/cache.sqlite3'
+        self.cache = SQLiteCache(
+            self.path,
+            {'OPTIONS': {'MAX_ENTRIES': 10, 'CULL_CHECK_INTERVAL': 1}},
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_sqlite_cache_get_set(self):
+        """TestSQLiteCache: Запись, чтение и истечение срока."""
+        self.cache.set('value', {'text': 'Test'})
+        self.cache.set('short', 'Test', timeout=0.1)
+
+        self.assertEqual(self.cache.get('value'), {'text': 'Test'})
+        self.assertEqual(self.cache.get('short'), 'Test')
+        time.sleep(0.2)
+        self.assertIsNone(self.cache.get('short'))
+        self.assertEqual(self.cache.get('short', 'default'), 'default')
+
+    def test_sqlite_cache_add(self):
+        """TestSQLiteCache: add не перезаписывает действующую запись."""
+        self.assertTrue(self.cache.add('lock', 1))
+        self.assertFalse(self.cache.add('lock', 2))
+        self.assertEqual(self.cache.get('lock'), 1)
+
+        self.cache.set('expired', 1, timeout=0.1)
+        time.sleep(0.2)
+        self.assertTrue(self.cache.add('expired', 2))
+
+    def test_sqlite_cache_many(self):
+        """TestSQLiteCache: Пакетные операции."""
+        self.cache.set_many({'first': 1, 'second': [2]})
+
+        self.assertEqual(
+            self.cache.get_many(['first', 'second', 'missing']),
+            {'first': 1, 'second': [2]},
+        )
+        self.cache.delete_many(['first', 'second'])
+        self.assertEqual(self.cache.get_many(['first', 'second']), {})
+
+    def test_sqlite_cache_incr_between_processes(self):
+        """TestSQLiteCache: incr атомарен между процессами."""
+        self.cache.set('counter', 0)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(target=_increment, args=(self.path,))
+            for _ in range(PROCESSES_COUNT)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        self.assertEqual(
+            self.cache.get('counter'),
+            PROCESSES_COUNT * INCREMENTS_PER_PROCESS,
+        )
+
+    def test_sqlite_cache_lru_eviction(self):
+        """TestSQLiteCache: Вытесняются давно не использованные записи."""
+        with mock.patch('core.cache_backends.sqlite.ACCESS_RESOLUTION', 0):
+            self.cache.set('hot', 'Hot value')
+            for i in range(20):
+                self.cache.set(f'key_{i}', i)
+                self.assertEqual(self.cache.get('hot'), 'Hot value')
+
+        keys = ['hot'] + [f'key_{i}' for i in range(20)]
+        found = self.cache.get_many(keys)
+        self.assertLessEqual(len(found), 10)
+        self.assertIn('hot', found)
+        self.assertIn('key_19', found)
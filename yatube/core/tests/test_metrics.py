@@ -0,0 +1,148 @@
+"""Тесты метрик запросов и страницы /metrics."""
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import metrics
+from posts.models import Post, User
+
+
+class TestHistograms(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_metrics_prometheus_format(self):
+        """Корзины выводятся накопительно, с суммой и количеством."""
+        histogram = metrics.new_histogram(metrics.QUERY_BUCKETS)
+        for value in (0, 2, 2, 100):
+            metrics.observe(histogram, metrics.QUERY_BUCKETS, value)
+
+        text = metrics.render_prometheus(
+            {('db_queries', 'posts:"index"'): histogram},
+        )
+
+        self.assertIn('# TYPE yatube_db_queries histogram', text)
+        label = 'view="posts:\\"index\\""'
+        self.assertIn(f'yatube_db_queries_bucket{{{label},le="0"}} 1', text)
+        self.assertIn(f'yatube_db_queries_bucket{{{label},le="2"}} 3', text)
+        self.assertIn(f'yatube_db_queries_bucket{{{label},le="89"}} 3', text)
+        self.assertIn(f'yatube_db_queries_bucket{{{label},le="+Inf"}} 4', text)
+        self.assertIn(f'yatube_db_queries_sum{{{label}}} 104.000000', text)
+        self.assertIn(f'yatube_db_queries_count{{{label}}} 4', text)
+
+    def test_metrics_shared_between_workers(self):
+        """Гистограммы разных процессов складываются в кэше."""
+        workers = [metrics.MetricsRegistry() for _ in range(2)]
+        for worker in workers:
+            worker.observe('posts:index', {'db_queries': 3})
+            self.assertTrue(worker.flush(force=True))
+
+        histogram = workers[0].snapshot()[('db_queries', 'posts:index')]
+        self.assertEqual(histogram['count'], 2)
+        self.assertEqual(histogram['sum'], 6)
+
+    def test_metrics_flush_does_not_wait(self):
+        """Пока блокировку держит другой процесс, данные копятся."""
+        worker = metrics.MetricsRegistry()
+        worker.observe('posts:index', {'db_queries': 1})
+        cache.add(metrics.LOCK_KEY, 1)
+
+        self.assertFalse(worker.flush(force=True))
+        self.assertIsNone(cache.get(metrics.CACHE_KEY))
+        histogram = worker.snapshot()[('db_queries', 'posts:index')]
+        self.assertEqual(histogram['count'], 1)
+
+        cache.delete(metrics.LOCK_KEY)
+        self.assertTrue(worker.flush(force=True))
+        self.assertEqual(
+            cache.get(metrics.CACHE_KEY)[('db_queries', 'posts:index')],
+            histogram,
+        )
+
+    def test_metrics_flush_interval(self):
+        """Без force метрики пишутся в кэш не чаще FLUSH_INTERVAL."""
+        worker = metrics.MetricsRegistry()
+        worker.observe('posts:index', {'db_queries': 1})
+
+        self.assertFalse(worker.flush())
+        with mock.patch.object(
+            metrics.time,
+            'monotonic',
+            return_value=worker._flushed_at + metrics.FLUSH_INTERVAL,
+        ):
+            self.assertTrue(worker.flush())
+
+
+class TestMetricsMiddleware(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_author = User.objects.create_user(username='testauthor')
+        cls.staff_user = User.objects.create_user(
+            username='staff',
+            is_staff=True,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.registry = metrics.MetricsRegistry()
+        patcher = mock.patch.object(metrics, 'registry', self.registry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_metrics_middleware_records_view(self):
+        """Запрос записывается с числом SQL-запросов и временем шаблонов."""
+        post = Post.objects.create(
+            text='Test post',
+            author=TestMetricsMiddleware.test_author,
+        )
+        address = reverse('posts:post_detail', kwargs={'post_id': post.id})
+
+        with CaptureQueriesContext(connection) as queries:
+            Client().get(address)
+        queries_count = len(queries.captured_queries)
+        Client().get('/unknown/address/')
+
+        histograms = self.registry.snapshot()
+        db_queries = histograms[('db_queries', 'posts:post_detail')]
+        self.assertEqual(db_queries['sum'], queries_count)
+        for metric in ('request_duration_seconds', 'template_render_seconds'):
+            with self.subTest(metric=metric):
+                histogram = histograms[(metric, 'posts:post_detail')]
+                self.assertEqual(histogram['count'], 1)
+                self.assertGreater(histogram['sum'], 0)
+        self.assertGreaterEqual(
+            histograms[('request_duration_seconds', 'posts:post_detail')][
+                'sum'
+            ],
+            histograms[('template_render_seconds', 'posts:post_detail')][
+                'sum'
+            ],
+        )
+        self.assertIn(
+            ('request_duration_seconds', metrics.UNRESOLVED_VIEW),
+            histograms,
+        )
+
+    def test_metrics_endpoint_staff_only(self):
+        """Страница /metrics доступна только персоналу."""
+        address = reverse('metrics')
+        client = Client()
+        self.assertEqual(client.get(address).status_code, 403)
+        client.force_login(TestMetricsMiddleware.test_author)
+        self.assertEqual(client.get(address).status_code, 403)
+
+        client.force_login(TestMetricsMiddleware.staff_user)
+        client.get(reverse('posts:index'))
+        response = client.get(address)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertContains(
+            response,
+            'yatube_request_duration_seconds_count{view="posts:index"} 1',
+        )
@@ -1,5 +1,9 @@
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
 from django.shortcuts import render
 
+from core import metrics as request_metrics
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -15,3 +19,15 @@ def permission_denied(request, exception):
 
 def csrf_error(request, reason=''):
     return render(request, 'core/403csrf.html', status=403)
+
+
+def metrics(request):
+    """Отдаёт метрики запросов в текстовом формате Prometheus."""
+    if not request.user.is_staff:
+        raise PermissionDenied
+    return HttpResponse(
+        request_metrics.render_prometheus(
+            request_metrics.registry.snapshot(),
+        ),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
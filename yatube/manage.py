@@ -6,7 +6,11 @@ import sys
 
 def main() -> None:
     """Главная функция."""
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    # Тесты по умолчанию работают с настройками без общего кэша
+    default_settings = 'yatube.settings'
+    if sys.argv[1:2] == ['test']:
+        default_settings = 'yatube.settings_test'
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', default_settings)
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
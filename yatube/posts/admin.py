@@ -1,8 +1,93 @@
-"""Модуль для регистрации моделей в панели администрирования."""
+"""Модуль для регистрации моделей в панели администрирования.
+
+Списки рассчитаны на большие таблицы: связанные объекты загружаются
+одним запросом через list_select_related, внешние ключи редактируются
+через raw_id_fields или autocomplete_fields вместо <select> со всеми
+объектами, а фильтры не перечисляют пользователей. Количество строк
+списка не считается полным COUNT(*) по таблице.
+"""
 
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+
+from posts import models, search
+from posts.constants import ADMIN_COUNT_LIMIT
+from posts.stats import get_post_count
+
+
+class LimitedCountPaginator(Paginator):
+    """Paginator, который считает не больше ADMIN_COUNT_LIMIT строк.
+
+    COUNT выполняется по подзапросу с LIMIT, поэтому его стоимость не
+    зависит от размера таблицы. Если строк больше, список показывает
+    только первые ADMIN_COUNT_LIMIT.
+    """
+
+    @cached_property
+    def count(self):
+        return self.object_list.order_by().values('pk')[
+            :ADMIN_COUNT_LIMIT
+        ].count()
+
+
+class PostPaginator(LimitedCountPaginator):
+    """Paginator списка постов: без фильтров количество берётся из
+    счётчика постов сайта (PostCounter)."""
+
+    @cached_property
+    def count(self):
+        if not self.object_list.query.where:
+            return get_post_count(models.PostCounter.TOTAL)
+        return super().count
+
+
+class UsernameListFilter(admin.SimpleListFilter):
+    """Фильтр по точному имени пользователя с полем ввода.
 
-from posts import models
+    Обычный фильтр по внешнему ключу выводит ссылку на каждого
+    пользователя, поэтому здесь вместо списка - поле ввода.
+    """
+
+    template = 'admin/posts/username_filter.html'
+    field_name = None
+
+    def lookups(self, request, model_admin):
+        # Фильтр выводится, только если вариантов больше нуля
+        return (('', ''),)
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.value() is None,
+            'query_string': changelist.get_query_string(
+                {},
+                [self.parameter_name],
+            ),
+            'hidden_params': [
+                (key, value)
+                for key, value in changelist.params.items()
+                if key not in (self.parameter_name, 'p')
+            ],
+        }
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(
+                **{f'{self.field_name}__username': self.value()}
+            )
+        return queryset
+
+
+class AuthorListFilter(UsernameListFilter):
+    title = 'автор'
+    parameter_name = 'author_username'
+    field_name = 'author'
+
+
+class UserListFilter(UsernameListFilter):
+    title = 'подписчик'
+    parameter_name = 'user_username'
+    field_name = 'user'
 
 
 @admin.register(models.Post)
@@ -10,32 +95,54 @@ class PostAdmin(admin.ModelAdmin):
     """Настройка административной панели для модели Post."""
 
     list_display = ('pk', 'text', 'pub_date', 'author', 'group', 'image')
-    search_fields = ('text',)
-    list_filter = ('pub_date',)
-    list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    search_fields = ('text', '=author__username')
+    list_filter = ('pub_date', AuthorListFilter)
+    raw_id_fields = ('author',)
+    autocomplete_fields = ('group',)
+    paginator = PostPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Ищет посты по полнотекстовому индексу вместо LIKE.
+
+        Кроме текста, пост находится по точному имени автора.
+        """
+        if not search_term:
+            return super().get_search_results(request, queryset, search_term)
+        return (
+            search.filter_posts(queryset, search_term)
+            | queryset.filter(author__username=search_term)
+        ), False
+
 
 @admin.register(models.Comment)
 class CommentAdmin(admin.ModelAdmin):
     list_display = ('pk', 'text', 'post', 'created', 'author')
-    search_fields = ('text', 'author',)
-    list_filter = ('created', 'author',)
-    list_editable = ('author', 'post',)
+    list_select_related = ('post', 'author')
+    search_fields = ('text', '=author__username')
+    list_filter = ('created', AuthorListFilter)
+    raw_id_fields = ('post', 'author')
+    paginator = LimitedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
 
 
 @admin.register(models.Follow)
 class FollowAdmin(admin.ModelAdmin):
     list_display = ('pk', 'user', 'author')
-    search_fields = ('user', 'author',)
-    list_filter = ('user', 'author',)
-    list_editable = ('user', 'author',)
+    list_select_related = ('user', 'author')
+    search_fields = ('=user__username', '=author__username')
+    list_filter = (UserListFilter, AuthorListFilter)
+    raw_id_fields = ('user', 'author')
+    paginator = LimitedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
 
 
 @admin.register(models.Group)
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('pk', 'title', 'slug', 'description',)
-    search_fields = ('slug',)
+    search_fields = ('slug', 'title')
     empty_value_display = '-пусто-'
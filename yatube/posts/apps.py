@@ -7,3 +7,7 @@ class PostsConfig(AppConfig):
     """Класс настроек приложения."""
 
     name = 'posts'
+
+    def ready(self):
+        """Подключает обработчики сигналов моделей."""
+        import posts.signals  # noqa: F401
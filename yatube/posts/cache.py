@@ -0,0 +1,358 @@
+"""Кэширование страниц приложения Posts по поколениям контента.
+
+Номер поколения хранится в кэше и увеличивается сигналами при любом
+изменении постов, комментариев, групп и подписок. Он входит в ключи
+кэша, поэтому страницы могут жить часами и всё равно обновляются сразу
+после изменения.
+
+Самые частые записи дополнительно хранятся в памяти процесса (L1) перед
+общим кэшем (L2), см. TieredCache.
+"""
+import hashlib
+import math
+import random
+import threading
+import time
+from collections import Counter, OrderedDict
+from functools import wraps
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_cookie
+
+from posts.constants import (
+    CACHE_EARLY_REFRESH_BETA,
+    CACHE_LOCAL_MAX_ENTRIES,
+    CACHE_LOCAL_TIMEOUT,
+    CACHE_LOCK_POLL_INTERVAL,
+    CACHE_LOCK_TIMEOUT,
+    CACHE_STALE_TIMEOUT,
+    CACHE_TIMEOUT,
+)
+from posts.models import Group
+
+GENERATION_KEY = 'posts:generation'
+
+
+def _initial_generation():
+    # Начинаем с текущего времени в микросекундах: если ключ поколения
+    # вытеснят из кэша, новое значение будет больше любого из старых,
+    # так как поколение не увеличивается чаще раза в микросекунду.
+    return int(time.time() * 1_000_000)
+
+
+def get_generation():
+    """Возвращает текущее поколение контента."""
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, _initial_generation(), timeout=None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def bump_generation():
+    """Начинает новое поколение контента, сбрасывая кэш страниц."""
+    try:
+        return cache.incr(GENERATION_KEY)
+    except ValueError:
+        generation = _initial_generation()
+        cache.set(GENERATION_KEY, generation, timeout=None)
+        return generation
+
+
+class TieredCache:
+    """Двухуровневый кэш: память процесса (L1) перед общим кэшем (L2).
+
+    L1 - небольшой LRU с коротким временем жизни. Он избавляет самые
+    частые ключи от сериализации и обращения к общему кэшу. Каждая запись
+    хранит поколение контента, с которым её сохранили: если поколение
+    в L2 сменилось, запись L1 удаляется при следующем чтении, поэтому
+    сброс кэша в одном процессе виден всем остальным.
+
+    Значения из L1 отдаются без копирования и не должны изменяться.
+    """
+
+    def __init__(
+        self,
+        max_entries=CACHE_LOCAL_MAX_ENTRIES,
+        local_timeout=CACHE_LOCAL_TIMEOUT,
+    ):
+        self.max_entries = max_entries
+        self.local_timeout = local_timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = Counter()
+
+    def _get_local(self, key, generation):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry_generation, expires, value = entry
+            if expires <= time.monotonic() or (
+                generation is not None and entry_generation != generation
+            ):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set_local(self, key, value, generation, timeout):
+        expires = time.monotonic() + min(self.local_timeout, timeout)
+        with self._lock:
+            self._entries[key] = (generation, expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _count(self, tier, hit):
+        with self._lock:
+            self._stats[tier, 'hits' if hit else 'misses'] += 1
+
+    def get(self, key, default=None, generation=None, stale=False):
+        """Возвращает значение из L1 или L2.
+
+        Если передано поколение, записи других поколений считаются
+        промахом. С stale=True устаревшая запись из L2 всё же
+        возвращается, но в L1 не попадает.
+        """
+        value = self._get_local(key, generation)
+        self._count('l1', value is not None)
+        if value is not None:
+            return value
+
+        entry = cache.get(key)
+        current = entry is not None and (
+            generation is None or entry['generation'] == generation
+        )
+        self._count('l2', current)
+        if entry is None or not (current or stale):
+            return default
+        if current:
+            self._set_local(
+                key,
+                entry['value'],
+                entry['generation'],
+                self.local_timeout,
+            )
+        return entry['value']
+
+    def set(self, key, value, timeout, generation=None):
+        """Сохраняет значение в оба уровня."""
+        cache.set(
+            key,
+            {'generation': generation, 'value': value},
+            timeout,
+        )
+        self._set_local(key, value, generation, timeout)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+        cache.delete(key)
+
+    def clear_local(self):
+        """Очищает L1 и счётчики текущего процесса."""
+        with self._lock:
+            self._entries.clear()
+            self._stats.clear()
+
+    def stats(self):
+        """Возвращает попадания и промахи по уровням кэша."""
+        with self._lock:
+            return {
+                tier: {
+                    'hits': self._stats[tier, 'hits'],
+                    'misses': self._stats[tier, 'misses'],
+                }
+                for tier in ('l1', 'l2')
+            }
+
+
+tiered_cache = TieredCache()
+
+
+def get_group_or_404(slug):
+    """Возвращает группу по slug из кэша или из БД."""
+    key = f'posts:group:{slug}'
+    generation = get_generation()
+    group = tiered_cache.get(key, generation=generation)
+    if group is None:
+        group = get_object_or_404(Group, slug=slug)
+        tiered_cache.set(key, group, CACHE_TIMEOUT, generation)
+    return group
+
+
+def fragment_vary_on(request, per_user=False):
+    """Возвращает значения, от которых зависит фрагмент списка постов.
+
+    В ключ входят поколение контента, адрес страницы с номером или
+    курсором и класс зрителя: анонимный или авторизованный пользователь,
+    а для персональных страниц - конкретный пользователь.
+    """
+    if not request.user.is_authenticated:
+        viewer = 'anon'
+    elif per_user:
+        viewer = f'user:{request.user.pk}'
+    else:
+        viewer = 'auth'
+
+    page = '&'.join(
+        f'{name}={request.GET[name]}'
+        for name in ('page', 'after', 'before')
+        if name in request.GET
+    )
+    return [get_generation(), viewer, request.path, page]
+
+
+def _viewer(request):
+    if request.user.is_authenticated:
+        # Страницы авторизованного пользователя содержат формы с
+        # CSRF-токеном, а он меняется при каждом входе на сайт
+        csrf = request.META.get('CSRF_COOKIE', '')
+        return f'user:{request.user.pk}:{csrf}'
+    return 'anon'
+
+
+def _page_cache_key(request):
+    url = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'posts:page:{request.method}:{url}'
+
+
+def page_etag(request, *args, **kwargs):
+    """Возвращает ETag страницы, не строя её.
+
+    Страница меняется только вместе с поколением контента или зрителем,
+    поэтому их хэш - достаточный валидатор для условного GET. Зритель
+    включает CSRF-токен: после нового входа страница с формами должна
+    прийти заново, иначе браузер отправит устаревший токен.
+    """
+    validator = f'{get_generation()}:{_viewer(request)}'
+    return hashlib.md5(validator.encode()).hexdigest()
+
+
+# Отвечает 304 Not Modified на If-None-Match с текущим ETag страницы
+etag_by_generation = condition(etag_func=page_etag)
+
+
+def _should_refresh(entry, generation, beta):
+    """Решает, нужно ли перестроить страницу из кэша.
+
+    Кроме смены поколения и истечения срока, страница с вероятностью,
+    растущей к концу срока жизни, обновляется досрочно (XFetch): так
+    копии у разных процессов истекают не одновременно.
+    """
+    if entry['generation'] != generation:
+        return True
+    early = entry['delta'] * beta * -math.log(1.0 - random.random())
+    return time.time() + early >= entry['expires']
+
+
+def _is_cacheable(response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+    )
+
+
+def _copy_response(response):
+    """Копирует закэшированный ответ: middleware может менять заголовки,
+    а копия из памяти процесса общая для всех запросов."""
+    copy = HttpResponse(response.content, status=response.status_code)
+    for header, value in response.items():
+        copy[header] = value
+    return copy
+
+
+def _wait_for_entry(key, generation, lock_key, lock_timeout):
+    """Ждёт страницу, которую строит другой процесс."""
+    deadline = time.time() + lock_timeout
+    while time.time() < deadline:
+        time.sleep(CACHE_LOCK_POLL_INTERVAL)
+        entry = tiered_cache.get(key, generation=generation)
+        if entry is not None:
+            return entry
+        if lock_key not in cache:
+            return tiered_cache.get(key, generation=generation, stale=True)
+    return None
+
+
+def cache_page_by_generation(
+    timeout,
+    stale_timeout=CACHE_STALE_TIMEOUT,
+    lock_timeout=CACHE_LOCK_TIMEOUT,
+    beta=CACHE_EARLY_REFRESH_BETA,
+):
+    """Кэширует страницу с защитой от одновременного перестроения.
+
+    Страница хранится вместе с поколением контента и сроком свежести.
+    Когда поколение меняется или срок истекает, страницу перестраивает
+    ровно один процесс - тот, кто первым взял блокировку в кэше. Остальные
+    в это время получают устаревшую копию, а если копии ещё нет - ждут
+    результата вместо того, чтобы строить ту же страницу параллельно.
+
+    Свежие копии страниц хранятся и в памяти процесса (TieredCache).
+    Ответ получает Vary: Cookie, так как содержимое зависит от сессии.
+
+    Целиком кэшируются только страницы анонимных посетителей: копия на
+    каждого пользователя почти не давала бы попаданий и быстро заполняла
+    кэш. Авторизованным пользователям страница строится заново, а общий
+    для них список постов берётся из кэша фрагментов (post_list_cache).
+    """
+    def decorator(view):
+        view = vary_on_cookie(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or (
+                request.user.is_authenticated
+            ):
+                return view(request, *args, **kwargs)
+
+            key = _page_cache_key(request)
+            lock_key = f'{key}:lock'
+            generation = get_generation()
+            entry = tiered_cache.get(key, generation=generation, stale=True)
+            if entry is not None and not _should_refresh(
+                entry,
+                generation,
+                beta,
+            ):
+                return _copy_response(entry['response'])
+
+            locked = cache.add(lock_key, True, lock_timeout)
+            if not locked:
+                if entry is None:
+                    entry = _wait_for_entry(
+                        key,
+                        generation,
+                        lock_key,
+                        lock_timeout,
+                    )
+                if entry is not None:
+                    return _copy_response(entry['response'])
+
+            try:
+                started = time.time()
+                response = view(request, *args, **kwargs)
+                if _is_cacheable(response):
+                    tiered_cache.set(
+                        key,
+                        {
+                            'generation': generation,
+                            'expires': time.time() + timeout,
+                            'delta': time.time() - started,
+                            'response': _copy_response(response),
+                        },
+                        timeout + stale_timeout,
+                        generation,
+                    )
+            finally:
+                if locked:
+                    cache.delete(lock_key)
+            return response
+        return wrapper
+    return decorator
@@ -1,6 +1,126 @@
 """Описываются константы, используемые в приложении Post."""
+from PIL import features
 
 # Максимальное количество постов на странице
 MAX_POSTS_ON_PAGE = 5
+# Сколько номеров страниц показывать по бокам от текущей и на концах
+# навигации; остальные заменяются многоточием
+PAGINATOR_ON_EACH_SIDE = 2
+PAGINATOR_ON_ENDS = 1
+# Время жизни кэшированного COUNT для постраничного вывода выборок без
+# поддерживаемых счётчиков, в секундах
+PAGINATOR_COUNT_TIMEOUT = 60
+# Сколько строк считают списки административной панели. Дальше этого
+# числа страницы не листаются: нужно сузить список фильтром или поиском.
+ADMIN_COUNT_LIMIT = 10000
 # Максимальная длина текстового фрагмента
 MAX_PRESENTATION_LENGTH = 15
+# Размер пакета при заполнении ленты подписок
+TIMELINE_BATCH_SIZE = 1000
+# Размер пакета при сверке счётчиков пользователей
+STATS_BATCH_SIZE = 1000
+# Время жизни кэша страниц, сбрасываемого по поколению контента
+CACHE_TIMEOUT = 60 * 60 * 6
+# Сколько секунд после устаревания страница ещё отдаётся из кэша,
+# пока один из процессов строит новую версию
+CACHE_STALE_TIMEOUT = 60 * 10
+# Время жизни блокировки на перестроение страницы
+CACHE_LOCK_TIMEOUT = 30
+# Интервал опроса кэша в ожидании страницы, которую строит другой процесс
+CACHE_LOCK_POLL_INTERVAL = 0.05
+# Коэффициент вероятностного досрочного обновления кэша (XFetch)
+CACHE_EARLY_REFRESH_BETA = 1.0
+# Максимальное количество записей кэша в памяти процесса
+CACHE_LOCAL_MAX_ENTRIES = 200
+# Время жизни записи кэша в памяти процесса
+CACHE_LOCAL_TIMEOUT = 5
+# Размеры миниатюр, которые используют шаблоны, и параметры их построения
+THUMBNAIL_GEOMETRIES = {
+    '960x339': {'crop': 'center', 'upscale': True},
+}
+# Количество потоков, строящих миниатюры после загрузки изображения
+THUMBNAIL_WORKERS = 2
+# Максимальное количество ключей sorl-thumbnail в памяти процесса
+THUMBNAIL_LOCAL_MAX_ENTRIES = 1000
+# Время жизни ключа sorl-thumbnail в памяти процесса
+THUMBNAIL_LOCAL_TIMEOUT = 60
+# Ширины адаптивных вариантов картинки поста
+IMAGE_VARIANT_WIDTHS = (480, 960, 1440)
+# Форматы адаптивных вариантов: расширение файла и формат Pillow.
+# Первые форматы браузер выбирает в первую очередь, последний -
+# запасной для тега <img>. WebP строится, только если Pillow собран
+# с libwebp, иначе варианты выводятся в одном JPEG.
+IMAGE_VARIANT_FORMATS = {
+    **({'webp': 'WEBP'} if features.check('webp') else {}),
+    'jpeg': 'JPEG',
+}
+# Пропорции вариантов совпадают с миниатюрой 960x339 из шаблонов
+IMAGE_VARIANT_ASPECT = (960, 339)
+# Качество сжатия вариантов
+IMAGE_VARIANT_QUALITY = 80
+# Ширина картинки на странице для атрибута sizes тега <picture>
+IMAGE_VARIANT_SIZES = '(min-width: 768px) 75vw, 100vw'
+# Максимальная сторона сохраняемого оригинала картинки
+IMAGE_MAX_SIDE = 2560
+# Максимальное количество пикселей загружаемой картинки JPEG. Картинки
+# больше отклоняются по заголовку, до декодирования (защита от
+# «бомб» - маленьких файлов с огромным разрешением). JPEG декодируется
+# сразу уменьшенным до 1/8, поэтому предел - то, что draft() сводит
+# к IMAGE_MAX_SIDE: в памяти оказывается не больше
+# (2 * IMAGE_MAX_SIDE) ** 2 пикселей, а снимки телефонов в 50 Мп
+# принимаются.
+IMAGE_MAX_PIXELS = (8 * IMAGE_MAX_SIDE) ** 2
+# Максимальное количество пикселей картинок остальных форматов. Они
+# декодируются целиком, по 4 байта на пиксель: 16 Мп - это 64 МБ.
+IMAGE_MAX_DECODED_PIXELS = 16 * 1000 * 1000
+# Качество сжатия уменьшенного оригинала
+IMAGE_MASTER_QUALITY = 90
+# Количество уровней вложенных каталогов для картинок постов. Каждый
+# уровень - два символа хэша содержимого, то есть 256 подкаталогов.
+MEDIA_SHARD_DEPTH = 2
+# Размер пакета при переносе картинок в новое хранилище
+MEDIA_RELOCATE_BATCH_SIZE = 500
+# Максимальное количество найденных постов. Поиск ранжирует результаты,
+# поэтому дальше первых страниц их всё равно не смотрят.
+SEARCH_MAX_RESULTS = 250
+# Сколько самых новых совпадений ранжируется по релевантности. bm25
+# считается для каждого кандидата, и без ограничения частое слово
+# заставило бы ранжировать почти всю таблицу.
+SEARCH_MAX_CANDIDATES = 5000
+# Максимальное количество слов в поисковом запросе
+SEARCH_MAX_TERMS = 10
+# Веса текста поста и его комментариев при ранжировании bm25
+SEARCH_WEIGHTS = (10.0, 1.0)
+# Количество записей, вставляемых импортом в одной транзакции
+IMPORT_BATCH_SIZE = 1000
+# Максимальное количество имён пользователей, адресов сообществ и id
+# постов, которые импорт держит в памяти для разрешения ссылок
+IMPORT_LOOKUP_MAX_ENTRIES = 100_000
+# Количество строк, которые выгрузка читает из БД за один раз
+EXPORT_CHUNK_SIZE = 2000
+# Зерно генератора тестовых данных seed_yatube по умолчанию
+SEED_RANDOM_SEED = 42
+# Количество объектов, вставляемых генератором в одной транзакции
+SEED_BATCH_SIZE = 5000
+# Показатели степенных (Zipf) распределений генератора: активность
+# авторов и комментаторов, популярность авторов у подписчиков, число
+# подписок пользователя и популярность постов и сообществ
+SEED_ACTIVITY_EXPONENT = 1.0
+SEED_POPULARITY_EXPONENT = 1.0
+SEED_FOLLOWING_EXPONENT = 0.8
+# Во сколько раз больше случайных авторов выбирается для подписок
+# пользователя, чем ему положено: повторы отбрасываются
+SEED_FOLLOW_OVERSAMPLING = 3
+# Доля постов, опубликованных в сообществах
+SEED_GROUP_SHARE = 0.5
+# За сколько дней до запуска генератора начинаются публикации
+SEED_PERIOD_DAYS = 365
+# Среднее время от публикации поста до комментария, в часах
+SEED_COMMENT_DELAY_HOURS = 24
+# Границы длины текста поста и комментария, в словах
+SEED_POST_WORDS = (5, 60)
+SEED_COMMENT_WORDS = (3, 25)
+# Размер словаря текстов (не больше словаря Faker для ru_RU, 500 слов)
+# и набора имён для профилей пользователей
+SEED_VOCABULARY_SIZE = 500
+SEED_NAMES_SIZE = 500
@@ -0,0 +1,150 @@
+"""Потоковая выгрузка сообществ, постов, комментариев и подписок.
+
+Записи выгружаются в том же формате, который читает posts.importer,
+поэтому выгрузку можно загрузить командой import_yatube. Выборки
+читаются через values_list().iterator(chunk_size), без создания
+моделей и без загрузки всей выборки в память: потребление памяти не
+зависит от количества строк.
+
+В JSONL к посту можно приложить ветку комментариев (поле comments).
+Посты и комментарии читаются двумя курсорами, упорядоченными по id
+поста, и сливаются на лету, поэтому в памяти держатся только
+комментарии одного поста.
+"""
+import csv
+import json
+
+from posts.constants import EXPORT_CHUNK_SIZE
+from posts.models import Comment, Follow, Group, Post
+
+EXPORT_FORMATS = {
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+# Поля записей и соответствующие им выражения values_list()
+EXPORT_FIELDS = {
+    'group': {
+        'title': 'title',
+        'slug': 'slug',
+        'description': 'description',
+    },
+    'post': {
+        'id': 'id',
+        'text': 'text',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'pub_date': 'pub_date',
+        'image': 'image',
+    },
+    'comment': {
+        'id': 'id',
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': 'created',
+    },
+    'follow': {
+        'user': 'user__username',
+        'author': 'author__username',
+    },
+}
+
+
+def _querysets(user=None):
+    querysets = {
+        'group': Group.objects.order_by('pk'),
+        'post': Post.objects.order_by('pk'),
+        'comment': Comment.objects.order_by('post_id', '-created'),
+        'follow': Follow.objects.order_by('pk'),
+    }
+    if user is not None:
+        querysets['group'] = querysets['group'].none()
+        querysets['post'] = querysets['post'].filter(author=user)
+        querysets['comment'] = querysets['comment'].filter(author=user)
+        querysets['follow'] = querysets['follow'].filter(user=user)
+    return querysets
+
+
+def _records(queryset, fields, chunk_size):
+    names = list(fields)
+    rows = queryset.values_list(*fields.values()).iterator(
+        chunk_size=chunk_size,
+    )
+    for row in rows:
+        record = dict(zip(names, row))
+        for name, value in record.items():
+            if hasattr(value, 'isoformat'):
+                record[name] = value.isoformat()
+        if 'image' in record:
+            record['image'] = record['image'] or None
+        yield record
+
+
+def _attach_comments(posts, comments):
+    """Добавляет к постам их комментарии, сливая два потока по id поста."""
+    pending = next(comments, None)
+    for post in posts:
+        thread = []
+        while pending is not None and pending['post'] <= post['id']:
+            if pending['post'] == post['id']:
+                thread.append(pending)
+            pending = next(comments, None)
+        post['comments'] = thread
+        yield post
+
+
+def export_records(
+    model_name,
+    user=None,
+    with_comments=False,
+    chunk_size=EXPORT_CHUNK_SIZE,
+):
+    """Возвращает генератор записей модели model_name.
+
+    Если указан user, выгружаются только его посты, комментарии и
+    подписки. with_comments добавляет к постам ветки комментариев
+    (всех авторов, а не только user).
+    """
+    querysets = _querysets(user)
+    records = _records(
+        querysets[model_name],
+        EXPORT_FIELDS[model_name],
+        chunk_size,
+    )
+    if model_name == 'post' and with_comments:
+        comments = Comment.objects.order_by('post_id', '-created')
+        if user is not None:
+            comments = comments.filter(post__author=user)
+        records = _attach_comments(
+            records,
+            _records(comments, EXPORT_FIELDS['comment'], chunk_size),
+        )
+    return records
+
+
+def render_jsonl(records):
+    """Превращает записи в строки JSONL."""
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+class _Echo:
+    """Псевдофайл для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def render_csv(records, fields):
+    """Превращает записи в строки CSV с заголовком."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for record in records:
+        yield writer.writerow([record[field] for field in fields])
+
+
+def render_records(model_name, file_format, records):
+    """Превращает записи в строки выбранного формата."""
+    if file_format == 'csv':
+        return render_csv(records, list(EXPORT_FIELDS[model_name]))
+    return render_jsonl(records)
@@ -1,5 +1,11 @@
 from django import forms
 
+from posts.images import (
+    downscale_image,
+    is_image_bomb,
+    max_pixels,
+    needs_downscale,
+)
 from posts.models import Comment, Post
 
 
@@ -8,6 +14,26 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ['text', 'group', 'image']
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        # Атрибут image есть только у нового файла: ImageField уже открыл
+        # его и проверил заголовок, не декодируя картинку
+        if not image or not hasattr(image, 'image'):
+            return image
+
+        width, height = image.image.size
+        image_format = image.image.format
+        if is_image_bomb(width, height, image_format):
+            raise forms.ValidationError(
+                f'Слишком большое разрешение картинки: {width}x{height}. '
+                f'Допускается не более {max_pixels(image_format)} '
+                f'пикселей.',
+                code='image_too_large',
+            )
+        if needs_downscale(width, height):
+            return downscale_image(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
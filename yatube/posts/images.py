@@ -0,0 +1,186 @@
+"""Приём загружаемых картинок постов с ограничением памяти и перенос
+старых картинок в хранилище с адресацией по содержимому.
+
+Размер картинки читается из заголовка файла, без декодирования.
+Слишком большие картинки отклоняются сразу, а оригиналы больше
+IMAGE_MAX_SIDE уменьшаются: JPEG декодируется сразу в уменьшенном
+масштабе (Image.draft), остальное уменьшается в целое число раз
+(Image.reduce) и лишь затем точно масштабируется. Остальные форматы
+декодируются целиком, поэтому для них предел разрешения ниже.
+"""
+import json
+import os
+from io import BytesIO
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from PIL import Image
+
+from posts import thumbnails, variants
+from posts.cache import bump_generation
+from posts.constants import (
+    IMAGE_MASTER_QUALITY,
+    IMAGE_MAX_DECODED_PIXELS,
+    IMAGE_MAX_PIXELS,
+    IMAGE_MAX_SIDE,
+    MEDIA_RELOCATE_BATCH_SIZE,
+)
+from posts.models import Post
+from posts.storage import is_content_name
+
+# Форматы, в которых сохраняется уменьшенный оригинал. Остальные
+# сохраняются в JPEG.
+MASTER_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp'}
+
+# Собственная защита Pillow от «бомб» отклоняет картинки больше 179 Мп
+# уже при чтении заголовка. Предел по формату проверяет is_image_bomb,
+# поэтому Pillow ограничивается лишь самым большим из них.
+Image.MAX_IMAGE_PIXELS = max(IMAGE_MAX_PIXELS, IMAGE_MAX_DECODED_PIXELS)
+
+
+def max_pixels(image_format):
+    """Возвращает допустимое количество пикселей картинки формата
+    image_format: только JPEG не декодируется в полном размере."""
+    if image_format == 'JPEG':
+        return IMAGE_MAX_PIXELS
+    return IMAGE_MAX_DECODED_PIXELS
+
+
+def is_image_bomb(width, height, image_format=None):
+    """Проверяет, превышает ли разрешение картинки допустимое."""
+    return width * height > max_pixels(image_format)
+
+
+def needs_downscale(width, height):
+    """Проверяет, нужно ли уменьшать оригинал картинки."""
+    return max(width, height) > IMAGE_MAX_SIDE
+
+
+def _open(upload):
+    upload.seek(0)
+    if hasattr(upload, 'temporary_file_path'):
+        return Image.open(upload.temporary_file_path())
+    return Image.open(upload)
+
+
+def downscale_image(upload):
+    """Возвращает копию загруженной картинки, уменьшенную до
+    IMAGE_MAX_SIDE по большей стороне.
+
+    Анимированные картинки возвращаются без изменений.
+    """
+    buffer = BytesIO()
+    with _open(upload) as image:
+        if getattr(image, 'is_animated', False):
+            upload.seek(0)
+            return upload
+        image_format = image.format
+        exif = image.info.get('exif')
+        target = (IMAGE_MAX_SIDE, IMAGE_MAX_SIDE)
+
+        # JPEG декодируется сразу в масштабе 1/2, 1/4 или 1/8. draft()
+        # уменьшает, только пока обе стороны не меньше запрошенных,
+        # поэтому запрашиваем размер с пропорциями картинки.
+        scale = IMAGE_MAX_SIDE / max(image.size)
+        image.draft(
+            'RGB',
+            (round(image.width * scale), round(image.height * scale)),
+        )
+        if image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+            has_alpha = 'transparency' in image.info
+            image = image.convert('RGBA' if has_alpha else 'RGB')
+        factor = max(image.width, image.height) // IMAGE_MAX_SIDE
+        if factor > 1:
+            image = image.reduce(factor)
+        image.thumbnail(target, Image.LANCZOS)
+
+        if image_format not in MASTER_FORMATS:
+            image_format = 'JPEG'
+        if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+        options = {'quality': IMAGE_MASTER_QUALITY}
+        if exif and image_format in ('JPEG', 'WEBP'):
+            # Сохраняем ориентацию и прочие EXIF-данные снимка
+            options['exif'] = exif
+        image.save(buffer, image_format, **options)
+
+    stem = os.path.splitext(os.path.basename(upload.name))[0]
+    return SimpleUploadedFile(
+        name=f'{stem}.{MASTER_FORMATS[image_format]}',
+        content=buffer.getvalue(),
+        content_type=Image.MIME[image_format],
+    )
+
+
+def _relocate_variants(post, image_name):
+    """Копирует варианты картинки под новое имя и возвращает старые."""
+    old_names = []
+    relocated = {}
+    for extension, names in variants.load_variants(post).items():
+        relocated[extension] = {}
+        for width, name in names.items():
+            new_name = variants.variant_name(image_name, width, extension)
+            if not default_storage.exists(new_name):
+                with default_storage.open(name) as variant_file:
+                    new_name = default_storage.save(new_name, variant_file)
+            relocated[extension][width] = new_name
+            old_names.append(name)
+    post.image_variants = json.dumps(relocated) if relocated else ''
+    return old_names
+
+
+def relocate_images(batch_size=MEDIA_RELOCATE_BATCH_SIZE):
+    """Переносит картинки постов в хранилище с адресацией по содержимому.
+
+    Посты обрабатываются пакетами по первичному ключу: файлы копируются
+    под новые имена, пути в БД меняются одним bulk_update на пакет,
+    а старые файлы удаляются, когда на них не ссылается ни один пост.
+    Возвращает количество перенесённых картинок и список отсутствующих
+    файлов.
+    """
+    storage = Post._meta.get_field('image').storage
+    moved, missing = 0, []
+    last_pk = 0
+    while True:
+        batch = list(
+            Post.objects.filter(pk__gt=last_pk)
+            .exclude(image='')
+            .order_by('pk')
+            .only('pk', 'image', 'image_variants')[:batch_size]
+        )
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+
+        changed, old_files = [], {}
+        for post in batch:
+            old_name = post.image.name
+            if is_content_name(old_name):
+                continue
+            if not storage.exists(old_name):
+                missing.append(old_name)
+                continue
+            with storage.open(old_name) as image_file:
+                new_name = storage.save(old_name, image_file)
+            old_files.setdefault(old_name, []).extend(
+                _relocate_variants(post, new_name),
+            )
+            post.image = new_name
+            changed.append(post)
+
+        with transaction.atomic():
+            Post.objects.bulk_update(changed, ['image', 'image_variants'])
+        for old_name, variant_names in old_files.items():
+            if Post.objects.filter(image=old_name).exists():
+                continue
+            thumbnails.delete_thumbnails(old_name)
+            for name in variant_names:
+                default_storage.delete(name)
+            storage.delete(old_name)
+        moved += len(changed)
+
+    if moved:
+        bump_generation()
+    return moved, missing
@@ -0,0 +1,372 @@
+"""Потоковый импорт сообществ, постов, комментариев и подписок.
+
+Источник - файл JSONL (объект на строку) или CSV с заголовком. Файл
+читается генератором, записи собираются в пакеты, ссылки на
+пользователей, сообщества и посты разрешаются одним запросом на пакет,
+а объекты вставляются через bulk_create в отдельной транзакции на
+пакет. В той же транзакции в БД сохраняется номер последней записи
+пакета (ImportProgress), поэтому прерванный импорт продолжается с того
+же места и не вставляет зафиксированный пакет повторно.
+
+Поля записей:
+
+* group: title, slug, description;
+* post: id (необязательно), text, author, group, pub_date, image;
+* comment: id (необязательно), post, author, text, created;
+* follow: user, author.
+
+author и user - имена пользователей (недостающие создаются без
+пароля), group - адрес сообщества, post - id поста. Даты - в формате
+ISO 8601; если дата не указана, ставится текущая.
+"""
+import csv
+import json
+import os
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts.constants import IMPORT_BATCH_SIZE, IMPORT_LOOKUP_MAX_ENTRIES
+from posts.models import (
+    Comment,
+    Follow,
+    Group,
+    ImportProgress,
+    Post,
+    User,
+)
+
+# Количество значений в одном запросе IN: меньше ограничения SQLite на
+# число параметров запроса
+LOOKUP_CHUNK_SIZE = 900
+
+
+class ImportSourceError(Exception):
+    """Ошибка, из-за которой импорт нельзя начать или продолжить."""
+
+
+def read_records(path, file_format=None):
+    """Читает записи файла по одной, не загружая файл целиком."""
+    file_format = file_format or os.path.splitext(path)[1].lstrip('.')
+    with open(path, newline='', encoding='utf-8') as source:
+        if file_format == 'csv':
+            yield from csv.DictReader(source)
+        elif file_format in ('jsonl', 'json'):
+            for line in source:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            raise ImportSourceError(
+                f'Неизвестный формат файла: {file_format}'
+            )
+
+
+class LookupCache:
+    """Кэш соответствия значения поля первичному ключу.
+
+    Недостающие значения загружаются пакетом, одним запросом на
+    LOOKUP_CHUNK_SIZE значений. Размер кэша ограничен: давно не
+    использованные значения вытесняются.
+    """
+
+    def __init__(
+        self,
+        queryset,
+        field,
+        max_entries=IMPORT_LOOKUP_MAX_ENTRIES,
+    ):
+        self.queryset = queryset
+        self.field = field
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def _remember(self, key, pk):
+        self._entries[key] = pk
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def load(self, keys):
+        """Загружает значения keys и возвращает те, которых нет в БД."""
+        missing = []
+        for key in set(keys):
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            else:
+                missing.append(key)
+        for start in range(0, len(missing), LOOKUP_CHUNK_SIZE):
+            chunk = missing[start:start + LOOKUP_CHUNK_SIZE]
+            rows = self.queryset.filter(
+                **{f'{self.field}__in': chunk}
+            ).values_list(self.field, 'pk')
+            for key, pk in rows:
+                self._remember(key, pk)
+        return {key for key in missing if key not in self._entries}
+
+    def get(self, key):
+        return self._entries.get(key)
+
+
+def _parse_date(value):
+    if not value:
+        return timezone.now()
+    date = parse_datetime(value)
+    if date is None:
+        raise ValueError(f'неверная дата {value!r}')
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+def _required(record, field):
+    value = record.get(field)
+    if value in (None, ''):
+        raise ValueError(f'не заполнено поле {field}')
+    return value
+
+
+def _optional_id(record, field='id'):
+    value = record.get(field)
+    return int(value) if value not in (None, '') else None
+
+
+@contextmanager
+def source_dates(model, field_name):
+    """Отключает auto_now_add, чтобы сохранить даты из источника."""
+    if field_name is None:
+        yield
+        return
+    field = model._meta.get_field(field_name)
+    auto_now_add = field.auto_now_add
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = auto_now_add
+
+
+class Importer:
+    """Превращает записи одной модели в объекты для bulk_create."""
+
+    model = None
+    date_field = None
+    user_fields = ()
+
+    def __init__(self):
+        self.users = LookupCache(User.objects.all(), 'username')
+
+    def prepare(self, records):
+        """Загружает ссылки пакета, создавая недостающих пользователей."""
+        usernames = {
+            record[field]
+            for record in records
+            for field in self.user_fields
+            if record.get(field)
+        }
+        missing = self.users.load(usernames)
+        if missing:
+            User.objects.bulk_create(
+                [
+                    User(username=username, password=make_password(None))
+                    for username in missing
+                ],
+                ignore_conflicts=True,
+            )
+            self.users.load(missing)
+
+    def user_id(self, record, field):
+        return self.users.get(_required(record, field))
+
+    def build(self, record):
+        raise NotImplementedError
+
+
+class GroupImporter(Importer):
+    model = Group
+
+    def build(self, record):
+        return Group(
+            title=_required(record, 'title'),
+            slug=_required(record, 'slug'),
+            description=record.get('description') or '',
+        )
+
+
+class PostImporter(Importer):
+    model = Post
+    date_field = 'pub_date'
+    user_fields = ('author',)
+
+    def __init__(self):
+        super().__init__()
+        self.groups = LookupCache(Group.objects.all(), 'slug')
+
+    def prepare(self, records):
+        super().prepare(records)
+        self.groups.load(
+            record['group'] for record in records if record.get('group')
+        )
+
+    def build(self, record):
+        group_id = None
+        if record.get('group'):
+            group_id = self.groups.get(record['group'])
+            if group_id is None:
+                raise ValueError(f'нет сообщества {record["group"]!r}')
+        return Post(
+            id=_optional_id(record),
+            text=_required(record, 'text'),
+            author_id=self.user_id(record, 'author'),
+            group_id=group_id,
+            pub_date=_parse_date(record.get('pub_date')),
+            image=record.get('image') or '',
+        )
+
+
+class CommentImporter(Importer):
+    model = Comment
+    date_field = 'created'
+    user_fields = ('author',)
+
+    def __init__(self):
+        super().__init__()
+        self.posts = LookupCache(Post.objects.all(), 'pk')
+
+    def prepare(self, records):
+        super().prepare(records)
+        post_ids = set()
+        for record in records:
+            try:
+                post_ids.add(_optional_id(record, 'post'))
+            except ValueError:
+                pass
+        self.posts.load(post_ids - {None})
+
+    def build(self, record):
+        post_id = self.posts.get(_optional_id(record, 'post'))
+        if post_id is None:
+            raise ValueError(f'нет поста {record.get("post")!r}')
+        return Comment(
+            id=_optional_id(record),
+            text=_required(record, 'text'),
+            post_id=post_id,
+            author_id=self.user_id(record, 'author'),
+            created=_parse_date(record.get('created')),
+        )
+
+
+class FollowImporter(Importer):
+    model = Follow
+    user_fields = ('user', 'author')
+
+    def build(self, record):
+        user_id = self.user_id(record, 'user')
+        author_id = self.user_id(record, 'author')
+        if user_id == author_id:
+            raise ValueError('подписка на самого себя')
+        return Follow(user_id=user_id, author_id=author_id)
+
+
+IMPORTERS = {
+    'group': GroupImporter,
+    'post': PostImporter,
+    'comment': CommentImporter,
+    'follow': FollowImporter,
+}
+
+
+class ResumeState:
+    """Количество уже импортированных записей источника в БД."""
+
+    def __init__(self, key, source, model_name):
+        self.progress = ImportProgress(
+            key=key,
+            source=source,
+            model=model_name,
+        )
+
+    def load(self):
+        """Возвращает количество записей, обработанных прошлым запуском."""
+        progress = ImportProgress.objects.filter(
+            key=self.progress.key,
+        ).first()
+        if progress is None:
+            return 0
+        if (progress.source, progress.model) != (
+            self.progress.source,
+            self.progress.model,
+        ):
+            raise ImportSourceError(
+                f'Ключ продолжения {progress.key} относится к импорту '
+                f'{progress.model} из {progress.source}'
+            )
+        self.progress = progress
+        return progress.rows
+
+    def save(self, rows):
+        """Сохраняет количество записей. Вызывается в транзакции пакета,
+        чтобы номер записи и сами записи фиксировались вместе."""
+        self.progress.rows = rows
+        self.progress.save()
+
+    def delete(self):
+        ImportProgress.objects.filter(key=self.progress.key).delete()
+
+
+def import_records(
+    model_name,
+    path,
+    file_format=None,
+    batch_size=IMPORT_BATCH_SIZE,
+    resume_key=None,
+    progress=None,
+):
+    """Импортирует записи файла path в модель model_name.
+
+    Возвращает словарь со счётчиками: rows - обработано записей за этот
+    запуск, skipped - пропущено как уже импортированные, errors - список
+    (номер записи, описание ошибки), seconds - время работы.
+    progress(rows, seconds) вызывается после каждого пакета.
+    resume_key - имя записи продолжения, по умолчанию путь к файлу.
+    """
+    importer = IMPORTERS[model_name]()
+    source = os.path.abspath(path)
+    resume = ResumeState(resume_key or source, source, model_name)
+    skipped = resume.load()
+    records = islice(read_records(path, file_format), skipped, None)
+
+    report = {'rows': 0, 'skipped': skipped, 'errors': [], 'seconds': 0}
+    started = time.perf_counter()
+    with source_dates(importer.model, importer.date_field):
+        number = skipped
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                break
+            importer.prepare(batch)
+            objects = []
+            for record in batch:
+                number += 1
+                try:
+                    objects.append(importer.build(record))
+                except (ValueError, TypeError) as error:
+                    report['errors'].append((number, str(error)))
+            with transaction.atomic():
+                importer.model.objects.bulk_create(
+                    objects,
+                    ignore_conflicts=True,
+                )
+                resume.save(number)
+            report['rows'] += len(batch)
+            report['seconds'] = time.perf_counter() - started
+            if progress:
+                progress(report['rows'], report['seconds'])
+    resume.delete()
+    report['seconds'] = time.perf_counter() - started
+    return report
@@ -0,0 +1,112 @@
+"""Хранилище ключей sorl-thumbnail с кэшем в памяти процесса.
+
+Стандартное хранилище cached_db на каждый тег {% thumbnail %} делает
+запрос к общему кэшу, а при промахе - к БД. Это хранилище добавляет
+перед ними LRU в памяти процесса и умеет одним get_many загрузить
+ключи всех миниатюр страницы (см. posts.thumbnails.prefetch_thumbnails).
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from sorl.thumbnail.conf import settings
+from sorl.thumbnail.kvstores.cached_db_kvstore import (
+    EMPTY_VALUE,
+    KVStore as CachedDBKVStore,
+)
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from posts.constants import (
+    THUMBNAIL_LOCAL_MAX_ENTRIES,
+    THUMBNAIL_LOCAL_TIMEOUT,
+)
+
+
+class KVStore(CachedDBKVStore):
+    """Хранилище sorl-thumbnail: память процесса, общий кэш, затем БД.
+
+    Записи в памяти процесса живут THUMBNAIL_LOCAL_TIMEOUT секунд:
+    удаление миниатюр в другом процессе становится видно не позже.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_local(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set_local(self, key, value):
+        expires = time.monotonic() + THUMBNAIL_LOCAL_TIMEOUT
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > THUMBNAIL_LOCAL_MAX_ENTRIES:
+                self._entries.popitem(last=False)
+
+    def _drop_local(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def _get_raw(self, key):
+        value = self._get_local(key)
+        if value is None:
+            value = super()._get_raw(key)
+            # Отсутствие ключа не запоминаем: миниатюру могут вот-вот
+            # построить в фоновом потоке
+            if value is None:
+                return None
+            self._set_local(key, value)
+        return value
+
+    def _set_raw(self, key, value):
+        super()._set_raw(key, value)
+        self._set_local(key, value)
+
+    def _delete_raw(self, *keys):
+        super()._delete_raw(*keys)
+        self._drop_local(*keys)
+
+    def clear(self, delete_thumbnails=False):
+        super().clear(delete_thumbnails)
+        self.clear_local()
+
+    def clear_local(self):
+        """Очищает записи в памяти текущего процесса."""
+        with self._lock:
+            self._entries.clear()
+
+    def prefetch(self, keys):
+        """Загружает ключи одним get_many к кэшу и одним запросом к БД."""
+        missing = [key for key in keys if self._get_local(key) is None]
+        if not missing:
+            return
+
+        found = self.cache.get_many(missing)
+        not_cached = [key for key in missing if key not in found]
+        if not_cached:
+            from_db = dict(
+                KVStoreModel.objects.filter(key__in=not_cached)
+                .values_list('key', 'value')
+            )
+            # Как и cached_db, запоминаем в кэше и отсутствие ключа
+            self.cache.set_many(
+                {key: from_db.get(key, EMPTY_VALUE) for key in not_cached},
+                settings.THUMBNAIL_CACHE_TIMEOUT,
+            )
+            found.update(from_db)
+
+        for key, value in found.items():
+            if value != EMPTY_VALUE:
+                self._set_local(key, value)
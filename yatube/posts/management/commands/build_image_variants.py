@@ -0,0 +1,76 @@
+"""Команда построения адаптивных вариантов картинок постов."""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat, starmap
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts.cache import bump_generation
+from posts.models import Post
+from posts.variants import build_post_variants, save_variants
+
+
+class Command(BaseCommand):
+    help = (
+        'Строит адаптивные варианты картинок постов на всех ядрах CPU. '
+        'По умолчанию обрабатывает только посты без вариантов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='Количество процессов. При 1 работает без пула.',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Построить варианты заново и для постов, где они есть.',
+        )
+
+    def handle(self, *args, **options):
+        force = options['force']
+        posts = Post.objects.exclude(image='').order_by('pk')
+        if not force:
+            posts = posts.filter(image_variants='')
+        tasks = list(posts.values_list('pk', 'image'))
+
+        if options['workers'] <= 1 or not tasks:
+            built, errors = self.__save(starmap(
+                build_post_variants,
+                ((post_id, image, force) for post_id, image in tasks),
+            ))
+        else:
+            # Дочерние процессы не должны наследовать открытые соединения
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+                post_ids, images = zip(*tasks)
+                built, errors = self.__save(pool.map(
+                    build_post_variants,
+                    post_ids,
+                    images,
+                    repeat(force),
+                    chunksize=max(1, len(tasks) // (options['workers'] * 4)),
+                ))
+
+        if built:
+            bump_generation()
+        for error in errors:
+            self.stderr.write(error)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Построены варианты картинок: {built}, '
+                f'ошибок: {len(errors)}'
+            )
+        )
+
+    def __save(self, results):
+        built, errors = 0, []
+        for post_id, image_name, variants, error in results:
+            if error:
+                errors.append(error)
+            elif save_variants(post_id, image_name, variants):
+                built += 1
+        return built, errors
@@ -0,0 +1,93 @@
+"""Команда потоковой выгрузки данных в JSONL или CSV."""
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.constants import EXPORT_CHUNK_SIZE
+from posts.exporter import (
+    EXPORT_FIELDS,
+    EXPORT_FORMATS,
+    export_records,
+    render_records,
+)
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает сообщества, посты, комментарии или подписки в JSONL '
+        'или CSV в формате команды import_yatube. Память не зависит от '
+        'объёма выгрузки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'model',
+            choices=list(EXPORT_FIELDS),
+            help='Тип выгружаемых записей.',
+        )
+        parser.add_argument(
+            '--output',
+            default='-',
+            help='Файл выгрузки. По умолчанию - стандартный вывод.',
+        )
+        parser.add_argument(
+            '--format',
+            choices=list(EXPORT_FORMATS),
+            help=(
+                'Формат выгрузки. По умолчанию определяется по расширению '
+                'файла, для стандартного вывода - jsonl.'
+            ),
+        )
+        parser.add_argument(
+            '--author',
+            help='Выгрузить только записи пользователя с этим именем.',
+        )
+        parser.add_argument(
+            '--with-comments',
+            action='store_true',
+            help='Добавить к постам ветки комментариев (только JSONL).',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=EXPORT_CHUNK_SIZE,
+            help='Количество строк, читаемых из БД за один раз.',
+        )
+
+    def handle(self, *args, **options):
+        output = options['output']
+        file_format = options['format']
+        if file_format is None:
+            extension = os.path.splitext(output)[1].lstrip('.')
+            file_format = extension if extension in EXPORT_FORMATS else 'jsonl'
+        if options['with_comments'] and (
+            options['model'] != 'post' or file_format != 'jsonl'
+        ):
+            raise CommandError(
+                '--with-comments работает только для постов в JSONL'
+            )
+
+        user = None
+        if options['author']:
+            try:
+                user = User.objects.get(username=options['author'])
+            except User.DoesNotExist:
+                raise CommandError(f'Нет пользователя {options["author"]}')
+
+        lines = render_records(
+            options['model'],
+            file_format,
+            export_records(
+                options['model'],
+                user=user,
+                with_comments=options['with_comments'],
+                chunk_size=options['chunk_size'],
+            ),
+        )
+        if output == '-':
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with open(output, 'w', newline='', encoding='utf-8') as target:
+            target.writelines(lines)
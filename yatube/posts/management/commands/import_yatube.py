@@ -0,0 +1,93 @@
+"""Команда потокового импорта данных из JSONL или CSV."""
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.cache import bump_generation
+from posts.constants import IMPORT_BATCH_SIZE
+from posts.importer import IMPORTERS, ImportSourceError, import_records
+from posts.stats import reconcile_stats
+from posts.timeline import rebuild_timeline
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует сообщества, посты, комментарии или подписки из '
+        'файла JSONL или CSV. Файлы загружаются по одному в порядке '
+        'group, post, comment, follow. Прерванный импорт продолжается '
+        'с места остановки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'model',
+            choices=list(IMPORTERS),
+            help='Тип импортируемых записей.',
+        )
+        parser.add_argument('path', help='Путь к файлу с записями.')
+        parser.add_argument(
+            '--format',
+            choices=('jsonl', 'csv'),
+            help='Формат файла. По умолчанию определяется по расширению.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=IMPORT_BATCH_SIZE,
+            help='Количество записей, вставляемых в одной транзакции.',
+        )
+        parser.add_argument(
+            '--resume-key',
+            help=(
+                'Имя, под которым в БД хранится ход импорта. '
+                'По умолчанию абсолютный путь к файлу.'
+            ),
+        )
+        parser.add_argument(
+            '--no-rebuild',
+            action='store_true',
+            help=(
+                'Не перестраивать ленты подписок и счётчики после импорта, '
+                'например, если дальше загружаются другие файлы.'
+            ),
+        )
+
+    def _progress(self, rows, seconds):
+        if self.verbosity >= 2:
+            self.stdout.write(
+                f'Записей: {rows}, {rows / max(seconds, 1e-9):.0f} в секунду'
+            )
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        model = options['model']
+        try:
+            report = import_records(
+                model,
+                options['path'],
+                file_format=options['format'],
+                batch_size=options['batch_size'],
+                resume_key=options['resume_key'],
+                progress=self._progress,
+            )
+        except (ImportSourceError, OSError, ValueError) as error:
+            raise CommandError(error)
+
+        for number, error in report['errors']:
+            self.stderr.write(f'Запись {number}: {error}')
+        rows, seconds = report['rows'], report['seconds']
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Обработано записей: {rows}, '
+                f'ошибок: {len(report["errors"])}, '
+                f'пропущено при продолжении: {report["skipped"]}, '
+                f'{rows / max(seconds, 1e-9):.0f} записей в секунду'
+            )
+        )
+
+        # bulk_create не вызывает сигналы, поэтому ленты, счётчики и
+        # поколение кэша обновляются после импорта целиком
+        if not options['no_rebuild']:
+            if model in ('post', 'follow'):
+                rebuild_timeline()
+            if model != 'group':
+                reconcile_stats()
+        bump_generation()
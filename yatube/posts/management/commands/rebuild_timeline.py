@@ -0,0 +1,23 @@
+"""Команда заполнения лент подписок по существующим подпискам."""
+from django.core.management.base import BaseCommand
+
+from posts.constants import TIMELINE_BATCH_SIZE
+from posts.timeline import rebuild_timeline
+
+
+class Command(BaseCommand):
+    help = 'Заново строит ленты подписок по существующим записям Follow.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=TIMELINE_BATCH_SIZE,
+            help='Количество записей ленты, вставляемых одним запросом.',
+        )
+
+    def handle(self, *args, **options):
+        inserted = rebuild_timeline(batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Записей в лентах подписок: {inserted}')
+        )
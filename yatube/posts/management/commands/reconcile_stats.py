@@ -0,0 +1,26 @@
+"""Команда сверки денормализованных счётчиков пользователей."""
+from django.core.management.base import BaseCommand
+
+from posts.constants import STATS_BATCH_SIZE
+from posts.stats import reconcile_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счётчики публикаций и подписок пользователей, '
+        'публикаций сайта и сообществ и исправляет расхождения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=STATS_BATCH_SIZE,
+            help='Количество пользователей, обрабатываемых за один проход.',
+        )
+
+    def handle(self, *args, **options):
+        fixed = reconcile_stats(batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Исправлено строк со счётчиками: {fixed}')
+        )
@@ -0,0 +1,57 @@
+"""Команда построения миниатюр всех изображений постов."""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts.models import Post
+from posts.thumbnails import regenerate_thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Строит миниатюры изображений всех постов на всех ядрах CPU.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='Количество процессов. При 1 работает без пула.',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Удалить и построить заново уже существующие миниатюры.',
+        )
+
+    def handle(self, *args, **options):
+        images = list(
+            Post.objects.exclude(image='')
+            .order_by('pk')
+            .values_list('image', flat=True)
+        )
+        task = partial(regenerate_thumbnails, force=options['force'])
+
+        if options['workers'] <= 1:
+            errors = [error for error in map(task, images) if error]
+        else:
+            # Дочерние процессы не должны наследовать открытые соединения
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+                chunksize = max(1, len(images) // (options['workers'] * 4))
+                errors = [
+                    error
+                    for error in pool.map(task, images, chunksize=chunksize)
+                    if error
+                ]
+
+        for error in errors:
+            self.stderr.write(error)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Обработано изображений: {len(images) - len(errors)}, '
+                f'ошибок: {len(errors)}'
+            )
+        )
@@ -0,0 +1,31 @@
+"""Команда переноса картинок постов в хранилище по содержимому."""
+from django.core.management.base import BaseCommand
+
+from posts.constants import MEDIA_RELOCATE_BATCH_SIZE
+from posts.images import relocate_images
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит картинки постов в каталоги по хэшу содержимого '
+        'и обновляет пути в БД.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=MEDIA_RELOCATE_BATCH_SIZE,
+            help='Количество постов, обновляемых в одной транзакции.',
+        )
+
+    def handle(self, *args, **options):
+        moved, missing = relocate_images(batch_size=options['batch_size'])
+        for name in missing:
+            self.stderr.write(f'Файл не найден: {name}')
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Перенесено картинок: {moved}, '
+                f'не найдено: {len(missing)}'
+            )
+        )
@@ -0,0 +1,77 @@
+"""Команда генерации большого набора данных для бенчмарков."""
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.cache import bump_generation
+from posts.constants import SEED_BATCH_SIZE, SEED_RANDOM_SEED
+from posts.seeding import seed
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт воспроизводимый набор пользователей, сообществ, постов, '
+        'комментариев и подписок со степенным распределением активности '
+        'и популярности. Предназначена для баз бенчмарков: на время '
+        'загрузки отключается синхронная запись SQLite.'
+    )
+
+    def add_arguments(self, parser):
+        for name, default, help_text in (
+            ('users', 1000, 'Количество пользователей.'),
+            ('groups', 20, 'Количество сообществ.'),
+            ('posts', 10_000, 'Количество постов.'),
+            ('comments', 20_000, 'Количество комментариев.'),
+            ('follows', 10_000, 'Примерное количество подписок.'),
+        ):
+            parser.add_argument(
+                f'--{name}',
+                type=int,
+                default=default,
+                help=help_text,
+            )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=SEED_RANDOM_SEED,
+            help='Зерно генератора случайных чисел.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=SEED_BATCH_SIZE,
+            help='Количество объектов, вставляемых в одной транзакции.',
+        )
+
+    def _progress(self, model_name, rows, seconds):
+        if self.verbosity >= 2:
+            self.stdout.write(f'{model_name}: {rows}, {seconds:.1f} с')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        try:
+            report = seed(
+                options['users'],
+                groups=options['groups'],
+                posts=options['posts'],
+                comments=options['comments'],
+                follows=options['follows'],
+                seed=options['seed'],
+                batch_size=options['batch_size'],
+                progress=self._progress,
+            )
+        except ValueError as error:
+            raise CommandError(error)
+
+        # bulk_create не вызывает сигналы, поэтому кэш страниц
+        # сбрасывается после генерации целиком
+        bump_generation()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Пользователей: {report["users"]}, '
+                f'сообществ: {report["groups"]}, '
+                f'постов: {report["posts"]}, '
+                f'комментариев: {report["comments"]}, '
+                f'подписок: {report["follows"]}, '
+                f'записей в лентах: {report["timeline"]}, '
+                f'{report["seconds"]:.1f} с'
+            )
+        )
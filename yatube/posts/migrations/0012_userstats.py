@@ -0,0 +1,29 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:35
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0011_post_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(help_text='Пользователь, для которого ведутся счётчики', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('posts_count', models.IntegerField(default=0, help_text='Количество публикаций пользователя', verbose_name='Публикаций')),
+                ('following_count', models.IntegerField(default=0, help_text='Количество авторов, на которых подписан пользователь', verbose_name='Подписок')),
+                ('followers_count', models.IntegerField(default=0, help_text='Количество пользователей, подписанных на автора', verbose_name='Подписчиков')),
+            ],
+            options={
+                'verbose_name': 'Статистика пользователя',
+                'verbose_name_plural': 'Статистика пользователей',
+            },
+        ),
+    ]
@@ -0,0 +1,89 @@
+"""Полнотекстовый индекс FTS5 по текстам постов и комментариев.
+
+Индекс - виртуальная таблица posts_search: rowid совпадает с id поста,
+колонка text - текст поста, comments - тексты его комментариев через
+пробел. Триггеры поддерживают таблицу в актуальном состоянии при любых
+изменениях, в том числе через bulk_create и update(). Индекс создаётся
+только на SQLite, на других СУБД поиск работает через LIKE.
+"""
+from django.db import migrations
+
+POST_COMMENTS = (
+    "coalesce((SELECT group_concat(c.text, ' ') FROM posts_comment c "
+    "WHERE c.post_id = {post_id}), '')"
+)
+
+CREATE_SQL = [
+    "CREATE VIRTUAL TABLE posts_search USING fts5("
+    "text, comments, tokenize = 'unicode61 remove_diacritics 2')",
+    "INSERT INTO posts_search(rowid, text, comments) "
+    "SELECT p.id, p.text, " + POST_COMMENTS.format(post_id='p.id')
+    + " FROM posts_post p",
+    "CREATE TRIGGER posts_search_post_insert AFTER INSERT ON posts_post "
+    "BEGIN "
+    "INSERT INTO posts_search(rowid, text, comments) "
+    "VALUES (new.id, new.text, ''); "
+    "END",
+    "CREATE TRIGGER posts_search_post_update AFTER UPDATE OF text "
+    "ON posts_post BEGIN "
+    "UPDATE posts_search SET text = new.text WHERE rowid = new.id; "
+    "END",
+    "CREATE TRIGGER posts_search_post_delete AFTER DELETE ON posts_post "
+    "BEGIN "
+    "DELETE FROM posts_search WHERE rowid = old.id; "
+    "END",
+    # Новый комментарий дописывается в конец, без пересборки колонки
+    "CREATE TRIGGER posts_search_comment_insert AFTER INSERT "
+    "ON posts_comment BEGIN "
+    "UPDATE posts_search SET comments = comments || ' ' || new.text "
+    "WHERE rowid = new.post_id; "
+    "END",
+    "CREATE TRIGGER posts_search_comment_update AFTER UPDATE OF text, post_id "
+    "ON posts_comment BEGIN "
+    "UPDATE posts_search SET comments = "
+    + POST_COMMENTS.format(post_id='old.post_id')
+    + " WHERE rowid = old.post_id; "
+    "UPDATE posts_search SET comments = "
+    + POST_COMMENTS.format(post_id='new.post_id')
+    + " WHERE rowid = new.post_id; "
+    "END",
+    "CREATE TRIGGER posts_search_comment_delete AFTER DELETE "
+    "ON posts_comment BEGIN "
+    "UPDATE posts_search SET comments = "
+    + POST_COMMENTS.format(post_id='old.post_id')
+    + " WHERE rowid = old.post_id; "
+    "END",
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS posts_search_comment_delete',
+    'DROP TRIGGER IF EXISTS posts_search_comment_update',
+    'DROP TRIGGER IF EXISTS posts_search_comment_insert',
+    'DROP TRIGGER IF EXISTS posts_search_post_delete',
+    'DROP TRIGGER IF EXISTS posts_search_post_update',
+    'DROP TRIGGER IF EXISTS posts_search_post_insert',
+    'DROP TABLE IF EXISTS posts_search',
+]
+
+
+def _execute_on_sqlite(statements):
+    def execute(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return execute
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_post_image_storage'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _execute_on_sqlite(CREATE_SQL),
+            _execute_on_sqlite(DROP_SQL),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_comment_created_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostCounter',
+            fields=[
+                ('scope', models.CharField(help_text='Что считает счётчик: все посты или посты сообщества', max_length=32, primary_key=True, serialize=False, verbose_name='Область')),
+                ('posts_count', models.IntegerField(default=0, help_text='Количество публикаций в области', verbose_name='Публикаций')),
+            ],
+            options={
+                'verbose_name': 'Счётчик публикаций',
+                'verbose_name_plural': 'Счётчики публикаций',
+            },
+        ),
+    ]
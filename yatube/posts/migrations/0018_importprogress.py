@@ -0,0 +1,26 @@
+# Generated by Django 2.2.16 on 2026-10-18 21:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_postcounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportProgress',
+            fields=[
+                ('key', models.CharField(help_text='Имя импорта, по умолчанию путь к файлу источника', max_length=255, primary_key=True, serialize=False, verbose_name='Ключ')),
+                ('source', models.CharField(help_text='Абсолютный путь к импортируемому файлу', max_length=255, verbose_name='Источник')),
+                ('model', models.CharField(help_text='Тип импортируемых записей', max_length=32, verbose_name='Тип записей')),
+                ('rows', models.IntegerField(default=0, help_text='Количество уже обработанных записей источника', verbose_name='Записей')),
+            ],
+            options={
+                'verbose_name': 'Ход импорта',
+                'verbose_name_plural': 'Ход импорта',
+            },
+        ),
+    ]
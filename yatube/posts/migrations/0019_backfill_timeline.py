@@ -0,0 +1,43 @@
+from itertools import islice
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def backfill_timeline(apps, schema_editor):
+    """Заполняет ленты подписок по подпискам, сделанным до появления
+    TimelineEntry: без этого страница «Избранные авторы» пуста."""
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+
+    entries = (
+        TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for user_id, author_id in Follow.objects.order_by('pk').values_list(
+            'user_id',
+            'author_id',
+        ).iterator()
+        for post_id, pub_date in Post.objects.filter(
+            author_id=author_id,
+        ).values_list('pk', 'pub_date').iterator()
+    )
+    while True:
+        batch = list(islice(entries, BATCH_SIZE))
+        if not batch:
+            return
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_importprogress'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            backfill_timeline,
+            migrations.RunPython.noop,
+        ),
+    ]
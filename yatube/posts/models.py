@@ -3,6 +3,7 @@ from django.contrib.auth import get_user_model
 from django.db import models
 
 from posts.constants import MAX_PRESENTATION_LENGTH
+from posts.storage import ContentAddressedStorage
 
 User = get_user_model()
 
@@ -70,8 +71,16 @@ class Post(models.Model):
     image = models.ImageField(
         verbose_name='Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True,
     )
+    image_variants = models.TextField(
+        verbose_name='Варианты картинки',
+        help_text='Адаптивные варианты картинки в формате JSON.',
+        blank=True,
+        default='',
+        editable=False,
+    )
 
     class Meta:
         """Класс для дополнительных параметров модели."""
@@ -79,6 +88,20 @@ class Post(models.Model):
         ordering = ('-pub_date',)
         verbose_name = 'Публикация'
         verbose_name_plural = 'Публикации'
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_idx',
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx',
+            ),
+        ]
 
     def __str__(self) -> str:
         """Возвращает описание модели."""
@@ -120,6 +143,17 @@ class Comment(models.Model):
         ordering = ('-created',)
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=['post', '-created'],
+                name='comment_post_created_idx',
+            ),
+            # Сортировка списка комментариев в административной панели
+            models.Index(
+                fields=['-created', '-id'],
+                name='comment_created_idx',
+            ),
+        ]
 
     def __str__(self) -> str:
         return (
@@ -148,6 +182,184 @@ class Follow(models.Model):
     class Meta:
         verbose_name = 'Подписчики'
         verbose_name_plural = 'Подписчики'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_follow',
+            ),
+        ]
 
     def __str__(self):
         return f'{self.user.username} -> {self.author.username}'
+
+
+class TimelineEntry(models.Model):
+    """Запись материализованной ленты подписок пользователя.
+
+    Лента заполняется при публикации поста (fan-out on write) и
+    подрезается при отписке, поэтому страница «Избранные авторы»
+    читается одним диапазоном по индексу (user, -pub_date).
+    """
+
+    user = models.ForeignKey(
+        User,
+        related_name='timeline',
+        on_delete=models.CASCADE,
+        verbose_name='Читатель',
+        help_text='Пользователь, которому показывается запись',
+    )
+    post = models.ForeignKey(
+        Post,
+        related_name='timeline_entries',
+        on_delete=models.CASCADE,
+        verbose_name='Публикация',
+        help_text='Публикация автора, на которого подписан читатель',
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации',
+        help_text='Копия даты публикации поста для сортировки ленты',
+    )
+
+    class Meta:
+        """Класс для дополнительных параметров модели."""
+
+        ordering = ('-pub_date',)
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx',
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_entry',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user.username} <- {self.post_id}'
+
+
+class UserStats(models.Model):
+    """Денормализованные счётчики пользователя.
+
+    Обновляются атомарно через F() при создании и удалении постов и
+    подписок, поэтому страницы профиля и поста не выполняют COUNT.
+    """
+
+    user = models.OneToOneField(
+        User,
+        related_name='stats',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        verbose_name='Пользователь',
+        help_text='Пользователь, для которого ведутся счётчики',
+    )
+    posts_count = models.IntegerField(
+        default=0,
+        verbose_name='Публикаций',
+        help_text='Количество публикаций пользователя',
+    )
+    following_count = models.IntegerField(
+        default=0,
+        verbose_name='Подписок',
+        help_text='Количество авторов, на которых подписан пользователь',
+    )
+    followers_count = models.IntegerField(
+        default=0,
+        verbose_name='Подписчиков',
+        help_text='Количество пользователей, подписанных на автора',
+    )
+
+    class Meta:
+        """Класс для дополнительных параметров модели."""
+
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+
+    def __str__(self):
+        return (
+            f'{self.user.username}: {self.posts_count}/'
+            f'{self.following_count}/{self.followers_count}'
+        )
+
+
+class PostCounter(models.Model):
+    """Денормализованные счётчики постов всего сайта и сообществ.
+
+    Строка TOTAL хранит количество всех постов, строки group_scope(id) -
+    количество постов сообщества. Как и UserStats, обновляются атомарно
+    через F(), поэтому постраничный вывод ленты и сообщества не
+    выполняет COUNT.
+    """
+
+    TOTAL = 'total'
+
+    scope = models.CharField(
+        max_length=32,
+        primary_key=True,
+        verbose_name='Область',
+        help_text='Что считает счётчик: все посты или посты сообщества',
+    )
+    posts_count = models.IntegerField(
+        default=0,
+        verbose_name='Публикаций',
+        help_text='Количество публикаций в области',
+    )
+
+    class Meta:
+        """Класс для дополнительных параметров модели."""
+
+        verbose_name = 'Счётчик публикаций'
+        verbose_name_plural = 'Счётчики публикаций'
+
+    def __str__(self):
+        return f'{self.scope}: {self.posts_count}'
+
+    @staticmethod
+    def group_scope(group_id):
+        """Возвращает область счётчика постов сообщества."""
+        return f'group:{group_id}'
+
+
+class ImportProgress(models.Model):
+    """Ход прерываемого импорта (posts.importer).
+
+    Количество обработанных записей источника обновляется в той же
+    транзакции, что и вставка пакета, поэтому после сбоя импорт
+    продолжается ровно после последнего зафиксированного пакета.
+    """
+
+    key = models.CharField(
+        max_length=255,
+        primary_key=True,
+        verbose_name='Ключ',
+        help_text='Имя импорта, по умолчанию путь к файлу источника',
+    )
+    source = models.CharField(
+        max_length=255,
+        verbose_name='Источник',
+        help_text='Абсолютный путь к импортируемому файлу',
+    )
+    model = models.CharField(
+        max_length=32,
+        verbose_name='Тип записей',
+        help_text='Тип импортируемых записей',
+    )
+    rows = models.IntegerField(
+        default=0,
+        verbose_name='Записей',
+        help_text='Количество уже обработанных записей источника',
+    )
+
+    class Meta:
+        """Класс для дополнительных параметров модели."""
+
+        verbose_name = 'Ход импорта'
+        verbose_name_plural = 'Ход импорта'
+
+    def __str__(self):
+        return f'{self.model} из {self.source}: {self.rows}'
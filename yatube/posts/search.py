@@ -0,0 +1,110 @@
+"""Полнотекстовый поиск по постам и комментариям.
+
+На SQLite поиск идёт по индексу FTS5 posts_search (см. миграцию
+0015_post_search) и ранжируется функцией bm25: совпадения в тексте
+поста весят больше совпадений в комментариях. На других СУБД индекса
+нет, и поиск выполняется через LIKE по тексту поста.
+"""
+import re
+
+from django.db import connection
+
+from posts.constants import (
+    MAX_POSTS_ON_PAGE,
+    SEARCH_MAX_CANDIDATES,
+    SEARCH_MAX_RESULTS,
+    SEARCH_MAX_TERMS,
+    SEARCH_WEIGHTS,
+)
+from posts.models import Post
+from posts.utils import WindowedPaginator
+
+SEARCH_TABLE = 'posts_search'
+# Слова запроса. Знаки препинания и операторы FTS5 отбрасываются, чтобы
+# пользовательский ввод не разбирался как синтаксис запроса.
+SEARCH_TERM_RE = re.compile(r'\w+')
+# Ранжируются только самые новые совпадения: FTS5 перебирает их по
+# rowid без подсчёта bm25, а затем ранжирует не больше
+# SEARCH_MAX_CANDIDATES строк.
+RANKED_SEARCH_SQL = f"""
+    SELECT rowid FROM {SEARCH_TABLE}
+    WHERE {SEARCH_TABLE} MATCH %s AND rowid >= coalesce((
+        SELECT min(rowid) FROM (
+            SELECT rowid FROM {SEARCH_TABLE}
+            WHERE {SEARCH_TABLE} MATCH %s
+            ORDER BY rowid DESC LIMIT %s
+        )
+    ), 0)
+    ORDER BY bm25({SEARCH_TABLE}, %s, %s), rowid DESC
+    LIMIT %s
+"""
+
+
+def build_match_query(text):
+    """Возвращает запрос MATCH, где все слова должны встретиться."""
+    terms = SEARCH_TERM_RE.findall(text)[:SEARCH_MAX_TERMS]
+    return ' '.join(f'"{term}"' for term in terms)
+
+
+def is_search_indexed():
+    """Проверяет, есть ли в текущей БД полнотекстовый индекс."""
+    return connection.vendor == 'sqlite'
+
+
+def filter_posts(queryset, text):
+    """Оставляет в выборке посты, найденные по запросу.
+
+    Порядок выборки не меняется, поэтому функция подходит для списков
+    со своей сортировкой, например, для административной панели.
+    """
+    match = build_match_query(text)
+    if not match:
+        return queryset.none()
+    if not is_search_indexed():
+        return queryset.filter(text__icontains=text)
+    # Не filter(id__in=RawSQL(...)): Django оборачивает подзапрос во
+    # вторые скобки, и SQLite сравнивает id только с первой строкой
+    return queryset.extra(
+        where=[
+            f'{Post._meta.db_table}.id IN (SELECT rowid FROM {SEARCH_TABLE} '
+            f'WHERE {SEARCH_TABLE} MATCH %s)'
+        ],
+        params=[match],
+    )
+
+
+def search_post_ids(text):
+    """Возвращает id найденных постов от лучших к худшим."""
+    match = build_match_query(text)
+    if not match:
+        return []
+    if not is_search_indexed():
+        return list(
+            Post.objects.filter(text__icontains=text)
+            .order_by('-pub_date', '-id')
+            .values_list('id', flat=True)[:SEARCH_MAX_RESULTS]
+        )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            RANKED_SEARCH_SQL,
+            [match, match, SEARCH_MAX_CANDIDATES, *SEARCH_WEIGHTS,
+             SEARCH_MAX_RESULTS],
+        )
+        return [post_id for post_id, in cursor.fetchall()]
+
+
+def build_search_page(queryset, text, page_number):
+    """Возвращает страницу найденных постов.
+
+    Постраничный вывод идёт по списку id, поэтому отдельный COUNT не
+    нужен, а посты загружаются только для текущей страницы.
+    """
+    page = WindowedPaginator(
+        search_post_ids(text),
+        MAX_POSTS_ON_PAGE,
+    ).get_page(page_number)
+    posts = queryset.in_bulk(page.object_list)
+    page.object_list = [
+        posts[post_id] for post_id in page.object_list if post_id in posts
+    ]
+    return page
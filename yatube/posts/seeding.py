@@ -0,0 +1,450 @@
+"""Генератор больших воспроизводимых наборов данных для бенчмарков.
+
+Пользователи, сообщества, посты, комментарии и подписки создаются из
+генератора случайных чисел с фиксированным зерном, поэтому одно и то же
+зерно даёт те же тексты, авторов и связи (даты отсчитываются от момента
+запуска). Словарь текстов и имена пользователей берутся из Faker.
+
+Активность и популярность распределены по степенному закону (Zipf):
+вес пользователя или поста ранга r пропорционален 1 / r ** s. Так
+немногие авторы пишут большую часть постов, немногие авторы собирают
+большую часть подписчиков, а обсуждения сосредоточены на немногих
+постах. Ранги активности, популярности и числа подписок назначаются
+независимыми перестановками пользователей.
+
+Объекты вставляются через bulk_create пакетами с явными первичными
+ключами, продолжающими существующие, поэтому ссылки между объектами
+известны без запросов к БД. Счётчики пользователей считаются по ходу
+генерации, а ленты подписок заполняются одним INSERT ... SELECT на
+пакет подписчиков: сигналы при bulk_create не срабатывают. Триггеры
+полнотекстового индекса на вставку постов и комментариев на время
+загрузки снимаются, и новые посты индексируются одним проходом.
+"""
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+
+from posts.constants import (
+    SEED_ACTIVITY_EXPONENT,
+    SEED_BATCH_SIZE,
+    SEED_COMMENT_DELAY_HOURS,
+    SEED_COMMENT_WORDS,
+    SEED_FOLLOW_OVERSAMPLING,
+    SEED_FOLLOWING_EXPONENT,
+    SEED_GROUP_SHARE,
+    SEED_NAMES_SIZE,
+    SEED_PERIOD_DAYS,
+    SEED_POPULARITY_EXPONENT,
+    SEED_POST_WORDS,
+    SEED_RANDOM_SEED,
+    SEED_VOCABULARY_SIZE,
+)
+from posts.models import (
+    Comment,
+    Follow,
+    Group,
+    Post,
+    TimelineEntry,
+    User,
+    UserStats,
+)
+from posts.search import SEARCH_TABLE, is_search_indexed
+from posts.stats import reconcile_post_counts
+
+# Настройки SQLite на время загрузки: без ожидания записи на диск и с
+# журналом отката в памяти. Сбой посреди генерации может испортить
+# базу, поэтому генератор предназначен только для баз бенчмарков.
+LOADING_PRAGMAS = {
+    'synchronous': 'OFF',
+    'journal_mode': 'MEMORY',
+    'temp_store': 'MEMORY',
+    'cache_size': -256 * 1024,
+}
+# Триггеры индекса, которые заменяет индексация после загрузки: иначе
+# каждый комментарий перезаписывает документ поста со всеми его
+# комментариями, и популярные посты загружаются за квадратичное время
+SEARCH_INSERT_TRIGGERS = (
+    'posts_search_post_insert',
+    'posts_search_comment_insert',
+)
+USERNAME_PREFIX = 'seed'
+GROUP_SLUG_PREFIX = 'seed-'
+
+TIMELINE_SQL = (
+    'INSERT INTO {timeline} (user_id, post_id, pub_date) '
+    'SELECT follow.user_id, post.id, post.pub_date '
+    'FROM {follow} AS follow '
+    'JOIN {post} AS post ON post.author_id = follow.author_id '
+    'WHERE follow.id > %s AND follow.user_id BETWEEN %s AND %s'
+)
+
+SEARCH_INDEX_SQL = (
+    'INSERT INTO {search} (rowid, text, comments) '
+    'SELECT post.id, post.text, coalesce(('
+    "SELECT group_concat(comment.text, ' ') FROM {comment} AS comment "
+    "WHERE comment.post_id = post.id), '') "
+    'FROM {post} AS post WHERE post.id BETWEEN %s AND %s'
+)
+
+
+def zipf_cum_weights(size, exponent):
+    """Возвращает накопленные веса рангов 1..size для random.choices."""
+    return list(accumulate(
+        rank ** -exponent for rank in range(1, size + 1)
+    ))
+
+
+@contextmanager
+def loading_pragmas():
+    """Настраивает SQLite на быструю загрузку и возвращает настройки.
+
+    Внутри транзакции SQLite не позволяет менять эти настройки, и
+    загрузка идёт с текущими.
+    """
+    if connection.vendor != 'sqlite' or connection.in_atomic_block:
+        yield
+        return
+    with connection.cursor() as cursor:
+        saved = {}
+        for name, value in LOADING_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name}')
+            saved[name] = cursor.fetchone()[0]
+            cursor.execute(f'PRAGMA {name} = {value}')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for name, value in saved.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@contextmanager
+def deferred_search_index():
+    """Снимает триггеры индекса на вставку и восстанавливает их."""
+    if not is_search_indexed():
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name, sql FROM sqlite_master "
+            "WHERE type = 'trigger' AND name IN (%s, %s)",
+            SEARCH_INSERT_TRIGGERS,
+        )
+        triggers = cursor.fetchall()
+        for name, _ in triggers:
+            cursor.execute(f'DROP TRIGGER {name}')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for _, sql in triggers:
+                cursor.execute(sql)
+
+
+def _next_id(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+class Seeder:
+    """Генерирует набор данных и вставляет его в БД пакетами."""
+
+    def __init__(
+        self,
+        seed=SEED_RANDOM_SEED,
+        batch_size=SEED_BATCH_SIZE,
+        progress=None,
+    ):
+        self.random = random.Random(seed)
+        self.batch_size = batch_size
+        self.progress = progress
+        fake = Faker('ru_RU')
+        fake.seed_instance(seed)
+        self.words = fake.words(nb=SEED_VOCABULARY_SIZE, unique=True)
+        self.first_names = [
+            fake.first_name() for _ in range(SEED_NAMES_SIZE)
+        ]
+        self.last_names = [fake.last_name() for _ in range(SEED_NAMES_SIZE)]
+        self.now = timezone.now()
+        self.started = time.perf_counter()
+
+    def _text(self, bounds):
+        words = self.random.choices(self.words, k=self.random.randint(*bounds))
+        return ' '.join(words).capitalize() + '.'
+
+    def _choices(self, cum_weights, total):
+        """Выдаёт total рангов с весами cum_weights, выбирая их пакетами."""
+        population = range(len(cum_weights))
+        for start in range(0, total, self.batch_size):
+            yield from self.random.choices(
+                population,
+                cum_weights=cum_weights,
+                k=min(self.batch_size, total - start),
+            )
+
+    def _permutation(self, size):
+        """Возвращает случайное соответствие рангов номерам объектов."""
+        order = list(range(size))
+        self.random.shuffle(order)
+        return order
+
+    def _insert(self, model, objects):
+        """Вставляет объекты пакетами, каждый в своей транзакции."""
+        objects = iter(objects)
+        inserted = 0
+        while True:
+            batch = list(islice(objects, self.batch_size))
+            if not batch:
+                return inserted
+            with transaction.atomic():
+                model.objects.bulk_create(batch)
+            inserted += len(batch)
+            if self.progress:
+                self.progress(
+                    model._meta.model_name,
+                    inserted,
+                    time.perf_counter() - self.started,
+                )
+
+    def users(self, count):
+        password = make_password(None)
+        for number in range(count):
+            pk = self.user_id + number
+            yield User(
+                id=pk,
+                username=f'{USERNAME_PREFIX}{pk}',
+                password=password,
+                first_name=self.random.choice(self.first_names),
+                last_name=self.random.choice(self.last_names),
+                date_joined=self.now,
+            )
+
+    def groups(self, count):
+        for number in range(count):
+            pk = self.group_id + number
+            yield Group(
+                id=pk,
+                title=self._text((1, 3)).rstrip('.'),
+                slug=f'{GROUP_SLUG_PREFIX}{pk}',
+                description=self._text(SEED_COMMENT_WORDS),
+            )
+
+    def post_date(self, number):
+        """Дата поста: посты равномерно заполняют период по порядку id."""
+        return self.period_start + self.post_step * (number + 0.5)
+
+    def posts(self, count, users, groups):
+        authors = self._choices(
+            zipf_cum_weights(users, SEED_ACTIVITY_EXPONENT),
+            count,
+        )
+        group_weights = zipf_cum_weights(groups, SEED_POPULARITY_EXPONENT)
+        for number, author in enumerate(authors):
+            self.posts_count[author] += 1
+            group_id = None
+            if groups and self.random.random() < SEED_GROUP_SHARE:
+                group_id = self.group_id + self.random.choices(
+                    range(groups),
+                    cum_weights=group_weights,
+                )[0]
+            yield Post(
+                id=self.post_id + number,
+                text=self._text(SEED_POST_WORDS),
+                author_id=self.user_id + author,
+                group_id=group_id,
+                pub_date=self.post_date(number),
+            )
+
+    def comments(self, count, users, posts):
+        post_order = self._permutation(posts)
+        ranks = self._choices(
+            zipf_cum_weights(posts, SEED_POPULARITY_EXPONENT),
+            count,
+        )
+        authors = self._choices(
+            zipf_cum_weights(users, SEED_ACTIVITY_EXPONENT),
+            count,
+        )
+        delay = 1 / SEED_COMMENT_DELAY_HOURS
+        for number, (rank, author) in enumerate(zip(ranks, authors)):
+            post = post_order[rank]
+            created = self.post_date(post) + timedelta(
+                hours=self.random.expovariate(delay),
+            )
+            yield Comment(
+                id=self.comment_id + number,
+                text=self._text(SEED_COMMENT_WORDS),
+                post_id=self.post_id + post,
+                author_id=self.user_id + author,
+                created=min(created, self.now),
+            )
+
+    def follows(self, count, users):
+        """Подписки: число подписок и популярность авторов - по Zipf.
+
+        Авторы выбираются с повторами, поэтому самые активные
+        пользователи получают меньше подписок, чем им положено, если
+        среди выбранных не хватило разных авторов.
+        """
+        popular = self._permutation(users)
+        following = self._permutation(users)
+        popularity = zipf_cum_weights(users, SEED_POPULARITY_EXPONENT)
+        quota_weights = zipf_cum_weights(users, SEED_FOLLOWING_EXPONENT)
+        scale = count / quota_weights[-1] if users else 0
+        number = 0
+        for rank, user in enumerate(following):
+            weight = quota_weights[rank] - (
+                quota_weights[rank - 1] if rank else 0
+            )
+            # Случайное округление сохраняет общее число подписок
+            quota = min(
+                users - 1,
+                int(weight * scale + self.random.random()),
+            )
+            if quota <= 0:
+                continue
+            draws = self.random.choices(
+                popular,
+                cum_weights=popularity,
+                k=quota * SEED_FOLLOW_OVERSAMPLING,
+            )
+            authors = [author for author in draws if author != user]
+            for author in list(dict.fromkeys(authors))[:quota]:
+                self.following_count[user] += 1
+                self.followers_count[author] += 1
+                yield Follow(
+                    id=self.follow_id + number,
+                    user_id=self.user_id + user,
+                    author_id=self.user_id + author,
+                )
+                number += 1
+
+    def stats(self, users):
+        for number in range(users):
+            yield UserStats(
+                user_id=self.user_id + number,
+                posts_count=self.posts_count[number],
+                following_count=self.following_count[number],
+                followers_count=self.followers_count[number],
+            )
+
+    def fill_timelines(self, users):
+        """Заполняет ленты подписчиков постами их авторов."""
+        sql = TIMELINE_SQL.format(
+            timeline=TimelineEntry._meta.db_table,
+            follow=Follow._meta.db_table,
+            post=Post._meta.db_table,
+        )
+        inserted = 0
+        for start in range(0, users, self.batch_size):
+            first = self.user_id + start
+            last = self.user_id + min(users, start + self.batch_size) - 1
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(sql, [self.follow_id - 1, first, last])
+                inserted += cursor.rowcount
+            if self.progress:
+                self.progress(
+                    TimelineEntry._meta.model_name,
+                    inserted,
+                    time.perf_counter() - self.started,
+                )
+        return inserted
+
+    def fill_search_index(self, posts):
+        """Добавляет в полнотекстовый индекс новые посты."""
+        if not is_search_indexed():
+            return
+        sql = SEARCH_INDEX_SQL.format(
+            search=SEARCH_TABLE,
+            comment=Comment._meta.db_table,
+            post=Post._meta.db_table,
+        )
+        for start in range(0, posts, self.batch_size):
+            first = self.post_id + start
+            last = self.post_id + min(posts, start + self.batch_size) - 1
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(sql, [first, last])
+            if self.progress:
+                self.progress(
+                    SEARCH_TABLE,
+                    last - self.post_id + 1,
+                    time.perf_counter() - self.started,
+                )
+
+    def run(self, users, groups=0, posts=0, comments=0, follows=0):
+        """Создаёт объекты и возвращает их количество по моделям."""
+        if users < 2 and (posts or comments or follows):
+            raise ValueError(
+                'Для постов, комментариев и подписок нужно хотя бы '
+                'два пользователя'
+            )
+        if comments and not posts:
+            raise ValueError('Для комментариев нужны посты')
+        self.user_id = _next_id(User)
+        self.group_id = _next_id(Group)
+        self.post_id = _next_id(Post)
+        self.comment_id = _next_id(Comment)
+        self.follow_id = _next_id(Follow)
+        self.period_start = self.now - timedelta(days=SEED_PERIOD_DAYS)
+        self.post_step = timedelta(days=SEED_PERIOD_DAYS) / max(posts, 1)
+        self.posts_count = [0] * users
+        self.following_count = [0] * users
+        self.followers_count = [0] * users
+
+        report = {}
+        with loading_pragmas():
+            report['users'] = self._insert(User, self.users(users))
+            report['groups'] = self._insert(Group, self.groups(groups))
+            with deferred_search_index():
+                report['posts'] = self._insert(
+                    Post,
+                    self.posts(posts, users, groups),
+                )
+                report['comments'] = self._insert(
+                    Comment,
+                    self.comments(comments, users, posts),
+                )
+                self.fill_search_index(posts)
+            report['follows'] = self._insert(
+                Follow,
+                self.follows(follows, users),
+            )
+            self._insert(UserStats, self.stats(users))
+            reconcile_post_counts()
+            report['timeline'] = self.fill_timelines(users)
+        report['seconds'] = time.perf_counter() - self.started
+        return report
+
+
+def seed(
+    users,
+    groups=0,
+    posts=0,
+    comments=0,
+    follows=0,
+    seed=SEED_RANDOM_SEED,
+    batch_size=SEED_BATCH_SIZE,
+    progress=None,
+):
+    """Создаёт набор данных заданного размера.
+
+    Возвращает словарь с количеством созданных объектов по моделям
+    (users, groups, posts, comments, follows, timeline) и временем
+    работы seconds. progress(model_name, rows, seconds) вызывается после
+    каждого пакета.
+    """
+    seeder = Seeder(seed=seed, batch_size=batch_size, progress=progress)
+    return seeder.run(
+        users,
+        groups=groups,
+        posts=posts,
+        comments=comments,
+        follows=follows,
+    )
@@ -0,0 +1,153 @@
+"""Обработчики сигналов моделей приложения Posts."""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from posts import stats, thumbnails, timeline, variants
+from posts.cache import bump_generation
+from posts.models import Comment, Follow, Group, Post, PostCounter
+
+# Значение отложенного поля, которое не загружалось из БД
+_UNKNOWN = object()
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, raw=False, **kwargs):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if created and not raw:
+        timeline.fan_out_post(instance)
+
+
+@receiver(post_save, sender=Follow)
+def fill_timeline_on_follow(sender, instance, created, raw=False, **kwargs):
+    """Добавляет посты автора в ленту нового подписчика."""
+    if created and not raw:
+        timeline.add_author_to_timeline(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def trim_timeline_on_unfollow(sender, instance, **kwargs):
+    """Убирает посты автора из ленты отписавшегося пользователя."""
+    timeline.remove_author_from_timeline(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, raw=False, **kwargs):
+    """Увеличивает счётчики публикаций автора, сайта и сообщества."""
+    if created and not raw:
+        stats.increase_stats(instance.author_id, posts_count=1)
+        stats.increase_post_counts(stats.post_scopes(instance.group_id), 1)
+
+
+@receiver(post_save, sender=Post)
+def count_moved_post(sender, instance, created, raw=False, **kwargs):
+    """Переносит пост между счётчиками сообществ при смене сообщества."""
+    original = instance._original_group_id
+    if not created and not raw and original is not _UNKNOWN and (
+        original != instance.group_id
+    ):
+        stats.change_post_counts(
+            stats.post_scopes(original, total=False),
+            -1,
+        )
+        stats.increase_post_counts(
+            stats.post_scopes(instance.group_id, total=False),
+            1,
+        )
+    instance._original_group_id = instance.__dict__.get('group_id', _UNKNOWN)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    """Уменьшает счётчики публикаций автора, сайта и сообщества."""
+    stats.change_stats(instance.author_id, posts_count=-1)
+    stats.change_post_counts(stats.post_scopes(instance.group_id), -1)
+
+
+@receiver(post_delete, sender=Group)
+def delete_group_counter(sender, instance, **kwargs):
+    """Удаляет счётчик постов удалённого сообщества."""
+    PostCounter.objects.filter(
+        scope=PostCounter.group_scope(instance.pk),
+    ).delete()
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follow(sender, instance, created, raw=False, **kwargs):
+    """Увеличивает счётчики подписок читателя и подписчиков автора."""
+    if created and not raw:
+        stats.increase_stats(instance.user_id, following_count=1)
+        stats.increase_stats(instance.author_id, followers_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    """Уменьшает счётчики подписок читателя и подписчиков автора."""
+    stats.change_stats(instance.user_id, following_count=-1)
+    stats.change_stats(instance.author_id, followers_count=-1)
+
+
+def _image_name(post):
+    # Читаем значение поля напрямую: дескриптор FileField создал бы
+    # FieldFile для каждого загруженного из БД поста
+    image = post.__dict__.get('image')
+    return getattr(image, 'name', image) or ''
+
+
+def _delete_image_files(post, image_name):
+    # Одинаковые картинки хранятся одним файлом (posts.storage), поэтому
+    # миниатюры и варианты удаляем, только если файл больше ничей
+    if Post.objects.filter(image=image_name).exclude(pk=post.pk).exists():
+        return
+    thumbnails.delete_thumbnails(image_name)
+    variants.delete_variants(variants.load_variants(post))
+
+
+@receiver(post_init, sender=Post)
+def remember_original(sender, instance, **kwargs):
+    """Запоминает изображение и сообщество поста, чтобы заметить их
+    замену."""
+    instance._original_image = _image_name(instance)
+    # Отложенное поле не загружаем: save() без него поле не сохранит
+    instance._original_group_id = instance.__dict__.get('group_id', _UNKNOWN)
+
+
+@receiver(post_save, sender=Post)
+def delete_replaced_thumbnails(sender, instance, created, raw=False,
+                               **kwargs):
+    """Удаляет миниатюры и варианты изображения, которое заменили или
+    убрали."""
+    image = _image_name(instance)
+    if not created and not raw and instance._original_image not in (
+        '',
+        image,
+    ):
+        _delete_image_files(instance, instance._original_image)
+        instance.image_variants = ''
+        Post.objects.filter(pk=instance.pk).update(image_variants='')
+    instance._original_image = image
+
+
+@receiver(post_delete, sender=Post)
+def delete_post_thumbnails(sender, instance, **kwargs):
+    """Удаляет миниатюры и варианты изображения удалённого поста."""
+    if instance._original_image:
+        _delete_image_files(instance, instance._original_image)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_pages(sender, **kwargs):
+    """Сбрасывает кэш страниц при изменении контента.
+
+    Поколение меняется после фиксации транзакции: иначе параллельный
+    запрос успел бы закэшировать старые данные под новым поколением,
+    а отменённые изменения сбрасывали бы кэш впустую.
+    """
+    transaction.on_commit(bump_generation)
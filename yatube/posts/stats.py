@@ -0,0 +1,220 @@
+"""Денормализованные счётчики публикаций и подписок пользователей, а
+также публикаций всего сайта и сообществ."""
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from posts.constants import STATS_BATCH_SIZE
+from posts.models import Follow, Post, PostCounter, User, UserStats
+from posts.utils import PaginatorCount
+
+STATS_FIELDS = ('posts_count', 'following_count', 'followers_count')
+
+
+def _count_subquery(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+                field,
+            ).annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def annotate_stats(users):
+    """Добавляет к выборке пользователей точные значения счётчиков."""
+    return users.annotate(
+        posts_total=_count_subquery(Post.objects.all(), 'author'),
+        following_total=_count_subquery(Follow.objects.all(), 'user'),
+        followers_total=_count_subquery(Follow.objects.all(), 'author'),
+    )
+
+
+def _exact_stats(user_id):
+    user = annotate_stats(User.objects.filter(pk=user_id)).values(
+        'posts_total',
+        'following_total',
+        'followers_total',
+    ).get()
+    return {
+        'posts_count': user['posts_total'],
+        'following_count': user['following_total'],
+        'followers_count': user['followers_total'],
+    }
+
+
+def get_user_stats(user):
+    """Возвращает счётчики пользователя, создавая их при отсутствии."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        stats, _ = UserStats.objects.get_or_create(
+            user=user,
+            defaults=_exact_stats(user.pk),
+        )
+        return stats
+
+
+def change_stats(user_id, **deltas):
+    """Атомарно изменяет счётчики пользователя на заданные величины.
+
+    Возвращает False, если строки со счётчиками ещё нет.
+    """
+    return bool(
+        UserStats.objects.filter(user_id=user_id).update(**{
+            field: F(field) + delta for field, delta in deltas.items()
+        })
+    )
+
+
+def increase_stats(user_id, **deltas):
+    """Увеличивает счётчики, создавая строку по точным значениям.
+
+    Вызывается после сохранения объекта, поэтому точные значения уже
+    учитывают его, и к ним не нужно прибавлять deltas.
+    """
+    if not change_stats(user_id, **deltas):
+        UserStats.objects.get_or_create(
+            user_id=user_id,
+            defaults=_exact_stats(user_id),
+        )
+
+
+def post_scopes(group_id, total=True):
+    """Возвращает области счётчиков, в которые входит пост сообщества."""
+    scopes = [PostCounter.TOTAL] if total else []
+    if group_id is not None:
+        scopes.append(PostCounter.group_scope(group_id))
+    return scopes
+
+
+def _exact_post_count(scope):
+    if scope == PostCounter.TOTAL:
+        return Post.objects.count()
+    group_id = scope.split(':', 1)[1]
+    return Post.objects.filter(group_id=group_id).count()
+
+
+def get_post_count(scope):
+    """Возвращает значение счётчика постов, создавая его при отсутствии."""
+    count = PostCounter.objects.filter(scope=scope).values_list(
+        'posts_count',
+        flat=True,
+    ).first()
+    if count is None:
+        counter, _ = PostCounter.objects.get_or_create(
+            scope=scope,
+            defaults={'posts_count': _exact_post_count(scope)},
+        )
+        count = counter.posts_count
+    return count
+
+
+def change_post_counts(scopes, delta):
+    """Атомарно изменяет счётчики постов заданных областей.
+
+    Возвращает количество изменённых строк.
+    """
+    if not scopes:
+        return 0
+    return PostCounter.objects.filter(scope__in=scopes).update(
+        posts_count=F('posts_count') + delta,
+    )
+
+
+def increase_post_counts(scopes, delta):
+    """Увеличивает счётчики постов, создавая недостающие по точным
+    значениям (см. increase_stats)."""
+    if change_post_counts(scopes, delta) < len(scopes):
+        for scope in scopes:
+            PostCounter.objects.get_or_create(
+                scope=scope,
+                defaults={'posts_count': _exact_post_count(scope)},
+            )
+
+
+def count_posts(group=None):
+    """Возвращает точное количество всех постов или постов сообщества."""
+    scope = PostCounter.TOTAL if group is None else PostCounter.group_scope(
+        group.pk,
+    )
+    return PaginatorCount(get_post_count(scope), exact=True)
+
+
+def count_author_posts(user):
+    """Возвращает точное количество постов автора."""
+    return PaginatorCount(get_user_stats(user).posts_count, exact=True)
+
+
+def reconcile_post_counts():
+    """Пересчитывает счётчики постов сайта и сообществ.
+
+    Возвращает количество созданных и исправленных строк.
+    """
+    exact = {PostCounter.TOTAL: Post.objects.count()}
+    exact.update(
+        (PostCounter.group_scope(group_id), total)
+        for group_id, total in Post.objects.filter(
+            group__isnull=False,
+        ).order_by().values_list('group').annotate(total=Count('pk'))
+    )
+    counters = PostCounter.objects.in_bulk()
+    missing = [
+        PostCounter(scope=scope, posts_count=total)
+        for scope, total in exact.items()
+        if scope not in counters
+    ]
+    drifted = []
+    for scope, counter in counters.items():
+        total = exact.get(scope, 0)
+        if counter.posts_count != total:
+            counter.posts_count = total
+            drifted.append(counter)
+
+    with transaction.atomic():
+        PostCounter.objects.bulk_create(missing, ignore_conflicts=True)
+        PostCounter.objects.bulk_update(drifted, ['posts_count'])
+    return len(missing) + len(drifted)
+
+
+def reconcile_stats(batch_size=STATS_BATCH_SIZE):
+    """Пересчитывает счётчики всех пользователей, сайта и сообществ и
+    исправляет расхождения.
+
+    Возвращает количество созданных и исправленных строк.
+    """
+    users = annotate_stats(
+        User.objects.order_by('pk').select_related('stats')
+    ).iterator(chunk_size=batch_size)
+
+    fixed = reconcile_post_counts()
+    while True:
+        batch = list(islice(users, batch_size))
+        if not batch:
+            return fixed
+
+        missing, drifted = [], []
+        for user in batch:
+            exact = {
+                'posts_count': user.posts_total,
+                'following_count': user.following_total,
+                'followers_count': user.followers_total,
+            }
+            try:
+                stats = user.stats
+            except UserStats.DoesNotExist:
+                missing.append(UserStats(user=user, **exact))
+                continue
+            if any(getattr(stats, key) != exact[key] for key in exact):
+                for key, value in exact.items():
+                    setattr(stats, key, value)
+                drifted.append(stats)
+
+        with transaction.atomic():
+            UserStats.objects.bulk_create(missing, ignore_conflicts=True)
+            UserStats.objects.bulk_update(drifted, STATS_FIELDS)
+        fixed += len(missing) + len(drifted)
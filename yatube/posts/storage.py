@@ -0,0 +1,66 @@
+"""Хранилище картинок постов с адресацией по содержимому.
+
+Файл называется SHA-256 своего содержимого и лежит во вложенных
+каталогах по первым символам хэша::
+
+    posts/3f/a2/3fa2...e9.jpg
+
+Поэтому каталоги остаются небольшими, имя не нужно проверять на
+совпадение с существующими, а одинаковые картинки хранятся один раз.
+"""
+import hashlib
+import os
+import posixpath
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+from posts.constants import MEDIA_SHARD_DEPTH
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def content_name(name, content, depth=MEDIA_SHARD_DEPTH):
+    """Возвращает имя файла по хэшу содержимого в каталоге name."""
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    content.seek(0)
+    digest = digest.hexdigest()
+
+    shards = [digest[level * 2:level * 2 + 2] for level in range(depth)]
+    extension = os.path.splitext(name)[1].lower()
+    return posixpath.join(
+        posixpath.dirname(name),
+        *shards,
+        f'{digest}{extension}',
+    )
+
+
+def is_content_name(name, depth=MEDIA_SHARD_DEPTH):
+    """Проверяет, что имя файла уже построено по хэшу содержимого."""
+    shards = r'[0-9a-f]{2}/' * depth
+    pattern = rf'(^|/){shards}[0-9a-f]{{64}}(\.\w+)?$'
+    return re.search(pattern, name) is not None
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Файловое хранилище, которое называет файлы по содержимому.
+
+    Каталог из upload_to сохраняется, имя файла заменяется хэшем.
+    Если такой файл уже есть, он не записывается повторно.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = content_name(name, content)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
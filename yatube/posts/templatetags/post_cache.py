@@ -0,0 +1,54 @@
+"""Кэширование фрагментов шаблонов со списками постов."""
+from django import template
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+
+from posts.cache import fragment_vary_on
+from posts.constants import CACHE_TIMEOUT
+
+register = template.Library()
+
+
+class PostListCacheNode(template.Node):
+    def __init__(self, nodelist, fragment_name, per_user):
+        self.nodelist = nodelist
+        self.fragment_name = fragment_name
+        self.per_user = per_user
+
+    def render(self, context):
+        cache_key = make_template_fragment_key(
+            self.fragment_name,
+            fragment_vary_on(context['request'], per_user=self.per_user),
+        )
+        value = cache.get(cache_key)
+        if value is None:
+            value = self.nodelist.render(context)
+            cache.set(cache_key, value, CACHE_TIMEOUT)
+        return value
+
+
+@register.tag
+def post_list_cache(parser, token):
+    """Кэширует фрагмент со списком постов.
+
+    Использование::
+
+        {% post_list_cache 'index' %}...{% endpost_list_cache %}
+        {% post_list_cache 'follow' per_user %}...{% endpost_list_cache %}
+
+    Ключ фрагмента учитывает страницу или курсор, класс зрителя и
+    поколение контента, поэтому разные страницы и зрители не получают
+    чужую разметку, а изменения контента видны сразу.
+    """
+    bits = token.split_contents()
+    if len(bits) not in (2, 3) or (len(bits) == 3 and bits[2] != 'per_user'):
+        raise template.TemplateSyntaxError(
+            f'Использование: {{% {bits[0]} "имя" [per_user] %}}'
+        )
+    nodelist = parser.parse(('endpost_list_cache',))
+    parser.delete_first_token()
+    return PostListCacheNode(
+        nodelist,
+        fragment_name=bits[1].strip('\'"'),
+        per_user=len(bits) == 3,
+    )
@@ -0,0 +1,80 @@
+"""Миниатюры и адаптивные картинки постов."""
+from django import template
+from django.core.files.storage import default_storage
+
+from posts.constants import IMAGE_VARIANT_ASPECT, IMAGE_VARIANT_SIZES
+from posts.thumbnails import lookup_thumbnail, schedule_thumbnails
+from posts.thumbnails import prefetch_thumbnails as prefetch
+from posts.variants import load_variants
+
+register = template.Library()
+
+
+@register.simple_tag
+def prefetch_thumbnails(posts):
+    """Загружает ключи миниатюр всех постов страницы одним запросом.
+
+    Использование::
+
+        {% prefetch_thumbnails page_obj %}
+
+    После этого теги {% cached_thumbnail %} в цикле по постам находят
+    ключи в памяти процесса и не обращаются к кэшу и БД по одному.
+    """
+    prefetch(posts)
+    return ''
+
+
+@register.simple_tag
+def cached_thumbnail(post, geometry):
+    """Возвращает построенную миниатюру картинки поста или None.
+
+    Использование::
+
+        {% cached_thumbnail post "960x339" as im %}
+
+    В отличие от {% thumbnail %} тег не строит миниатюру в потоке
+    запроса. Если её ещё нет, построение ставится в очередь, а шаблон
+    выводит исходную картинку.
+    """
+    thumbnail = lookup_thumbnail(post.image.name, geometry)
+    if thumbnail is None:
+        schedule_thumbnails(post)
+    return thumbnail
+
+
+def _srcset(names):
+    return ', '.join(
+        f'{default_storage.url(name)} {width}w'
+        for width, name in sorted(names.items())
+    )
+
+
+@register.inclusion_tag('includes/posts/picture.html')
+def responsive_image(post):
+    """Выводит картинку поста тегом <picture> с вариантами ширин.
+
+    Использование::
+
+        {% responsive_image post %}
+
+    Браузер сам выбирает формат и ширину по srcset и sizes. Последний
+    формат из IMAGE_VARIANT_FORMATS служит запасным для тега <img>.
+    """
+    variants = load_variants(post)
+    *extensions, fallback = variants
+    fallback_names = variants[fallback]
+    aspect_width, _ = IMAGE_VARIANT_ASPECT
+    src_width = max(
+        (width for width in fallback_names if width <= aspect_width),
+        default=min(fallback_names),
+    )
+    return {
+        'sources': [
+            (f'image/{extension}', _srcset(variants[extension]))
+            for extension in extensions
+        ],
+        'srcset': _srcset(fallback_names),
+        'src': default_storage.url(fallback_names[src_width]),
+        'sizes': IMAGE_VARIANT_SIZES,
+    }
@@ -0,0 +1,150 @@
+"""Тесты административной панели на больших таблицах."""
+from unittest import mock
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, PostCounter, User
+from posts.tests.utils import YatubeTestBase
+
+# Размеры наборов данных: меньше и больше одной страницы списка
+DATASET_SIZES = (3, 150)
+CHANGELISTS = ('post', 'comment', 'follow')
+
+
+class TestAdminChangelist(YatubeTestBase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin_user = User.objects.create_superuser(
+            username='admin',
+            email='admin@example.com',
+            password='admin',
+        )
+        cls.group = Group.objects.create(
+            title='Test group',
+            slug='test_group',
+            description='Test group',
+        )
+
+    def setUp(self):
+        self.admin_client = Client()
+        self.admin_client.force_login(TestAdminChangelist.admin_user)
+
+    def __create_dataset(self, size, offset=0):
+        for i in range(offset, offset + size):
+            author = User.objects.create_user(username=f'author_{i}')
+            post = Post.objects.create(
+                text=f'Test post #{i}',
+                author=author,
+                group=TestAdminChangelist.group,
+            )
+            Comment.objects.create(text='Comment', post=post, author=author)
+            Follow.objects.create(
+                user=author,
+                author=TestAdminChangelist.admin_user,
+            )
+
+    def __changelist(self, model, query=''):
+        address = reverse(f'admin:posts_{model}_changelist')
+        return self.get_response_get(self.admin_client, f'{address}{query}')
+
+    def __count_queries(self, model):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.__changelist(model)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_admin_changelist_queries_flat(self):
+        """Число запросов списка не зависит от количества строк."""
+        counts = {}
+        offset = 0
+        for size in DATASET_SIZES:
+            self.__create_dataset(size - offset, offset)
+            offset = size
+            for model in CHANGELISTS:
+                counts.setdefault(model, []).append(
+                    self.__count_queries(model),
+                )
+
+        for model, model_counts in counts.items():
+            with self.subTest(model=model):
+                self.assertEqual(
+                    len(set(model_counts)),
+                    1,
+                    f'Запросы списка `{model}` растут: {model_counts}',
+                )
+
+    def test_admin_changelist_no_user_choices(self):
+        """Списки не выводят всех пользователей в фильтрах и полях."""
+        self.__create_dataset(3)
+
+        for model in CHANGELISTS:
+            with self.subTest(model=model):
+                response = self.__changelist(model)
+                self.assertNotContains(response, 'author__id__exact')
+                self.assertNotContains(response, 'user__id__exact')
+                self.assertNotContains(response, '<select name="form-')
+                self.assertIsNone(response.context['cl'].full_result_count)
+
+    def test_admin_username_filter_and_search(self):
+        """Фильтр и поиск по имени пользователя находят его записи."""
+        self.__create_dataset(3)
+
+        for model, query in (
+            ('post', '?author_username=author_1'),
+            ('post', '?q=author_1'),
+            ('comment', '?author_username=author_1'),
+            ('follow', '?user_username=author_1'),
+            ('follow', '?q=author_1'),
+        ):
+            with self.subTest(model=model, query=query):
+                response = self.__changelist(model, query)
+                self.assertEqual(
+                    response.context['cl'].result_count,
+                    1,
+                )
+
+    def test_admin_changelist_count_limited(self):
+        """Списки не считают все строки таблицы полным COUNT(*)."""
+        self.__create_dataset(3)
+
+        for model, query in (
+            ('post', ''),
+            ('post', '?author_username=author_1'),
+            ('post', '?q=author_1'),
+            ('comment', ''),
+            ('follow', ''),
+        ):
+            with self.subTest(model=model, query=query):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.__changelist(model, query)
+                self.assertEqual(response.status_code, 200)
+                full_counts = [
+                    query['sql'] for query in queries
+                    if 'COUNT(' in query['sql']
+                    and 'LIMIT' not in query['sql']
+                ]
+                self.assertEqual(full_counts, [])
+
+        # Без фильтров количество постов берётся из счётчика
+        PostCounter.objects.filter(scope=PostCounter.TOTAL).update(
+            posts_count=42,
+        )
+        response = self.__changelist('post')
+        self.assertEqual(response.context['cl'].result_count, 42)
+
+        with mock.patch('posts.admin.ADMIN_COUNT_LIMIT', 2):
+            for model, query in (
+                ('post', '?q=post'),
+                ('comment', '?q=comment'),
+                ('follow', '?author_username=admin'),
+            ):
+                with self.subTest(model=model, query=query, limit=2):
+                    response = self.__changelist(model, query)
+                    self.assertEqual(
+                        response.context['cl'].result_count,
+                        2,
+                    )
@@ -1,7 +1,18 @@
 from django.core.cache import cache
+from django.db import DatabaseError, transaction
 from django.shortcuts import reverse
+from django.test import Client, RequestFactory, SimpleTestCase
 
-from posts.models import Post, User
+from posts.cache import (
+    TieredCache,
+    _page_cache_key,
+    bump_generation,
+    get_generation,
+    tiered_cache,
+)
+from posts.constants import MAX_POSTS_ON_PAGE
+from posts.models import Comment, Group, Post, User
+from posts.stats import count_posts
 from posts.tests.utils import YatubeTestBase
 
 
@@ -10,9 +21,14 @@ class TestCache(YatubeTestBase):
     def setUpClass(cls):
         super().setUpClass()
         cls.test_user = User.objects.create(username='testuser')
+        cls.test_post = Post.objects.create(
+            text='Cached post',
+            author=cls.test_user,
+        )
 
     def setUp(self):
         cache.clear()
+        tiered_cache.clear_local()
 
     def test_cache(self):
         """Тестирование страницы из кэша."""
@@ -23,31 +39,250 @@ class TestCache(YatubeTestBase):
             address=address,
         )
 
-        Post.objects.create(
-            text='Auto created post',
-            author=TestCache.test_user
+        # update() не отправляет сигналы, поэтому поколение не меняется
+        Post.objects.filter(pk=TestCache.test_post.pk).update(
+            text='Changed without signals',
         )
 
-        resp_after_createpost_from_cache = self.get_response_get(
+        resp_from_cache = self.get_response_get(
             client=self.client,
             address=address,
         )
 
         self.assertEqual(
             resp_orign.content,
-            resp_after_createpost_from_cache.content,
+            resp_from_cache.content,
             'Stage1. Страницы разные',
         )
 
         cache.clear()
 
-        resp_after_createpost_cache_clear = self.get_response_get(
+        resp_after_cache_clear = self.get_response_get(
             client=self.client,
             address=address,
         )
 
         self.assertNotEqual(
             resp_orign.content,
-            resp_after_createpost_cache_clear.content,
+            resp_after_cache_clear.content,
             'Stage2. Страницы одинаковые',
         )
+
+    def test_cache_invalidated_by_new_post(self):
+        """Новый пост сразу появляется на закэшированной странице."""
+        address = reverse('posts:index')
+
+        resp_orign = self.get_response_get(
+            client=self.client,
+            address=address,
+        )
+
+        with self.run_on_commit():
+            Post.objects.create(
+                text='Auto created post',
+                author=TestCache.test_user,
+            )
+
+        resp_after_createpost = self.get_response_get(
+            client=self.client,
+            address=address,
+        )
+
+        self.assertNotEqual(
+            resp_orign.content,
+            resp_after_createpost.content,
+            'Страница не обновилась после создания поста',
+        )
+        self.assertContains(resp_after_createpost, 'Auto created post')
+
+    def test_cache_generation_bumped_by_signals(self):
+        """Изменение постов, комментариев и групп меняет поколение."""
+        changes = {
+            'post': lambda: Post.objects.create(
+                text='Test post',
+                author=TestCache.test_user,
+            ),
+            'comment': lambda: Comment.objects.create(
+                text='Test comment',
+                author=TestCache.test_user,
+                post=TestCache.test_post,
+            ),
+            'group': lambda: Group.objects.create(
+                title='Test group',
+                slug='test_group',
+                description='This is test group',
+            ),
+            'delete': lambda: Comment.objects.all().delete(),
+        }
+
+        for name, change in changes.items():
+            with self.subTest(change=name):
+                generation = get_generation()
+                with self.run_on_commit():
+                    change()
+                self.assertGreater(
+                    get_generation(),
+                    generation,
+                    f'Поколение контента не изменилось: {name}',
+                )
+
+    def test_cache_generation_bumped_after_commit(self):
+        """Поколение меняется только после фиксации транзакции."""
+        generation = get_generation()
+        with self.run_on_commit():
+            try:
+                with transaction.atomic():
+                    Post.objects.create(
+                        text='Rolled back post',
+                        author=TestCache.test_user,
+                    )
+                    raise DatabaseError
+            except DatabaseError:
+                pass
+            Post.objects.create(
+                text='Committed post',
+                author=TestCache.test_user,
+            )
+            self.assertEqual(
+                get_generation(),
+                generation,
+                'Поколение изменилось до фиксации транзакции',
+            )
+        self.assertEqual(
+            get_generation(),
+            generation + 1,
+            'Отменённая запись изменила поколение',
+        )
+
+    def test_cache_fragment_depends_on_page(self):
+        """Фрагмент списка постов не переносится между страницами."""
+        group = Group.objects.create(
+            title='Test group',
+            slug='test_group',
+            description='This is test group',
+        )
+        for i in range(MAX_POSTS_ON_PAGE + 1):
+            Post.objects.create(
+                text=f'Paged post #{i}',
+                author=TestCache.test_user,
+                group=group,
+            )
+        address = reverse('posts:group_list', kwargs={'slug': group.slug})
+
+        first_page = self.get_response_get(self.client, address)
+        second_page = self.get_response_get(self.client, address + '?page=2')
+
+        self.assertContains(first_page, f'Paged post #{MAX_POSTS_ON_PAGE}')
+        self.assertNotContains(second_page, f'Paged post #{MAX_POSTS_ON_PAGE}')
+        self.assertContains(second_page, 'Paged post #0')
+
+    def test_cache_fragment_depends_on_viewer(self):
+        """Разметка авторизованного пользователя не попадает к анониму."""
+        address = reverse('posts:index')
+        auth_client = Client()
+        auth_client.force_login(TestCache.test_user)
+
+        auth_page = self.get_response_get(auth_client, address)
+        anon_page = self.get_response_get(self.client, address)
+
+        self.assertContains(auth_page, 'Избранные авторы')
+        self.assertNotContains(anon_page, 'Избранные авторы')
+
+    def test_cache_page_only_for_anonymous(self):
+        """Страница целиком кэшируется только для анонима."""
+        address = reverse('posts:index')
+        key = _page_cache_key(RequestFactory().get(address))
+        auth_client = Client()
+        auth_client.force_login(TestCache.test_user)
+
+        self.get_response_get(auth_client, address)
+        self.assertIsNone(
+            cache.get(key),
+            'Страница авторизованного пользователя попала в кэш',
+        )
+
+        self.get_response_get(self.client, address)
+        self.assertIsNotNone(
+            cache.get(key),
+            'Страница анонима не попала в кэш',
+        )
+
+    def test_cache_group_lookup(self):
+        """Группа по slug берётся из кэша, пока не сменится поколение."""
+        group = Group.objects.create(
+            title='Test group',
+            slug='test_group',
+            description='This is test group',
+        )
+        address = reverse('posts:group_list', kwargs={'slug': group.slug})
+        self.get_response_get(self.client, address)
+        # Количество постов ?page=1 берёт из счётчика, созданного заранее
+        count_posts(group)
+
+        with self.assertNumQueries(1):
+            self.get_response_get(self.client, address + '?page=1')
+
+        group.title = 'Renamed group'
+        with self.run_on_commit():
+            group.save()
+        self.assertContains(
+            self.get_response_get(self.client, address + '?page=1'),
+            'Renamed group',
+        )
+
+
+class TestTieredCache(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        # Два экземпляра изображают L1 двух разных процессов
+        self.first = TieredCache(max_entries=3)
+        self.second = TieredCache(max_entries=3)
+
+    def test_tiered_cache_hits_by_tier(self):
+        """Повторное чтение попадает в L1, первое чтение - в L2."""
+        generation = get_generation()
+        self.first.set('key', 'value', 60, generation)
+
+        for _ in range(2):
+            self.assertEqual(
+                self.second.get('key', generation=generation),
+                'value',
+            )
+        self.assertIsNone(self.second.get('missing'))
+        self.assertEqual(
+            self.second.stats(),
+            {
+                'l1': {'hits': 1, 'misses': 2},
+                'l2': {'hits': 1, 'misses': 1},
+            },
+        )
+
+    def test_tiered_cache_generation_invalidates_local(self):
+        """Смена поколения в L2 сбрасывает L1 всех процессов."""
+        generation = get_generation()
+        self.first.set('key', 'old', 60, generation)
+        self.second.get('key', generation=generation)
+
+        generation = bump_generation()
+
+        self.assertIsNone(self.second.get('key', generation=generation))
+        self.assertEqual(
+            self.second.get('key', generation=generation, stale=True),
+            'old',
+            'Устаревшая запись L2 не отдана при stale=True',
+        )
+        self.first.set('key', 'new', 60, generation)
+        self.assertEqual(self.second.get('key', generation=generation), 'new')
+
+    def test_tiered_cache_local_lru(self):
+        """L1 ограничен по размеру и вытесняет давние записи."""
+        for i in range(4):
+            self.first.set(f'key_{i}', i, 60)
+        self.first.get('key_1')
+        self.first.set('key_4', 4, 60)
+        cache.clear()
+
+        self.assertIsNone(self.first.get('key_0'))
+        self.assertIsNone(self.first.get('key_2'))
+        self.assertEqual(self.first.get('key_1'), 1)
+        self.assertEqual(self.first.get('key_4'), 4)
@@ -0,0 +1,100 @@
+"""Тесты защиты кэша страниц от одновременного перестроения."""
+import threading
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from posts.cache import (
+    bump_generation,
+    cache_page_by_generation,
+    tiered_cache,
+)
+
+THREADS_COUNT = 10
+RENDER_TIME = 0.2
+
+
+class TestCacheStampede(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        tiered_cache.clear_local()
+        self.renders = 0
+        self.renders_lock = threading.Lock()
+
+        @cache_page_by_generation(60, beta=0)
+        def slow_view(request):
+            with self.renders_lock:
+                self.renders += 1
+                number = self.renders
+            time.sleep(RENDER_TIME)
+            return HttpResponse(f'render #{number}')
+
+        self.view = slow_view
+
+    def __request(self):
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        return request
+
+    def __get_concurrently(self):
+        barrier = threading.Barrier(THREADS_COUNT)
+        contents = []
+
+        def worker():
+            barrier.wait()
+            contents.append(self.view(self.__request()).content)
+
+        threads = [
+            threading.Thread(target=worker) for _ in range(THREADS_COUNT)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return contents
+
+    def test_stampede_single_render_on_miss(self):
+        """Одновременные промахи по кэшу строят страницу один раз."""
+        contents = self.__get_concurrently()
+
+        self.assertEqual(
+            self.renders,
+            1,
+            f'Страница построена {self.renders} раз вместо одного',
+        )
+        self.assertEqual(set(contents), {b'render #1'})
+
+    def test_stampede_stale_while_revalidate(self):
+        """После смены поколения отдаётся старая копия и одна перестройка."""
+        self.view(self.__request())
+        bump_generation()
+
+        contents = self.__get_concurrently()
+
+        self.assertEqual(
+            self.renders,
+            2,
+            'После смены поколения страница должна перестроиться один раз',
+        )
+        self.assertIn(b'render #1', contents)
+        self.assertEqual(
+            self.view(self.__request()).content,
+            b'render #2',
+            'После перестроения не отдаётся новая версия страницы',
+        )
+
+    def test_stampede_early_refresh(self):
+        """При большом beta страница обновляется до истечения срока."""
+        @cache_page_by_generation(60, beta=10 ** 9)
+        def view(request):
+            self.renders += 1
+            time.sleep(0.01)
+            return HttpResponse('page')
+
+        view(self.__request())
+        view(self.__request())
+
+        self.assertEqual(self.renders, 2, 'Досрочное обновление не сработало')
@@ -0,0 +1,158 @@
+"""Тесты условного GET для страниц постов."""
+from django.core.cache import cache
+from django.test import Client
+from django.urls import reverse
+
+from posts.cache import tiered_cache
+from posts.models import Comment, Follow, Group, Post, User
+from posts.tests.utils import YatubeTestBase
+
+
+class TestConditionalGet(YatubeTestBase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_user = User.objects.create(username='test_user')
+        cls.test_author = User.objects.create(username='test_author')
+        cls.test_group = Group.objects.create(
+            title='Test group',
+            slug='test_group',
+            description='This is test group',
+        )
+        cls.test_post = Post.objects.create(
+            text='Test post',
+            author=cls.test_author,
+            group=cls.test_group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        tiered_cache.clear_local()
+        self.user_client = Client()
+        self.user_client.force_login(TestConditionalGet.test_user)
+
+    def __addresses(self):
+        return [
+            reverse('posts:index'),
+            reverse(
+                'posts:group_list',
+                kwargs={'slug': TestConditionalGet.test_group.slug},
+            ),
+            reverse(
+                'posts:profile',
+                kwargs={'username': TestConditionalGet.test_author.username},
+            ),
+            reverse(
+                'posts:post_detail',
+                kwargs={'post_id': TestConditionalGet.test_post.id},
+            ),
+        ]
+
+    def test_conditional_get_not_modified(self):
+        """Повторный запрос с If-None-Match получает 304 без шаблона."""
+        for address in self.__addresses():
+            with self.subTest(address=address):
+                response = self.get_response_get(self.client, address)
+                self.assertTrue(
+                    response.has_header('ETag'),
+                    f'Страница `{address}` не отдаёт ETag',
+                )
+
+                response = self.client.get(
+                    address,
+                    HTTP_IF_NONE_MATCH=response['ETag'],
+                )
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.templates, [])
+
+    def test_conditional_get_changed_content(self):
+        """После изменения контента ETag меняется."""
+        for address in self.__addresses():
+            with self.subTest(address=address):
+                etag = self.get_response_get(self.client, address)['ETag']
+
+                with self.run_on_commit():
+                    Post.objects.create(
+                        text='New post',
+                        author=TestConditionalGet.test_author,
+                        group=TestConditionalGet.test_group,
+                    )
+
+                response = self.client.get(address, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+
+    def test_conditional_get_depends_on_viewer(self):
+        """ETag различается у анонима и авторизованного пользователя."""
+        for address in self.__addresses():
+            with self.subTest(address=address):
+                anon_etag = self.get_response_get(self.client, address)['ETag']
+                response = self.user_client.get(
+                    address,
+                    HTTP_IF_NONE_MATCH=anon_etag,
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_conditional_get_follow_changes_profile(self):
+        """Подписка меняет ETag профиля автора."""
+        address = reverse(
+            'posts:profile',
+            kwargs={'username': TestConditionalGet.test_author.username},
+        )
+        etag = self.get_response_get(self.user_client, address)['ETag']
+
+        with self.run_on_commit():
+            Follow.objects.create(
+                user=TestConditionalGet.test_user,
+                author=TestConditionalGet.test_author,
+            )
+
+        response = self.user_client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Отписаться')
+
+    def test_conditional_get_new_login(self):
+        """После повторного входа страница с формой приходит заново."""
+        User.objects.create_user(username='reader', password='Pass-1234')
+        client = Client(enforce_csrf_checks=True)
+        address = reverse(
+            'posts:post_detail',
+            kwargs={'post_id': TestConditionalGet.test_post.id},
+        )
+
+        def login():
+            token = client.get(reverse('users:login')).context['csrf_token']
+            client.post(
+                reverse('users:login'),
+                {
+                    'username': 'reader',
+                    'password': 'Pass-1234',
+                    'csrfmiddlewaretoken': token,
+                },
+            )
+
+        login()
+        etag = self.get_response_get(client, address)['ETag']
+        client.get(reverse('users:logout'))
+        login()
+
+        response = client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(
+            response.status_code,
+            200,
+            'После нового входа отдана страница со старым CSRF-токеном',
+        )
+        response = client.post(
+            reverse(
+                'posts:add_comment',
+                kwargs={'post_id': TestConditionalGet.test_post.id},
+            ),
+            {
+                'text': 'Comment after login',
+                'csrfmiddlewaretoken': response.context['csrf_token'],
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(
+            Comment.objects.filter(text='Comment after login').exists(),
+        )
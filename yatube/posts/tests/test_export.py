@@ -0,0 +1,169 @@
+"""Тесты потоковой выгрузки данных."""
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.http import StreamingHttpResponse
+from django.test import Client
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+from posts.tests.utils import YatubeTestBase
+
+
+class TestExport(YatubeTestBase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_author = User.objects.create_user(username='testauthor')
+        cls.test_reader = User.objects.create_user(username='testreader')
+        cls.test_group = Group.objects.create(
+            title='Test group',
+            slug='test_group',
+            description='Test group',
+        )
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.posts = [
+            Post.objects.create(
+                text=f'Test post #{i}',
+                author=TestExport.test_author,
+                group=TestExport.test_group if i % 2 else None,
+            )
+            for i in range(3)
+        ]
+        Post.objects.create(text='Reader post', author=TestExport.test_reader)
+        for i in range(2):
+            Comment.objects.create(
+                text=f'Comment #{i}',
+                post=self.posts[1],
+                author=TestExport.test_reader,
+            )
+        Follow.objects.create(
+            user=TestExport.test_reader,
+            author=TestExport.test_author,
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def __export(self, model, *args, **options):
+        out = StringIO()
+        call_command('export_yatube', model, *args, stdout=out, **options)
+        return out.getvalue()
+
+    def test_export_jsonl(self):
+        """Посты выгружаются в JSONL с ветками комментариев."""
+        lines = self.__export(
+            'post',
+            author='testauthor',
+            with_comments=True,
+        ).splitlines()
+
+        records = [json.loads(line) for line in lines]
+        self.assertEqual(
+            [record['id'] for record in records],
+            [post.pk for post in self.posts],
+        )
+        record = records[1]
+        self.assertEqual(record['author'], 'testauthor')
+        self.assertEqual(record['group'], 'test_group')
+        self.assertIsNone(record['image'])
+        self.assertEqual(
+            record['pub_date'],
+            self.posts[1].pub_date.isoformat(),
+        )
+        self.assertEqual(
+            [comment['text'] for comment in record['comments']],
+            ['Comment #1', 'Comment #0'],
+        )
+        self.assertEqual(records[0]['comments'], [])
+
+    def test_export_csv(self):
+        """Подписки выгружаются в CSV с заголовком."""
+        path = os.path.join(self.tmp_dir, 'follows.csv')
+
+        self.__export('follow', output=path)
+
+        with open(path, encoding='utf-8') as exported:
+            self.assertEqual(
+                exported.read().splitlines(),
+                ['user,author', 'testreader,testauthor'],
+            )
+
+    def test_export_import_round_trip(self):
+        """Выгрузка загружается обратно командой import_yatube."""
+        paths = {}
+        for model, extension in (
+            ('group', 'csv'),
+            ('post', 'jsonl'),
+            ('comment', 'jsonl'),
+            ('follow', 'csv'),
+        ):
+            paths[model] = os.path.join(self.tmp_dir, f'{model}.{extension}')
+            self.__export(model, output=paths[model])
+        expected = {
+            model: sorted(model.objects.values_list('pk', flat=True))
+            for model in (Post, Comment)
+        }
+        Group.objects.all().delete()
+        Post.objects.all().delete()
+        Follow.objects.all().delete()
+
+        for model, path in paths.items():
+            call_command('import_yatube', model, path, stdout=StringIO())
+
+        for model, pks in expected.items():
+            self.assertEqual(
+                sorted(model.objects.values_list('pk', flat=True)),
+                pks,
+            )
+        self.assertEqual(
+            Post.objects.get(pk=self.posts[1].pk).group.slug,
+            'test_group',
+        )
+        self.assertTrue(Follow.objects.filter(
+            user=TestExport.test_reader,
+            author=TestExport.test_author,
+        ).exists())
+
+    def test_export_endpoint(self):
+        """Пользователь скачивает свои данные потоком."""
+        address = reverse('posts:export')
+        client = Client()
+        response = self.get_response_get(client, address)
+        self.assertRedirects(
+            response,
+            f'{reverse("users:login")}?next={address}',
+        )
+
+        client.force_login(TestExport.test_author)
+        response = self.get_response_get(client, address)
+
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertIn(
+            'testauthor-posts.jsonl',
+            response['Content-Disposition'],
+        )
+        records = [
+            json.loads(line)
+            for line in b''.join(response.streaming_content).splitlines()
+        ]
+        self.assertEqual(len(records), len(self.posts))
+        self.assertEqual(len(records[1]['comments']), 2)
+
+        response = self.get_response_get(
+            client,
+            f'{address}?model=follow&format=csv',
+        )
+        self.assertEqual(
+            b''.join(response.streaming_content).decode().splitlines(),
+            ['user,author'],
+        )
+
+        response = self.get_response_get(client, f'{address}?model=group')
+        self.assertEqual(response.status_code, 400)
@@ -8,6 +8,7 @@ from django.test import Client, override_settings
 from django.urls import reverse
 
 from posts.models import Comment, Group, Post, User
+from posts.storage import content_name
 from posts.tests.utils import YatubeTestBase
 
 TMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -73,6 +74,10 @@ class TestFormsViews(YatubeTestBase):
             [post.id for post in Post.objects.all()]
         ) - self.__current_posts_id
 
+    def __stored_name(self, image):
+        # Картинки хранятся под именем по хэшу содержимого
+        return content_name(f'posts/{image.name}', image)
+
     def tests_forms_post_create(self):
         """Проверка создания нового поста"""
         address = reverse('posts:post_create')
@@ -132,9 +137,9 @@ class TestFormsViews(YatubeTestBase):
             ),
         )
 
-        self.assertIn(
-            test_image.name,
+        self.assertEqual(
             post.image.name,
+            self.__stored_name(test_image),
             (
                 'Картинка поста не соответствует заданной. '
                 f'{post.image} != {test_image}'
@@ -187,9 +192,9 @@ class TestFormsViews(YatubeTestBase):
             f'Изменился автор поста. {post.author} != {post_author}',
         )
 
-        self.assertIn(
-            TestFormsViews.test_image.name,
+        self.assertEqual(
             post.image.name,
+            self.__stored_name(TestFormsViews.test_image),
             (
                 'Картинка поста не соответствует заданной. '
                 f'{post.image} != {TestFormsViews.test_image}'
@@ -248,9 +253,9 @@ class TestFormsViews(YatubeTestBase):
             f'Изменился автор поста. {post.author} != {post_author}',
         )
 
-        self.assertIn(
-            TestFormsViews.test_image.name,
+        self.assertEqual(
             post.image.name,
+            self.__stored_name(TestFormsViews.test_image),
             (
                 'Картинка поста не соответствует заданной. '
                 f'{post.image} != {TestFormsViews.test_image}'
@@ -309,9 +314,9 @@ class TestFormsViews(YatubeTestBase):
             f'Изменился автор поста. {post.author} != {post_author}',
         )
 
-        self.assertIn(
-            TestFormsViews.test_image.name,
+        self.assertEqual(
             post.image.name,
+            self.__stored_name(TestFormsViews.test_image),
             (
                 'Картинка поста не соответствует заданной. '
                 f'{post.image} != {TestFormsViews.test_image}'
@@ -327,9 +332,14 @@ class TestFormsViews(YatubeTestBase):
         post_text = TestFormsViews.test_post.text
         post_author = TestFormsViews.test_post.author
         post_group = TestFormsViews.test_post.group
+        # Другая палитра: одинаковые картинки хранятся одним файлом
         test_image = SimpleUploadedFile(
             name='post_change_small.gif',
-            content=TestFormsViews.small_gif,
+            content=TestFormsViews.small_gif.replace(
+                b'\xFF\xFF\xFF',
+                b'\x00\xFF\x00',
+                1,
+            ),
             content_type='image/gif'
         )
 
@@ -370,9 +380,9 @@ class TestFormsViews(YatubeTestBase):
             f'Изменился автор поста. {post.author} != {post_author}',
         )
 
-        self.assertIn(
-            test_image.name,
+        self.assertEqual(
             post.image.name,
+            self.__stored_name(test_image),
             (
                 'Картинка поста не изменилась. '
                 f'{post.image} = {test_image}'
@@ -0,0 +1,106 @@
+"""Тесты приёма загружаемых картинок постов."""
+from io import BytesIO
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase
+from PIL import Image
+
+from posts.constants import IMAGE_MAX_SIDE
+from posts.forms import PostForm
+
+
+class TestImageUpload(SimpleTestCase):
+    def __upload(self, size, image_format='JPEG', mode='RGB', **options):
+        buffer = BytesIO()
+        Image.new(mode, size, 'white').save(buffer, image_format, **options)
+        return SimpleUploadedFile(
+            name=f'upload.{image_format.lower()}',
+            content=buffer.getvalue(),
+            content_type=Image.MIME[image_format],
+        )
+
+    def __clean(self, upload):
+        form = PostForm(data={'text': 'Test post'}, files={'image': upload})
+        return form, form.is_valid()
+
+    def test_images_small_image_unchanged(self):
+        """Картинка в пределах ограничений сохраняется как есть."""
+        upload = self.__upload((200, 100))
+        content = upload.read()
+        upload.seek(0)
+
+        form, is_valid = self.__clean(upload)
+
+        self.assertTrue(is_valid, form.errors)
+        image = form.cleaned_data['image']
+        image.seek(0)
+        self.assertEqual(image.read(), content)
+
+    @mock.patch('posts.images.IMAGE_MAX_PIXELS', 100 * 100)
+    def test_images_bomb_rejected(self):
+        """Картинка с огромным разрешением отклоняется."""
+        form, is_valid = self.__clean(self.__upload((200, 100)))
+
+        self.assertFalse(is_valid)
+        self.assertIn('Слишком большое разрешение', str(form.errors['image']))
+
+    @mock.patch('posts.images.IMAGE_MAX_DECODED_PIXELS', 100 * 100)
+    def test_images_bomb_limit_by_format(self):
+        """Картинки, которые декодируются целиком, ограничены сильнее."""
+        form, is_valid = self.__clean(self.__upload((200, 100), 'PNG'))
+        self.assertFalse(is_valid)
+        self.assertIn('Слишком большое разрешение', str(form.errors['image']))
+
+        form, is_valid = self.__clean(self.__upload((200, 100)))
+        self.assertTrue(is_valid, form.errors)
+
+    @mock.patch('posts.images.IMAGE_MAX_SIDE', 100)
+    def test_images_large_jpeg_downscaled(self):
+        """Большой JPEG уменьшается с сохранением EXIF."""
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        form, is_valid = self.__clean(
+            self.__upload((1000, 400), exif=exif.tobytes()),
+        )
+
+        self.assertTrue(is_valid, form.errors)
+        image = Image.open(form.cleaned_data['image'])
+        self.assertEqual(image.format, 'JPEG')
+        self.assertEqual(image.size, (100, 40))
+        self.assertEqual(image.getexif()[0x0112], 6, 'Потерян EXIF')
+
+    def test_images_phone_photo_accepted(self):
+        """Снимок телефона в 50 Мп принимается и уменьшается."""
+        form, is_valid = self.__clean(self.__upload((8660, 5774), mode='L'))
+
+        self.assertTrue(is_valid, form.errors)
+        image = Image.open(form.cleaned_data['image'])
+        self.assertEqual(image.format, 'JPEG')
+        self.assertEqual(max(image.size), IMAGE_MAX_SIDE)
+
+    @mock.patch('posts.images.IMAGE_MAX_SIDE', 100)
+    def test_images_large_png_downscaled(self):
+        """Большой PNG с прозрачностью остаётся PNG."""
+        form, is_valid = self.__clean(
+            self.__upload((300, 600), 'PNG', mode='RGBA'),
+        )
+
+        self.assertTrue(is_valid, form.errors)
+        upload = form.cleaned_data['image']
+        image = Image.open(upload)
+        self.assertEqual(upload.name, 'upload.png')
+        self.assertEqual((image.format, image.mode), ('PNG', 'RGBA'))
+        self.assertEqual(image.size, (50, 100))
+
+    @mock.patch('posts.images.IMAGE_MAX_SIDE', 100)
+    def test_images_large_gif_converted(self):
+        """Большая картинка другого формата сохраняется в JPEG."""
+        form, is_valid = self.__clean(
+            self.__upload((400, 200), 'GIF', mode='P'),
+        )
+
+        self.assertTrue(is_valid, form.errors)
+        upload = form.cleaned_data['image']
+        self.assertEqual(upload.name, 'upload.jpg')
+        self.assertEqual(Image.open(upload).size, (100, 50))
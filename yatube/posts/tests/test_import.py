@@ -0,0 +1,230 @@
+"""Тесты потокового импорта данных."""
+import csv
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+
+from posts import importer
+from posts.models import (
+    Follow,
+    Group,
+    ImportProgress,
+    Post,
+    TimelineEntry,
+    User,
+)
+from posts.tests.utils import YatubeTestBase
+
+
+class TestImport(YatubeTestBase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def __write_jsonl(self, name, records):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, 'w', encoding='utf-8') as source:
+            for record in records:
+                source.write(json.dumps(record, ensure_ascii=False) + '\n')
+        return path
+
+    def __write_csv(self, name, records):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, 'w', newline='', encoding='utf-8') as source:
+            writer = csv.DictWriter(source, fieldnames=list(records[0]))
+            writer.writeheader()
+            writer.writerows(records)
+        return path
+
+    def __import(self, model, path, **options):
+        out, err = StringIO(), StringIO()
+        call_command(
+            'import_yatube',
+            model,
+            path,
+            stdout=out,
+            stderr=err,
+            **options,
+        )
+        return out.getvalue(), err.getvalue()
+
+    def test_import_dataset(self):
+        """Импорт создаёт объекты, пользователей и сохраняет даты."""
+        self.__import('group', self.__write_csv('groups.csv', [
+            {'title': 'Котики', 'slug': 'cats', 'description': 'Про котиков'},
+        ]))
+        posts = [
+            {
+                'id': 100 + i,
+                'text': f'Пост #{i}',
+                'author': 'author',
+                'group': 'cats' if i % 2 else '',
+                'pub_date': f'2020-01-0{i + 1}T10:00:00',
+            }
+            for i in range(5)
+        ]
+        out, err = self.__import(
+            'post',
+            self.__write_jsonl('posts.jsonl', posts),
+            batch_size=2,
+        )
+        self.__import('comment', self.__write_jsonl('comments.jsonl', [
+            {'post': 104, 'author': 'reader', 'text': 'Отлично',
+             'created': '2020-02-01T00:00:00+00:00'},
+        ]))
+        self.__import('follow', self.__write_csv('follows.csv', [
+            {'user': 'reader', 'author': 'author'},
+        ]))
+
+        self.assertIn('Обработано записей: 5, ошибок: 0', out)
+        self.assertEqual(err, '')
+        self.assertEqual(Group.objects.get().slug, 'cats')
+        self.assertEqual(Post.objects.filter(group__slug='cats').count(), 2)
+        post = Post.objects.get(pk=104)
+        self.assertEqual(
+            post.pub_date,
+            datetime(2020, 1, 5, 10, tzinfo=timezone.utc),
+        )
+        self.assertEqual(post.comments.get().author.username, 'reader')
+        self.assertFalse(
+            User.objects.get(username='reader').has_usable_password(),
+        )
+        self.assertTrue(
+            Post._meta.get_field('pub_date').auto_now_add,
+            'auto_now_add не восстановлен после импорта',
+        )
+        # Ленты и счётчики перестроены после импорта
+        self.assertEqual(
+            TimelineEntry.objects.filter(user__username='reader').count(),
+            len(posts),
+        )
+        author = User.objects.get(username='author')
+        self.assertEqual(author.stats.posts_count, len(posts))
+        self.assertEqual(author.stats.followers_count, 1)
+
+    def test_import_reports_errors(self):
+        """Неверные записи пропускаются с указанием номера."""
+        Group.objects.create(title='Group', slug='group', description='')
+        out, err = self.__import('comment', self.__write_jsonl(
+            'comments.jsonl',
+            [{'post': 404, 'author': 'reader', 'text': 'Нет поста'}],
+        ))
+        self.assertIn('Запись 1: нет поста 404', err)
+
+        out, err = self.__import('post', self.__write_jsonl('posts.jsonl', [
+            {'text': 'Хороший пост', 'author': 'author', 'group': 'group'},
+            {'text': 'Чужое сообщество', 'author': 'author', 'group': 'x'},
+            {'text': '', 'author': 'author'},
+            {'text': 'Плохая дата', 'author': 'author', 'pub_date': 'вчера'},
+        ]))
+
+        self.assertIn('Обработано записей: 4, ошибок: 3', out)
+        self.assertIn("Запись 2: нет сообщества 'x'", err)
+        self.assertIn('Запись 3: не заполнено поле text', err)
+        self.assertIn("Запись 4: неверная дата 'вчера'", err)
+        self.assertEqual(Post.objects.get().text, 'Хороший пост')
+
+    def test_import_resume(self):
+        """Прерванный импорт продолжается с последнего пакета."""
+        path = self.__write_jsonl('posts.jsonl', [
+            {'id': i, 'text': f'Пост #{i}', 'author': 'author'}
+            for i in range(1, 6)
+        ])
+        build = importer.PostImporter.build
+
+        def fail_on_fourth(self, record):
+            if record['id'] == 4:
+                raise KeyboardInterrupt
+            return build(self, record)
+
+        with mock.patch.object(
+            importer.PostImporter,
+            'build',
+            fail_on_fourth,
+        ), self.assertRaises(KeyboardInterrupt):
+            self.__import('post', path, batch_size=2)
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertTrue(ImportProgress.objects.exists())
+
+        out, _ = self.__import('post', path, batch_size=2)
+
+        self.assertIn('пропущено при продолжении: 2', out)
+        self.assertEqual(
+            sorted(Post.objects.values_list('id', flat=True)),
+            [1, 2, 3, 4, 5],
+        )
+        self.assertFalse(ImportProgress.objects.exists())
+
+        # Повторный импорт тех же записей с id не создаёт дубликатов
+        self.__import('post', path)
+        self.assertEqual(Post.objects.count(), 5)
+
+    def test_import_resume_with_batch(self):
+        """Номер записи фиксируется вместе с пакетом, поэтому записи без
+        id после сбоя не дублируются."""
+        path = self.__write_jsonl('posts.jsonl', [
+            {'text': f'Пост #{i}', 'author': 'author'} for i in range(1, 5)
+        ])
+        save = importer.ResumeState.save
+
+        def fail_on_second_batch(self, rows):
+            save(self, rows)
+            if rows == 4:
+                raise KeyboardInterrupt
+
+        with mock.patch.object(
+            importer.ResumeState,
+            'save',
+            fail_on_second_batch,
+        ), self.assertRaises(KeyboardInterrupt):
+            self.__import('post', path, batch_size=2)
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(ImportProgress.objects.get().rows, 2)
+
+        self.__import('post', path, batch_size=2)
+
+        self.assertEqual(
+            sorted(Post.objects.values_list('text', flat=True)),
+            [f'Пост #{i}' for i in range(1, 5)],
+        )
+
+    def test_import_resume_key_mismatch(self):
+        """Ход другого импорта под тем же ключом не используется."""
+        path = self.__write_jsonl('follows.jsonl', [
+            {'user': 'reader', 'author': 'author'},
+        ])
+        ImportProgress.objects.create(
+            key=os.path.abspath(path),
+            source=os.path.abspath(path),
+            model='post',
+            rows=1,
+        )
+
+        with self.assertRaisesMessage(CommandError, 'относится к импорту'):
+            self.__import('follow', path)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_import_lookup_cache_batches(self):
+        """Ссылки пакета разрешаются одним запросом."""
+        users = [
+            User.objects.create_user(username=f'user_{i}') for i in range(5)
+        ]
+        cache = importer.LookupCache(User.objects.all(), 'username')
+
+        with self.assertNumQueries(1):
+            missing = cache.load(
+                [user.username for user in users] + ['unknown'],
+            )
+        with self.assertNumQueries(0):
+            cache.load([user.username for user in users])
+
+        self.assertEqual(missing, {'unknown'})
+        self.assertEqual(cache.get('user_3'), users[3].pk)
@@ -0,0 +1,109 @@
+"""Тесты использования индексов основными запросами страниц."""
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+from posts.tests.utils import YatubeTestBase
+
+
+class TestIndexes(YatubeTestBase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.test_group = Group.objects.create(
+            title='Test group',
+            slug='test_group',
+            description='This is test group',
+        )
+        cls.test_author = User.objects.create_user(username='testauthor')
+        cls.test_user = User.objects.create_user(username='testuser')
+        Follow.objects.create(user=cls.test_user, author=cls.test_author)
+        cls.test_post = Post.objects.create(
+            text='Test post',
+            author=cls.test_author,
+            group=cls.test_group,
+        )
+        Comment.objects.create(
+            text='Test comment',
+            author=cls.test_user,
+            post=cls.test_post,
+        )
+
+    def setUp(self):
+        self.auth_client = Client()
+        self.auth_client.force_login(TestIndexes.test_user)
+        cache.clear()
+
+    def __get_main_query(self, address, table):
+        with CaptureQueriesContext(connection) as context:
+            self.get_response_get(self.auth_client, address)
+
+        for query in context.captured_queries:
+            sql = query['sql']
+            if sql.startswith('SELECT') and f'FROM "{table}"' in sql:
+                return sql
+        self.fail(f'На странице `{address}` не найден запрос к `{table}`')
+
+    def __explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return ' | '.join(row[-1] for row in cursor.fetchall())
+
+    def test_indexes_views_main_query_plan(self):
+        """Основные запросы страниц выбирают строки по индексу без
+        дополнительной сортировки."""
+        test_queries = {
+            reverse('posts:index'): ('posts_post', 'post_pub_date_idx'),
+            reverse(
+                'posts:group_list',
+                kwargs={'slug': TestIndexes.test_group.slug},
+            ): ('posts_post', 'post_group_pub_date_idx'),
+            reverse(
+                'posts:profile',
+                kwargs={'username': TestIndexes.test_author.username},
+            ): ('posts_post', 'post_author_pub_date_idx'),
+            reverse('posts:follow_index'): (
+                'posts_post',
+                'timeline_user_pub_date_idx',
+            ),
+            reverse(
+                'posts:post_detail',
+                kwargs={'post_id': TestIndexes.test_post.id},
+            ): ('posts_comment', 'comment_post_created_idx'),
+        }
+
+        for address, (table, index) in test_queries.items():
+            with self.subTest(address=address):
+                plan = self.__explain(self.__get_main_query(address, table))
+
+                self.assertIn(
+                    index,
+                    plan,
+                    f'Запрос страницы `{address}` не использует индекс '
+                    f'{index}: {plan}',
+                )
+                self.assertNotIn(
+                    'TEMP B-TREE',
+                    plan,
+                    f'Запрос страницы `{address}` сортирует строки во '
+                    f'временном индексе: {plan}',
+                )
+
+    def test_indexes_follow_unique(self):
+        """Повторная подписка на автора запрещена уникальным индексом."""
+        self.assertEqual(
+            Follow.objects.filter(
+                user=TestIndexes.test_user,
+                author=TestIndexes.test_author,
+            ).count(),
+            1,
+        )
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(
+                user=TestIndexes.test_user,
+                author=TestIndexes.test_author,
+            )
@@ -0,0 +1,136 @@
+"""Тесты количества запросов к БД на страницах постов."""
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.constants import MAX_POSTS_ON_PAGE
+from posts.models import Comment, Follow, Group, Post, User
+from posts.tests.utils import YatubeTestBase
+
+# Размеры наборов данных, на которых проверяется бюджет запросов
+DATASET_SIZES = (1, MAX_POSTS_ON_PAGE, MAX_POSTS_ON_PAGE * 4)
+# Бюджет запросов страниц. Два запроса в каждом бюджете уходят на сессию
+# и пользователя, остальные - на объекты самой страницы.
+QUERY_BUDGET = {
+    'index': 3,
+    'group_list': 4,
+    'profile': 5,
+    'follow_index': 3,
+    'post_detail': 4,
+}
+
+
+class TestQueryBudget(YatubeTestBase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_user = User.objects.create_user(username='testuser')
+
+    def setUp(self):
+        self.auth_client = Client()
+        self.auth_client.force_login(TestQueryBudget.test_user)
+        cache.clear()
+
+    def __create_dataset(self, size):
+        """Создаёт size постов разных авторов и групп с комментариями."""
+        Post.objects.all().delete()
+        group = Group.objects.create(
+            title=f'Group {size}',
+            slug=f'group_{size}',
+            description='Test group',
+        )
+        authors = [
+            User.objects.create_user(username=f'author_{size}_{i}')
+            for i in range(size)
+        ]
+        posts = [
+            Post.objects.create(
+                text=f'Test post #{i}',
+                author=author,
+                group=group,
+            )
+            for i, author in enumerate(authors)
+        ]
+        for author in authors:
+            Follow.objects.create(
+                user=TestQueryBudget.test_user,
+                author=author,
+            )
+            Comment.objects.create(
+                text='Test comment',
+                author=author,
+                post=posts[0],
+            )
+        return {
+            'index': reverse('posts:index'),
+            'group_list': reverse(
+                'posts:group_list',
+                kwargs={'slug': group.slug},
+            ),
+            'profile': reverse(
+                'posts:profile',
+                kwargs={'username': authors[0].username},
+            ),
+            'follow_index': reverse('posts:follow_index'),
+            'post_detail': reverse(
+                'posts:post_detail',
+                kwargs={'post_id': posts[0].id},
+            ),
+        }
+
+    def __count_queries(self, address):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.get_response_get(self.auth_client, address)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_queries_constant_for_dataset_size(self):
+        """Количество запросов не зависит от числа постов и комментариев."""
+        budgets = {}
+        for size in DATASET_SIZES:
+            addresses = self.__create_dataset(size)
+            for view_name, address in addresses.items():
+                queries = self.__count_queries(address)
+                with self.subTest(view=view_name, size=size):
+                    budget = budgets.setdefault(view_name, queries)
+                    self.assertEqual(
+                        queries,
+                        budget,
+                        f'Количество запросов страницы `{address}` '
+                        f'зависит от размера данных: {queries} != {budget}',
+                    )
+
+    def test_queries_budget(self):
+        """Страницы укладываются в заданный бюджет запросов."""
+        addresses = self.__create_dataset(MAX_POSTS_ON_PAGE)
+        for view_name, address in addresses.items():
+            with self.subTest(view=view_name):
+                cache.clear()
+                with self.assertNumQueries(QUERY_BUDGET[view_name]):
+                    self.get_response_get(self.auth_client, address)
+
+    def test_queries_fragment_hit_skips_posts(self):
+        """Списки из кэша фрагментов не запрашивают посты из БД."""
+        addresses = self.__create_dataset(MAX_POSTS_ON_PAGE)
+        for view_name in ('index', 'group_list', 'follow_index'):
+            address = addresses[view_name]
+            with self.subTest(view=view_name):
+                cache.clear()
+                self.get_response_get(self.auth_client, address)
+                with CaptureQueriesContext(connection) as context:
+                    response = self.get_response_get(self.auth_client, address)
+                self.assertEqual(response.status_code, 200)
+                post_queries = [
+                    query['sql'] for query in context.captured_queries
+                    if '"posts_post"' in query['sql']
+                    or '"posts_timelineentry"' in query['sql']
+                ]
+                self.assertEqual(
+                    post_queries,
+                    [],
+                    f'Страница `{address}` запрашивает посты при '
+                    f'попадании в кэш фрагментов',
+                )
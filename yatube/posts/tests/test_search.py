@@ -0,0 +1,140 @@
+"""Тесты полнотекстового поиска по постам и комментариям."""
+from unittest import mock
+
+from django.contrib.admin.sites import site
+from django.core.cache import cache
+from django.test import Client, RequestFactory
+from django.urls import reverse
+
+from posts import search
+from posts.constants import MAX_POSTS_ON_PAGE
+from posts.models import Comment, Post, User
+from posts.tests.utils import YatubeTestBase
+
+
+class TestSearch(YatubeTestBase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_author = User.objects.create_user(username='testauthor')
+        cls.test_reader = User.objects.create_user(username='testreader')
+
+    def setUp(self):
+        cache.clear()
+
+    def __create_post(self, text):
+        return Post.objects.create(text=text, author=TestSearch.test_author)
+
+    def __found(self, text):
+        post_ids = search.search_post_ids(text)
+        posts = Post.objects.in_bulk(post_ids)
+        return [posts[post_id] for post_id in post_ids]
+
+    def test_search_match_query(self):
+        """Пользовательский ввод не разбирается как синтаксис FTS5."""
+        self.assertEqual(
+            search.build_match_query('Котики AND "NEAR(собаки"*'),
+            '"Котики" "AND" "NEAR" "собаки"',
+        )
+        self.assertEqual(search.build_match_query(' "* - '), '')
+
+    def test_search_finds_posts(self):
+        """Поиск находит пост по всем словам без учёта регистра."""
+        cat = self.__create_post('Рыжий Котик спит на диване')
+        self.__create_post('Рыжий пёс спит во дворе')
+
+        self.assertEqual(self.__found('котик ДИВАНЕ'), [cat])
+        self.assertEqual(self.__found('котик собака'), [])
+        self.assertEqual(self.__found('!!!'), [])
+
+    def test_search_ranks_post_text_above_comments(self):
+        """Совпадение в тексте поста выше совпадения в комментарии."""
+        commented = self.__create_post('Заметка о погоде')
+        Comment.objects.create(
+            text='А в зоопарке видели жираф',
+            post=commented,
+            author=TestSearch.test_reader,
+        )
+        about = self.__create_post('Жираф - самое высокое животное')
+
+        self.assertEqual(self.__found('жираф'), [about, commented])
+        self.assertEqual(self.__found('заметка жираф'), [commented])
+
+    @mock.patch('posts.search.SEARCH_MAX_CANDIDATES', 2)
+    def test_search_ranks_newest_candidates(self):
+        """Ранжируются только самые новые совпадения."""
+        oldest = self.__create_post('Выдра, выдра и ещё раз выдра')
+        posts = [self.__create_post(f'Выдра #{i}') for i in range(2)]
+
+        found = self.__found('выдра')
+
+        self.assertNotIn(oldest, found)
+        self.assertCountEqual(found, posts)
+
+    def test_search_index_follows_changes(self):
+        """Триггеры обновляют индекс при изменении постов и комментариев."""
+        post = self.__create_post('Первая версия')
+        comment = Comment.objects.create(
+            text='Отличный пингвин',
+            post=post,
+            author=TestSearch.test_reader,
+        )
+        self.assertEqual(self.__found('пингвин'), [post])
+
+        comment.delete()
+        self.assertEqual(self.__found('пингвин'), [])
+
+        Post.objects.filter(pk=post.pk).update(text='Вторая версия')
+        self.assertEqual(self.__found('первая'), [])
+        self.assertEqual(self.__found('вторая'), [post])
+
+        post.delete()
+        self.assertEqual(self.__found('вторая'), [])
+
+    def test_search_page(self):
+        """Страница поиска выводит найденные посты постранично."""
+        posts = [
+            self.__create_post(f'Запись про лемуров #{i}')
+            for i in range(MAX_POSTS_ON_PAGE + 1)
+        ]
+        self.__create_post('Запись про сурикатов')
+        address = reverse('posts:search')
+
+        response = self.get_response_get(Client(), f'{address}?q=лемуров')
+
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.paginator.count, len(posts))
+        self.assertEqual(len(page_obj), MAX_POSTS_ON_PAGE)
+        self.assertContains(response, '?q=%D0%BB%D0%B5%D0%BC%D1%83%D1%80')
+        self.assertTemplateUsed(response, 'posts/search.html')
+
+        response = self.get_response_get(Client(), address)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['page_obj'].paginator.count, 0)
+
+    def test_search_admin_uses_index(self):
+        """Поиск в административной панели идёт по индексу."""
+        found = self.__create_post('Пост про енотов')
+        self.__create_post('Пост про барсуков')
+        admin = site._registry[Post]
+        request = RequestFactory().get('/admin/posts/post/')
+
+        queryset, use_distinct = admin.get_search_results(
+            request,
+            Post.objects.all(),
+            'енотов',
+        )
+
+        self.assertFalse(use_distinct)
+        self.assertIn(search.SEARCH_TABLE, str(queryset.query))
+        self.assertEqual(list(queryset), [found])
+
+    def test_search_filter_posts(self):
+        """Фильтр оставляет все найденные посты и порядок выборки."""
+        posts = [self.__create_post(f'Енот #{i}') for i in range(3)]
+        self.__create_post('Барсук')
+
+        self.assertEqual(
+            list(search.filter_posts(Post.objects.order_by('pk'), 'енот')),
+            posts,
+        )
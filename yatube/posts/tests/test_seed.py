@@ -0,0 +1,147 @@
+"""Тесты генератора тестовых данных."""
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import F
+from django.test import TransactionTestCase
+
+from posts import seeding
+from posts.models import Comment, Follow, Post, TimelineEntry, User
+from posts.search import filter_posts
+from posts.stats import reconcile_stats
+from posts.tests.utils import YatubeTestBase
+
+DATASET = {'users': 30, 'groups': 3, 'posts': 200, 'comments': 300,
+           'follows': 100}
+
+
+class TestSeed(YatubeTestBase):
+    def __seed(self, **options):
+        out = StringIO()
+        call_command('seed_yatube', stdout=out, **dict(DATASET, **options))
+        return out.getvalue()
+
+    def __snapshot(self):
+        """Тексты и связи набора относительно первых id."""
+        first_user = User.objects.order_by('pk').first().pk
+        first_post = Post.objects.order_by('pk').first().pk
+        return (
+            [
+                (text, author_id - first_user, group_id is None)
+                for text, author_id, group_id in Post.objects.order_by(
+                    'pk',
+                ).values_list('text', 'author_id', 'group_id')
+            ],
+            [
+                (text, post_id - first_post)
+                for text, post_id in Comment.objects.order_by(
+                    'pk',
+                ).values_list('text', 'post_id')
+            ],
+            [
+                (user_id - first_user, author_id - first_user)
+                for user_id, author_id in Follow.objects.order_by(
+                    'pk',
+                ).values_list('user_id', 'author_id')
+            ],
+        )
+
+    def test_seed_dataset(self):
+        """Генератор создаёт связный набор с точными счётчиками и лентами."""
+        self.__seed()
+
+        self.assertEqual(User.objects.count(), DATASET['users'])
+        self.assertEqual(Post.objects.count(), DATASET['posts'])
+        self.assertEqual(Comment.objects.count(), DATASET['comments'])
+        follows = Follow.objects.count()
+        self.assertGreater(follows, DATASET['follows'] // 2)
+        self.assertLessEqual(follows, DATASET['follows'] * 2)
+        self.assertFalse(
+            Follow.objects.filter(user_id=F('author_id')).exists()
+        )
+        self.assertEqual(reconcile_stats(), 0)
+        expected_timeline = sum(
+            Post.objects.filter(author_id=author_id).count()
+            for author_id in Follow.objects.values_list(
+                'author_id',
+                flat=True,
+            )
+        )
+        self.assertEqual(TimelineEntry.objects.count(), expected_timeline)
+        for comment in Comment.objects.select_related('post')[:50]:
+            self.assertGreaterEqual(comment.created, comment.post.pub_date)
+
+    def test_seed_power_law(self):
+        """Немногие авторы пишут большую часть постов."""
+        self.__seed()
+
+        counts = sorted(
+            (user.posts.count() for user in User.objects.all()),
+            reverse=True,
+        )
+        self.assertGreater(sum(counts[:3]), DATASET['posts'] // 3)
+
+    def test_seed_is_reproducible(self):
+        """Одно и то же зерно даёт те же тексты и связи."""
+        self.__seed(seed=7)
+        first = self.__snapshot()
+        User.objects.all().delete()
+
+        self.__seed(seed=7)
+        self.assertEqual(self.__snapshot(), first)
+
+        User.objects.all().delete()
+        self.__seed(seed=8)
+        self.assertNotEqual(self.__snapshot(), first)
+
+    def test_seed_search_index(self):
+        """Посты индексируются, а триггеры индекса восстанавливаются."""
+        self.__seed()
+        comment = Comment.objects.order_by('pk').first()
+        word = comment.text.split()[0].rstrip('.')
+        self.assertIn(
+            comment.post_id,
+            filter_posts(Post.objects.all(), word).values_list(
+                'pk',
+                flat=True,
+            ),
+        )
+
+        post = Post.objects.create(
+            text='Неповторимыйтекст',
+            author=User.objects.first(),
+        )
+        Comment.objects.create(
+            text='Неповторимыйкомментарий',
+            post=post,
+            author=post.author,
+        )
+        for word in ('Неповторимыйтекст', 'Неповторимыйкомментарий'):
+            with self.subTest(word=word):
+                self.assertEqual(
+                    list(filter_posts(Post.objects.all(), word)),
+                    [post],
+                )
+
+    def test_seed_validates_sizes(self):
+        """Посты без пользователей и комментарии без постов не создаются."""
+        for options in ({'users': 1}, {'posts': 0}):
+            with self.subTest(options=options):
+                with self.assertRaises(CommandError):
+                    self.__seed(**options)
+
+
+class TestSeedPragmas(TransactionTestCase):
+    def test_seed_restores_pragmas(self):
+        """Настройки SQLite загрузки действуют только на время генерации."""
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            before = cursor.fetchone()[0]
+
+            with seeding.loading_pragmas():
+                cursor.execute('PRAGMA synchronous')
+                self.assertEqual(cursor.fetchone()[0], 0)
+
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], before)
@@ -0,0 +1,222 @@
+"""Тесты денормализованных счётчиков пользователей, сайта и сообществ."""
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post, PostCounter, User, UserStats
+from posts.stats import count_posts
+from posts.tests.utils import YatubeTestBase
+
+
+class TestUserStats(YatubeTestBase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_user = User.objects.create(username='test_user')
+        cls.test_author = User.objects.create(username='test_author')
+
+    def setUp(self):
+        cache.clear()
+
+    def __stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_stats_posts_count(self):
+        """Счётчик публикаций меняется при создании и удалении поста."""
+        posts = [
+            Post.objects.create(
+                text=f'Test post #{i}',
+                author=TestUserStats.test_author,
+            )
+            for i in range(3)
+        ]
+        self.assertEqual(
+            self.__stats(TestUserStats.test_author).posts_count,
+            3,
+            'Счётчик публикаций не увеличился',
+        )
+
+        posts[0].delete()
+        self.assertEqual(
+            self.__stats(TestUserStats.test_author).posts_count,
+            2,
+            'Счётчик публикаций не уменьшился',
+        )
+
+    def test_stats_follow_counts(self):
+        """Счётчики подписок меняются при подписке и отписке."""
+        Follow.objects.create(
+            user=TestUserStats.test_user,
+            author=TestUserStats.test_author,
+        )
+        self.assertEqual(
+            self.__stats(TestUserStats.test_user).following_count,
+            1,
+            'Счётчик подписок читателя не увеличился',
+        )
+        self.assertEqual(
+            self.__stats(TestUserStats.test_author).followers_count,
+            1,
+            'Счётчик подписчиков автора не увеличился',
+        )
+
+        TestUserStats.test_user.follower.all().delete()
+        self.assertEqual(
+            self.__stats(TestUserStats.test_user).following_count,
+            0,
+            'Счётчик подписок читателя не уменьшился',
+        )
+        self.assertEqual(
+            self.__stats(TestUserStats.test_author).followers_count,
+            0,
+            'Счётчик подписчиков автора не уменьшился',
+        )
+
+    def test_stats_pages_without_aggregates(self):
+        """Страницы профиля и поста не выполняют COUNT."""
+        post = Post.objects.create(
+            text='Test post',
+            author=TestUserStats.test_author,
+        )
+        test_pages = [
+            reverse(
+                'posts:profile',
+                kwargs={'username': TestUserStats.test_author.username},
+            ),
+            reverse('posts:post_detail', kwargs={'post_id': post.id}),
+        ]
+
+        for address in test_pages:
+            with self.subTest(address=address):
+                with CaptureQueriesContext(connection) as context:
+                    response = self.get_response_get(self.client, address)
+
+                self.assertContains(response, 'Всего постов')
+                for query in context.captured_queries:
+                    self.assertNotIn(
+                        'COUNT(',
+                        query['sql'],
+                        f'Страница `{address}` выполняет агрегатный запрос',
+                    )
+
+    def test_stats_reconcile_command(self):
+        """Команда reconcile_stats исправляет расхождения счётчиков."""
+        Post.objects.create(text='Test post', author=TestUserStats.test_author)
+        UserStats.objects.filter(user=TestUserStats.test_author).update(
+            posts_count=100,
+        )
+        UserStats.objects.filter(user=TestUserStats.test_user).delete()
+
+        call_command('reconcile_stats', batch_size=1, stdout=StringIO())
+
+        self.assertEqual(
+            self.__stats(TestUserStats.test_author).posts_count,
+            1,
+            'Расхождение счётчика публикаций не исправлено',
+        )
+        self.assertEqual(
+            self.__stats(TestUserStats.test_user).posts_count,
+            0,
+            'Не созданы счётчики пользователя',
+        )
+
+
+class TestPostCounters(YatubeTestBase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_author = User.objects.create(username='test_author')
+        cls.test_groups = [
+            Group.objects.create(title=f'Group {i}', slug=f'group_{i}')
+            for i in range(2)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def __counts(self):
+        first, second = TestPostCounters.test_groups
+        return (
+            count_posts().value,
+            count_posts(first).value,
+            count_posts(second).value,
+        )
+
+    def test_post_counters_follow_posts(self):
+        """Счётчики сайта и сообществ меняются при создании, переносе и
+        удалении поста."""
+        first, second = TestPostCounters.test_groups
+        Post.objects.create(
+            text='Без сообщества',
+            author=TestPostCounters.test_author,
+        )
+        post = Post.objects.create(
+            text='Test post',
+            author=TestPostCounters.test_author,
+            group=first,
+        )
+        self.assertEqual(self.__counts(), (2, 1, 0))
+
+        post = Post.objects.get(pk=post.pk)
+        post.group = second
+        post.save()
+        self.assertEqual(
+            self.__counts(),
+            (2, 0, 1),
+            'Пост не перенесён между счётчиками сообществ',
+        )
+
+        post.text = 'Изменённый текст'
+        post.save()
+        self.assertEqual(self.__counts(), (2, 0, 1))
+
+        post.delete()
+        self.assertEqual(self.__counts(), (1, 0, 0))
+        self.assertTrue(count_posts().exact)
+
+    def test_post_counters_group_delete(self):
+        """Счётчик удалённого сообщества удаляется."""
+        group = Group.objects.create(title='Deleted', slug='deleted')
+        Post.objects.create(
+            text='Test post',
+            author=TestPostCounters.test_author,
+            group=group,
+        )
+        scope = PostCounter.group_scope(group.pk)
+        self.assertTrue(PostCounter.objects.filter(scope=scope).exists())
+
+        group.delete()
+        self.assertFalse(PostCounter.objects.filter(scope=scope).exists())
+        self.assertEqual(count_posts().value, 1)
+
+    def test_post_counters_reconcile_command(self):
+        """Команда reconcile_stats исправляет счётчики после вставки без
+        сигналов."""
+        first, second = TestPostCounters.test_groups
+        Post.objects.create(
+            text='Test post',
+            author=TestPostCounters.test_author,
+            group=first,
+        )
+        self.assertEqual(self.__counts(), (1, 1, 0))
+        Post.objects.bulk_create(
+            Post(
+                text=f'Test post #{i}',
+                author=TestPostCounters.test_author,
+                group=second,
+            )
+            for i in range(3)
+        )
+        self.assertEqual(self.__counts(), (1, 1, 0))
+
+        call_command('reconcile_stats', stdout=StringIO())
+
+        self.assertEqual(
+            self.__counts(),
+            (4, 1, 3),
+            'Расхождение счётчиков публикаций не исправлено',
+        )
@@ -0,0 +1,125 @@
+"""Тесты хранилища картинок постов с адресацией по содержимому."""
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from PIL import Image
+
+from posts import variants
+from posts.models import Post, User
+from posts.storage import is_content_name
+from posts.tests.utils import YatubeTestBase
+
+TMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TMP_MEDIA_ROOT)
+class TestContentAddressedStorage(YatubeTestBase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_author = User.objects.create_user(username='testauthor')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TMP_MEDIA_ROOT, ignore_errors=True)
+
+    def __image_content(self, color='white'):
+        buffer = BytesIO()
+        Image.new('RGB', (600, 300), color).save(buffer, 'JPEG')
+        return buffer.getvalue()
+
+    def __create_post(self, name='photo.jpg', content=None):
+        return Post.objects.create(
+            text='Test post',
+            author=TestContentAddressedStorage.test_author,
+            image=SimpleUploadedFile(
+                name=name,
+                content=content or self.__image_content(),
+                content_type='image/jpeg',
+            ),
+        )
+
+    def __build_variants(self, post):
+        built = variants.build_variants(post.image.name)
+        variants.save_variants(post.pk, post.image.name, built)
+        post.refresh_from_db()
+        return [name for names in built.values() for name in names.values()]
+
+    def test_storage_sharded_name(self):
+        """Картинка называется хэшем содержимого во вложенных каталогах."""
+        post = self.__create_post('Photo.JPG')
+
+        directory, shard_1, shard_2, name = post.image.name.split('/')
+        self.assertEqual(directory, 'posts')
+        self.assertEqual(name[:4], shard_1 + shard_2)
+        self.assertTrue(name.endswith('.jpg'))
+        self.assertTrue(is_content_name(post.image.name))
+        self.assertFalse(is_content_name('posts/photo.jpg'))
+
+    def test_storage_deduplicates_uploads(self):
+        """Одинаковые картинки хранятся одним файлом."""
+        first = self.__create_post('first.jpg')
+        second = self.__create_post('second.jpg')
+        other = self.__create_post('other.jpg', self.__image_content('red'))
+
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertNotEqual(first.image.name, other.image.name)
+        directory = os.path.dirname(first.image.path)
+        self.assertEqual(len(os.listdir(directory)), 1)
+
+    def test_storage_shared_variants_kept(self):
+        """Удаление поста не удаляет варианты общей картинки."""
+        first = self.__create_post('first.jpg')
+        second = self.__create_post('second.jpg')
+        self.__build_variants(first)
+        names = self.__build_variants(second)
+
+        first.delete()
+        for name in names:
+            self.assertTrue(default_storage.exists(name))
+
+        second.delete()
+        for name in names:
+            self.assertFalse(default_storage.exists(name))
+
+    def test_storage_relocate_command(self):
+        """Команда relocate_post_images переносит старые картинки."""
+        legacy_name = default_storage.save(
+            'posts/legacy.jpg',
+            ContentFile(self.__image_content()),
+        )
+        posts = [self.__create_post() for _ in range(2)]
+        Post.objects.update(image=legacy_name, image_variants='')
+        self.__build_variants(posts[0])
+        missing = self.__create_post()
+        Post.objects.filter(pk=missing.pk).update(image='posts/missing.jpg')
+        out, err = StringIO(), StringIO()
+
+        call_command(
+            'relocate_post_images',
+            batch_size=1,
+            stdout=out,
+            stderr=err,
+        )
+
+        self.assertIn('Перенесено картинок: 2, не найдено: 1', out.getvalue())
+        self.assertIn('posts/missing.jpg', err.getvalue())
+        for post in posts:
+            post.refresh_from_db()
+            self.assertTrue(is_content_name(post.image.name))
+            self.assertTrue(default_storage.exists(post.image.name))
+        self.assertFalse(default_storage.exists(legacy_name))
+        self.assertFalse(default_storage.exists('posts/legacy_480w.jpeg'))
+        for names in variants.load_variants(posts[0]).values():
+            for name in names.values():
+                self.assertTrue(name.startswith(posts[0].image.name[:-4]))
+                self.assertTrue(default_storage.exists(name))
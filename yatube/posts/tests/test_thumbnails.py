@@ -0,0 +1,295 @@
+"""Тесты построения миниатюр изображений постов."""
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, override_settings
+from django.urls import reverse
+from sorl.thumbnail import default, get_thumbnail
+
+from posts import thumbnails
+from posts.models import Post, User
+from posts.tests.utils import YatubeTestBase
+
+TMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TMP_MEDIA_ROOT)
+class TestThumbnails(YatubeTestBase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_author = User.objects.create_user(username='testauthor')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        default.kvstore.clear_local()
+        self.author_client = Client()
+        self.author_client.force_login(TestThumbnails.test_author)
+
+    def __image(self, name='small.gif'):
+        return SimpleUploadedFile(
+            name=name,
+            content=SMALL_GIF,
+            content_type='image/gif',
+        )
+
+    def __thumbnail_files(self):
+        return [
+            name
+            for _, _, files in os.walk(os.path.join(TMP_MEDIA_ROOT, 'cache'))
+            for name in files
+        ]
+
+    def test_thumbnails_generate(self):
+        """Миниатюры строятся для всех размеров из шаблонов."""
+        post = Post.objects.create(
+            text='Test post',
+            author=TestThumbnails.test_author,
+            image=self.__image(),
+        )
+        shutil.rmtree(os.path.join(TMP_MEDIA_ROOT, 'cache'), True)
+
+        thumbnails.generate_thumbnails(post.image.name)
+
+        self.assertEqual(
+            len(self.__thumbnail_files()),
+            len(thumbnails.THUMBNAIL_GEOMETRIES),
+            'Построены не все миниатюры',
+        )
+
+    @override_settings(POSTS_EAGER_THUMBNAILS=True)
+    def test_thumbnails_scheduled_after_commit(self):
+        """Построение миниатюр уходит в пул после фиксации транзакции."""
+        post = Post.objects.create(
+            text='Test post',
+            author=TestThumbnails.test_author,
+            image=self.__image(),
+        )
+        executor = mock.Mock()
+
+        with mock.patch.object(
+            thumbnails.transaction,
+            'on_commit',
+        ) as on_commit, mock.patch.object(
+            thumbnails,
+            '_get_executor',
+            return_value=executor,
+        ):
+            thumbnails.schedule_thumbnails(post)
+            executor.submit.assert_not_called()
+            on_commit.call_args[0][0]()
+            # Повторная задача для того же изображения не ставится
+            thumbnails.schedule_thumbnails(post)
+            on_commit.call_args[0][0]()
+        thumbnails._pending.discard(post.image.name)
+
+        executor.submit.assert_called_once_with(
+            thumbnails._generate_in_background,
+            post.pk,
+            post.image.name,
+        )
+
+    def test_thumbnails_not_built_in_request(self):
+        """Страницы не строят недостающие миниатюры в потоке запроса."""
+        post = Post.objects.create(
+            text='Test post',
+            author=TestThumbnails.test_author,
+            image=self.__image(),
+        )
+        shutil.rmtree(os.path.join(TMP_MEDIA_ROOT, 'cache'), True)
+        addresses = (
+            reverse('posts:index'),
+            reverse('posts:post_detail', kwargs={'post_id': post.id}),
+        )
+        for address in addresses:
+            with self.subTest(address=address):
+                cache.clear()
+                with mock.patch(
+                    'sorl.thumbnail.default.engine',
+                ) as engine, mock.patch(
+                    'posts.templatetags.post_thumbnails.schedule_thumbnails',
+                ) as schedule:
+                    response = self.get_response_get(
+                        self.author_client,
+                        address,
+                    )
+                engine.get_image.assert_not_called()
+                schedule.assert_called_once_with(post)
+                self.assertContains(
+                    response,
+                    f'src="{post.image.url}"',
+                    msg_prefix='Вместо миниатюры не выведена картинка',
+                )
+                self.assertEqual(self.__thumbnail_files(), [])
+
+    def test_thumbnails_views_schedule(self):
+        """Создание и правка поста с изображением ставят задачу."""
+        with mock.patch('posts.views.schedule_thumbnails') as schedule:
+            self.get_response_post(
+                self.author_client,
+                reverse('posts:post_create'),
+                {'text': 'New post', 'image': self.__image('new.gif')},
+            )
+            post = Post.objects.get(text='New post')
+            self.assertEqual(schedule.call_count, 1)
+
+            self.get_response_post(
+                self.author_client,
+                reverse('posts:post_edit', kwargs={'post_id': post.id}),
+                {'text': 'Edited post'},
+            )
+            self.assertEqual(
+                schedule.call_count,
+                1,
+                'Миниатюры перестраиваются без смены изображения',
+            )
+
+            self.get_response_post(
+                self.author_client,
+                reverse('posts:post_edit', kwargs={'post_id': post.id}),
+                {'text': 'Edited post', 'image': self.__image('edit.gif')},
+            )
+            self.assertEqual(schedule.call_count, 2)
+
+    def test_thumbnails_regenerate_command(self):
+        """Команда regenerate_thumbnails строит недостающие миниатюры."""
+        Post.objects.create(
+            text='Test post',
+            author=TestThumbnails.test_author,
+            image=self.__image(),
+        )
+        Post.objects.create(
+            text='Post without image',
+            author=TestThumbnails.test_author,
+        )
+        shutil.rmtree(os.path.join(TMP_MEDIA_ROOT, 'cache'), True)
+        out = StringIO()
+
+        call_command(
+            'regenerate_thumbnails',
+            workers=1,
+            force=True,
+            stdout=out,
+        )
+
+        self.assertIn('Обработано изображений: 1, ошибок: 0', out.getvalue())
+        self.assertEqual(
+            len(self.__thumbnail_files()),
+            len(thumbnails.THUMBNAIL_GEOMETRIES),
+        )
+
+
+@override_settings(MEDIA_ROOT=TMP_MEDIA_ROOT)
+class TestThumbnailsKVStore(YatubeTestBase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_author = User.objects.create_user(username='testauthor')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        default.kvstore.clear_local()
+
+    def __create_post(self, name='small.gif'):
+        post = Post.objects.create(
+            text='Test post',
+            author=TestThumbnailsKVStore.test_author,
+            image=SimpleUploadedFile(
+                name=name,
+                content=SMALL_GIF,
+                content_type='image/gif',
+            ),
+        )
+        thumbnails.generate_thumbnails(post.image.name)
+        return post
+
+    def __thumbnails(self, post):
+        return [
+            get_thumbnail(post.image.name, geometry, **options)
+            for geometry, options in thumbnails.THUMBNAIL_GEOMETRIES.items()
+        ]
+
+    def test_kvstore_thumbnail_name(self):
+        """Имя миниатюры считается так же, как в sorl-thumbnail."""
+        post = self.__create_post()
+
+        for geometry, options in thumbnails.THUMBNAIL_GEOMETRIES.items():
+            with self.subTest(geometry=geometry):
+                self.assertEqual(
+                    thumbnails.thumbnail_name(
+                        post.image.name,
+                        geometry,
+                        options,
+                    ),
+                    get_thumbnail(post.image.name, geometry, **options).name,
+                )
+
+    def test_kvstore_prefetch_page(self):
+        """Ключи миниатюр страницы загружаются одним запросом."""
+        posts = [self.__create_post(f'image_{i}.gif') for i in range(3)]
+        cache.clear()
+        default.kvstore.clear_local()
+
+        with self.assertNumQueries(1):
+            thumbnails.prefetch_thumbnails(posts)
+        with self.assertNumQueries(0):
+            for post in posts:
+                self.__thumbnails(post)
+
+    def test_kvstore_page_without_lookups(self):
+        """Повторный список постов не обращается к хранилищу ключей."""
+        self.__create_post()
+        address = reverse('posts:profile', kwargs={'username': 'testauthor'})
+        self.get_response_get(self.client, address)
+        cache.clear()
+
+        with self.assertNumQueries(2):
+            self.get_response_get(self.client, address)
+
+    def test_kvstore_invalidated_on_image_change(self):
+        """Замена изображения и удаление поста удаляют миниатюры."""
+        post = self.__create_post()
+        old_thumbnails = self.__thumbnails(post)
+
+        # Другая палитра: одинаковые картинки хранятся одним файлом
+        post.image = SimpleUploadedFile(
+            name='other.gif',
+            content=SMALL_GIF.replace(b'\xFF\xFF\xFF', b'\x00\xFF\x00', 1),
+            content_type='image/gif',
+        )
+        post.save()
+        for thumbnail in old_thumbnails:
+            self.assertFalse(thumbnail.exists(), 'Миниатюра не удалена')
+            self.assertIsNone(default.kvstore.get(thumbnail))
+
+        new_thumbnails = self.__thumbnails(post)
+        post.delete()
+        for thumbnail in new_thumbnails:
+            self.assertFalse(thumbnail.exists(), 'Миниатюра не удалена')
+            self.assertIsNone(default.kvstore.get(thumbnail))
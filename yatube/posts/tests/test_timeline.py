@@ -0,0 +1,187 @@
+"""Тесты материализованной ленты подписок."""
+from importlib import import_module
+from io import StringIO
+
+from django.apps import apps
+from django.core.management import call_command
+
+from posts.models import Follow, Post, TimelineEntry, User
+from posts.tests.utils import YatubeTestBase
+from posts.timeline import rebuild_timeline
+
+
+class TestTimeline(YatubeTestBase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_user = User.objects.create(username='test_user')
+        cls.test_author = User.objects.create(username='test_author')
+        cls.other_author = User.objects.create(username='other_author')
+
+    def __timeline_posts(self):
+        return list(
+            TimelineEntry.objects.filter(
+                user=TestTimeline.test_user,
+            ).values_list('post_id', flat=True)
+        )
+
+    def test_timeline_new_post_fan_out(self):
+        """Новый пост автора попадает в ленту подписчика."""
+        Follow.objects.create(
+            user=TestTimeline.test_user,
+            author=TestTimeline.test_author,
+        )
+        post = Post.objects.create(
+            text='Test post',
+            author=TestTimeline.test_author,
+        )
+        Post.objects.create(
+            text='Other post',
+            author=TestTimeline.other_author,
+        )
+
+        self.assertEqual(
+            self.__timeline_posts(),
+            [post.id],
+            'Новый пост не попал в ленту подписчика',
+        )
+
+    def test_timeline_follow_adds_existing_posts(self):
+        """После подписки в ленте появляются ранее опубликованные посты."""
+        posts = [
+            Post.objects.create(
+                text=f'Test post #{i}',
+                author=TestTimeline.test_author,
+            )
+            for i in range(3)
+        ]
+
+        Follow.objects.create(
+            user=TestTimeline.test_user,
+            author=TestTimeline.test_author,
+        )
+
+        self.assertCountEqual(
+            self.__timeline_posts(),
+            [post.id for post in posts],
+            'После подписки лента не заполнена постами автора',
+        )
+
+    def test_timeline_unfollow_trims_entries(self):
+        """После отписки посты автора убираются из ленты."""
+        Follow.objects.create(
+            user=TestTimeline.test_user,
+            author=TestTimeline.test_author,
+        )
+        Follow.objects.create(
+            user=TestTimeline.test_user,
+            author=TestTimeline.other_author,
+        )
+        Post.objects.create(
+            text='Test post',
+            author=TestTimeline.test_author,
+        )
+        other_post = Post.objects.create(
+            text='Other post',
+            author=TestTimeline.other_author,
+        )
+
+        TestTimeline.test_user.follower.filter(
+            author=TestTimeline.test_author,
+        ).delete()
+
+        self.assertEqual(
+            self.__timeline_posts(),
+            [other_post.id],
+            'После отписки посты автора остались в ленте',
+        )
+
+    def test_timeline_rebuild_command(self):
+        """Команда rebuild_timeline восстанавливает ленты из подписок."""
+        Follow.objects.create(
+            user=TestTimeline.test_user,
+            author=TestTimeline.test_author,
+        )
+        Post.objects.bulk_create([
+            Post(text=f'Test post #{i}', author=TestTimeline.test_author)
+            for i in range(3)
+        ])
+        TimelineEntry.objects.all().delete()
+
+        call_command('rebuild_timeline', batch_size=1, stdout=StringIO())
+
+        self.assertCountEqual(
+            self.__timeline_posts(),
+            Post.objects.filter(
+                author=TestTimeline.test_author,
+            ).values_list('pk', flat=True),
+            'Команда rebuild_timeline не восстановила ленту',
+        )
+
+    def test_timeline_rebuild_in_place(self):
+        """rebuild_timeline исправляет ленты, не очищая их целиком."""
+        Follow.objects.create(
+            user=TestTimeline.test_user,
+            author=TestTimeline.test_author,
+        )
+        kept = Post.objects.create(
+            text='Test post',
+            author=TestTimeline.test_author,
+        )
+        stale = Post.objects.create(
+            text='Other post',
+            author=TestTimeline.other_author,
+        )
+        kept_entry = TimelineEntry.objects.get(post=kept)
+        TimelineEntry.objects.create(
+            user=TestTimeline.test_user,
+            post=stale,
+            pub_date=stale.pub_date,
+        )
+        TimelineEntry.objects.create(
+            user=TestTimeline.other_author,
+            post=kept,
+            pub_date=kept.pub_date,
+        )
+
+        self.assertEqual(
+            rebuild_timeline(),
+            1,
+            'rebuild_timeline должна вернуть число записей в лентах',
+        )
+        self.assertEqual(
+            self.__timeline_posts(),
+            [kept.id],
+            'Лишняя запись осталась в ленте',
+        )
+        self.assertTrue(
+            TimelineEntry.objects.filter(pk=kept_entry.pk).exists(),
+            'Верная запись ленты была пересоздана',
+        )
+        self.assertFalse(
+            TimelineEntry.objects.filter(
+                user=TestTimeline.other_author,
+            ).exists(),
+            'Осталась лента пользователя без подписок',
+        )
+
+    def test_timeline_backfill_migration(self):
+        """Миграция заполняет ленты по подпискам, сделанным раньше."""
+        Follow.objects.create(
+            user=TestTimeline.test_user,
+            author=TestTimeline.test_author,
+        )
+        post = Post.objects.create(
+            text='Test post',
+            author=TestTimeline.test_author,
+        )
+        TimelineEntry.objects.all().delete()
+        migration = import_module('posts.migrations.0019_backfill_timeline')
+
+        migration.backfill_timeline(apps, None)
+
+        self.assertEqual(
+            self.__timeline_posts(),
+            [post.id],
+            'Миграция не заполнила ленту подписчика',
+        )
@@ -0,0 +1,208 @@
+"""Тесты адаптивных вариантов картинок постов."""
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import skipUnless
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from PIL import Image, features
+
+from posts import variants
+from posts.cache import tiered_cache
+from posts.constants import IMAGE_VARIANT_FORMATS
+from posts.models import Post, User
+from posts.tests.utils import YatubeTestBase
+
+TMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TMP_MEDIA_ROOT)
+class TestImageVariants(YatubeTestBase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_author = User.objects.create_user(username='testauthor')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        tiered_cache.clear_local()
+
+    def __create_post(self, name='photo.jpg', size=(1200, 800)):
+        buffer = BytesIO()
+        Image.new('RGB', size, (200, 100, 50)).save(buffer, 'JPEG')
+        return Post.objects.create(
+            text='Test post',
+            author=TestImageVariants.test_author,
+            image=SimpleUploadedFile(
+                name=name,
+                content=buffer.getvalue(),
+                content_type='image/jpeg',
+            ),
+        )
+
+    def test_variants_build(self):
+        """Строятся варианты всех форматов не шире оригинала."""
+        post = self.__create_post()
+
+        built = variants.build_variants(post.image.name)
+
+        self.assertEqual(set(built), set(IMAGE_VARIANT_FORMATS))
+        for extension, names in built.items():
+            with self.subTest(extension=extension):
+                self.assertEqual(set(names), {480, 960})
+                with default_storage.open(names[960]) as image_file:
+                    image = Image.open(image_file)
+                    self.assertEqual(image.size, (960, 339))
+                    self.assertEqual(
+                        image.format,
+                        IMAGE_VARIANT_FORMATS[extension],
+                    )
+
+    @skipUnless(features.check('webp'), 'Pillow собран без WebP')
+    def test_variants_build_webp(self):
+        """WebP строится первым форматом, если его поддерживает Pillow."""
+        post = self.__create_post()
+
+        built = variants.build_variants(post.image.name)
+
+        self.assertEqual(list(built), ['webp', 'jpeg'])
+
+    def test_variants_small_image(self):
+        """Для маленькой картинки строится самый узкий вариант."""
+        post = self.__create_post(size=(100, 50))
+
+        built = variants.build_variants(post.image.name)
+
+        self.assertEqual(set(built['jpeg']), {480})
+
+    def test_variants_not_saved_for_replaced_image(self):
+        """Варианты не записываются, если картинку уже заменили."""
+        post = self.__create_post()
+        built = variants.build_variants(post.image.name)
+
+        saved = variants.save_variants(post.pk, 'posts/other.jpg', built)
+
+        self.assertFalse(saved)
+        post.refresh_from_db()
+        self.assertEqual(post.image_variants, '')
+        self.assertFalse(default_storage.exists(built['jpeg'][480]))
+
+    def test_variants_shared_image_kept(self):
+        """Варианты общей картинки не удаляются и не перезаписываются."""
+        post = self.__create_post()
+        other = self.__create_post(name='copy.jpg')
+        self.assertEqual(post.image.name, other.image.name)
+        built = variants.build_variants(post.image.name)
+        name = default_storage.path(built['jpeg'][480])
+        before = os.stat(name)
+
+        self.assertEqual(variants.build_variants(other.image.name), built)
+        self.assertEqual(os.stat(name).st_mtime_ns, before.st_mtime_ns)
+
+        self.assertEqual(
+            variants.build_variants(other.image.name, force=True),
+            built,
+        )
+        self.assertNotEqual(os.stat(name).st_ino, before.st_ino)
+        self.assertFalse(
+            [
+                file_name
+                for file_name in os.listdir(os.path.dirname(name))
+                if file_name.endswith('.tmp')
+            ],
+            'Остались временные файлы вариантов',
+        )
+
+        # Картинку второго поста заменили, пока строились варианты
+        Post.objects.filter(pk=other.pk).update(image='posts/other.jpg')
+        self.assertFalse(variants.save_variants(
+            other.pk,
+            post.image.name,
+            built,
+        ))
+        self.assertTrue(
+            default_storage.exists(built['jpeg'][480]),
+            'Удалены варианты картинки другого поста',
+        )
+
+    def test_variants_picture_markup(self):
+        """Пост с вариантами выводится тегом <picture> с srcset."""
+        post = self.__create_post()
+        variants.save_variants(
+            post.pk,
+            post.image.name,
+            variants.build_variants(post.image.name),
+        )
+
+        response = self.get_response_get(self.client, reverse('posts:index'))
+
+        self.assertContains(response, '<picture>')
+        self.assertContains(response, '_480w.jpeg 480w')
+        self.assertContains(response, '_960w.jpeg"')
+
+    @skipUnless(features.check('webp'), 'Pillow собран без WebP')
+    def test_variants_picture_markup_webp(self):
+        """WebP выводится в <source>, JPEG остаётся запасным для <img>."""
+        post = self.__create_post()
+        variants.save_variants(
+            post.pk,
+            post.image.name,
+            variants.build_variants(post.image.name),
+        )
+
+        response = self.get_response_get(self.client, reverse('posts:index'))
+
+        self.assertContains(response, '<source type="image/webp"')
+        self.assertContains(response, '_960w.webp 960w')
+        self.assertContains(response, '_960w.jpeg"')
+
+    def test_variants_command(self):
+        """Команда build_image_variants строит недостающие варианты."""
+        posts = [self.__create_post(f'photo_{i}.jpg') for i in range(2)]
+        Post.objects.create(
+            text='Post without image',
+            author=TestImageVariants.test_author,
+        )
+        out = StringIO()
+
+        call_command('build_image_variants', workers=1, stdout=out)
+
+        self.assertIn('Построены варианты картинок: 2', out.getvalue())
+        for post in posts:
+            post.refresh_from_db()
+            self.assertEqual(set(variants.load_variants(post)['jpeg']), {
+                480,
+                960,
+            })
+
+    def test_variants_deleted_with_image(self):
+        """Замена картинки удаляет старые варианты."""
+        post = self.__create_post()
+        built = variants.build_variants(post.image.name)
+        variants.save_variants(post.pk, post.image.name, built)
+        post.refresh_from_db()
+
+        post.image = SimpleUploadedFile(
+            name='other.gif',
+            content=b'GIF89a',
+            content_type='image/gif',
+        )
+        post.save()
+
+        post.refresh_from_db()
+        self.assertEqual(post.image_variants, '')
+        for names in built.values():
+            for name in names.values():
+                self.assertFalse(default_storage.exists(name))
@@ -2,12 +2,19 @@
 и отображения данных."""
 from django.core.cache import cache
 from django.core.paginator import Page
+from django.db import connection
 from django.test import Client
 from django.urls import reverse
 
-from posts.constants import MAX_POSTS_ON_PAGE
-from posts.models import Group, Post, User
+from posts.constants import (
+    MAX_POSTS_ON_PAGE,
+    PAGINATOR_ON_EACH_SIDE,
+    PAGINATOR_ON_ENDS,
+)
+from posts.models import Follow, Group, Post, User
+from posts.stats import count_posts, get_user_stats
 from posts.tests.utils import YatubeTestBase
+from posts.utils import WindowedPaginator, cached_count
 
 POSTS_ON_LAST_PAGE = 2
 
@@ -95,3 +102,212 @@ class TestPostsViewsPaginator(YatubeTestBase):
                     obj_count,
                     address,
                 )
+
+    def test_posts_views_cursor_paginator(self):
+        """Переход по курсорам ?after= и ?before= на странице группы."""
+        address = reverse(
+            'posts:group_list',
+            kwargs={'slug': TestPostsViewsPaginator.test_group.slug},
+        )
+        expected = list(
+            Post.objects.filter(
+                group=TestPostsViewsPaginator.test_group,
+            ).order_by('-pub_date', '-pk')
+        )
+
+        first_page = self.get_field_from_context_by_type(
+            self.get_response_get(self.auth_client_author, address).context,
+            Page,
+        )
+        self.assertEqual(
+            list(first_page),
+            expected[:MAX_POSTS_ON_PAGE],
+            f'Первая страница `{address}` сформирована неверно',
+        )
+        self.assertFalse(first_page.has_previous())
+        self.assertTrue(first_page.has_next())
+
+        next_address = (
+            f'{address}?after={first_page.paginator.next_cursor}'
+        )
+        last_page = self.get_field_from_context_by_type(
+            self.get_response_get(
+                self.auth_client_author,
+                next_address,
+            ).context,
+            Page,
+        )
+        self.assertEqual(
+            list(last_page),
+            expected[MAX_POSTS_ON_PAGE:],
+            f'Страница `{next_address}` сформирована неверно',
+        )
+        self.assertTrue(last_page.has_previous())
+        self.assertFalse(last_page.has_next())
+
+        previous_address = (
+            f'{address}?before={last_page.paginator.previous_cursor}'
+        )
+        previous_page = self.get_field_from_context_by_type(
+            self.get_response_get(
+                self.auth_client_author,
+                previous_address,
+            ).context,
+            Page,
+        )
+        self.assertEqual(
+            list(previous_page),
+            expected[:MAX_POSTS_ON_PAGE],
+            f'Страница `{previous_address}` сформирована неверно',
+        )
+        self.assertFalse(previous_page.has_previous())
+
+    def test_posts_views_cursor_paginator_bad_token(self):
+        """Неверный курсор приводит к первой странице."""
+        address = reverse('posts:index') + '?after=not-a-cursor'
+        response = self.get_response_get(self.auth_client_author, address)
+
+        self.__check_paginator_context(
+            response.context,
+            MAX_POSTS_ON_PAGE,
+            address,
+        )
+
+    def test_posts_views_paginator_window(self):
+        """Навигация выводит окно номеров вокруг текущей страницы."""
+        paginator = WindowedPaginator(range(1000), 5)
+        ellipsis = paginator.ELLIPSIS
+        cases = {
+            1: [1, 2, 3, ellipsis, 200],
+            100: [1, ellipsis, 98, 99, 100, 101, 102, ellipsis, 200],
+            200: [1, ellipsis, 198, 199, 200],
+        }
+        for number, expected in cases.items():
+            with self.subTest(number=number):
+                self.assertEqual(
+                    paginator.page(number).page_links,
+                    expected,
+                )
+        self.assertEqual(
+            WindowedPaginator(range(20), 5).page(2).page_links,
+            [1, 2, 3, 4],
+        )
+
+    def test_posts_views_paginator_window_render(self):
+        """Размер навигации не зависит от количества страниц."""
+        pages = (PAGINATOR_ON_EACH_SIDE + PAGINATOR_ON_ENDS) * 2 + 10
+        Post.objects.bulk_create([
+            Post(text=f'Post #{i}', author=TestPostsViewsPaginator.test_author)
+            for i in range(pages * MAX_POSTS_ON_PAGE)
+        ])
+        num_pages = Post.objects.count() // MAX_POSTS_ON_PAGE + 1
+        current = num_pages // 2
+
+        response = self.get_response_get(
+            self.auth_client_author,
+            f'{reverse("posts:index")}?page={current}',
+        )
+
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.paginator.num_pages, num_pages)
+        window = PAGINATOR_ON_EACH_SIDE * 2 + 1 + PAGINATOR_ON_ENDS * 2
+        self.assertEqual(
+            len(page_obj.page_links),
+            window + 2,
+        )
+        for number in (1, current - 1, current + 1, num_pages):
+            self.assertContains(response, f'page={number}"')
+        self.assertNotContains(response, f'page={current - 5}"')
+        self.assertContains(response, page_obj.paginator.ELLIPSIS, count=4)
+
+    def test_posts_views_paginator_known_count(self):
+        """Известное количество объектов не пересчитывается через COUNT."""
+        paginator = WindowedPaginator(
+            Post.objects.order_by('-pk'),
+            MAX_POSTS_ON_PAGE,
+            count=100,
+        )
+
+        with self.assertNumQueries(0):
+            self.assertEqual(paginator.num_pages, 100 // MAX_POSTS_ON_PAGE)
+
+    def test_posts_views_paginator_counters(self):
+        """Страницы ?page=N ленты, группы и профиля берут количество
+        постов из счётчиков."""
+        count_posts()
+        count_posts(TestPostsViewsPaginator.test_group)
+        get_user_stats(TestPostsViewsPaginator.test_author)
+        test_addresses = [
+            reverse('posts:index'),
+            reverse(
+                'posts:group_list',
+                kwargs={'slug': TestPostsViewsPaginator.test_group.slug},
+            ),
+            reverse(
+                'posts:profile',
+                kwargs={
+                    'username': TestPostsViewsPaginator.test_author.username,
+                },
+            ),
+        ]
+
+        for address in test_addresses:
+            with self.subTest(address=address):
+                queries = []
+
+                def capture(execute, sql, params, many, context):
+                    queries.append(sql)
+                    return execute(sql, params, many, context)
+
+                with connection.execute_wrapper(capture):
+                    response = self.get_response_get(
+                        self.auth_client_author,
+                        address + '?page=2',
+                    )
+
+                page_obj = response.context['page_obj']
+                self.assertEqual(
+                    page_obj.paginator.count,
+                    MAX_POSTS_ON_PAGE + POSTS_ON_LAST_PAGE,
+                )
+                self.assertTrue(page_obj.paginator.count_is_exact)
+                self.assertFalse(
+                    [sql for sql in queries if 'COUNT(' in sql],
+                    f'Страница `{address}` выполняет COUNT',
+                )
+
+    def test_posts_views_paginator_cached_count(self):
+        """Выборки без счётчиков считаются через кэш, а устаревшее
+        количество помечается как приблизительное."""
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(
+            user=reader,
+            author=TestPostsViewsPaginator.test_author,
+        )
+        client = Client()
+        client.force_login(reader)
+        address = reverse('posts:follow_index') + '?page=1'
+        total = MAX_POSTS_ON_PAGE + POSTS_ON_LAST_PAGE
+
+        response = self.get_response_get(client, address)
+        paginator = response.context['page_obj'].paginator
+        self.assertEqual(paginator.count, total)
+        self.assertTrue(paginator.count_is_exact)
+        self.assertNotContains(response, '≈')
+
+        with self.run_on_commit():
+            Post.objects.create(
+                text='Новый пост',
+                author=TestPostsViewsPaginator.test_author,
+            )
+        response = self.get_response_get(client, address)
+        paginator = response.context['page_obj'].paginator
+        self.assertEqual(paginator.count, total)
+        self.assertFalse(paginator.count_is_exact)
+        self.assertContains(response, f'≈{paginator.num_pages}<')
+
+        cache.clear()
+        self.assertEqual(
+            cached_count(Post.objects.filter(timeline_entries__user=reader)),
+            (total + 1, True),
+        )
@@ -1,8 +1,29 @@
-from django.test import TestCase
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test import TestCase, override_settings
 from django.template.context import RequestContext
 
 
+# Фоновые потоки миниатюр писали бы в БД, которую тест в это время очищает
+@override_settings(POSTS_EAGER_THUMBNAILS=False)
 class YatubeTestBase(TestCase):
+    @contextmanager
+    def run_on_commit(self):
+        """Выполняет колбэки transaction.on_commit, отложенные в блоке.
+
+        TestCase не фиксирует транзакцию, поэтому без этого сброс кэша
+        после изменений в тестах не происходит.
+        """
+        start = len(connection.run_on_commit)
+        try:
+            yield
+        finally:
+            callbacks = connection.run_on_commit[start:]
+            del connection.run_on_commit[start:]
+            for _, callback in callbacks:
+                callback()
+
     def get_field_from_context_by_type(self, context, field_type):
         if isinstance(context, RequestContext):
             context = context.flatten()
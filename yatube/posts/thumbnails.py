@@ -0,0 +1,167 @@
+"""Построение миниатюр изображений постов вне потока запроса.
+
+Шаблоны вызывают {% cached_thumbnail %} с размерами из
+THUMBNAIL_GEOMETRIES. Тег только ищет миниатюру в хранилище ключей
+sorl-thumbnail и никогда не декодирует изображение во время запроса:
+при промахе построение ставится в очередь, а шаблон выводит исходную
+картинку. Там же строятся адаптивные варианты картинки
+(см. posts.variants).
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from sorl.thumbnail import default, delete, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+
+from posts import variants
+from posts.cache import bump_generation
+from posts.constants import THUMBNAIL_GEOMETRIES, THUMBNAIL_WORKERS
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+# Изображения, миниатюры которых уже строятся: страницы со старыми
+# картинками не должны ставить одну задачу на каждый запрос
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def generate_thumbnails(image_name):
+    """Строит все миниатюры изображения и возвращает их количество."""
+    for geometry, options in THUMBNAIL_GEOMETRIES.items():
+        get_thumbnail(image_name, geometry, **options)
+    return len(THUMBNAIL_GEOMETRIES)
+
+
+def thumbnail_name(image_name, geometry, options):
+    """Возвращает имя файла миниатюры, не обращаясь к хранилищам.
+
+    Повторяет расчёт имени из sorl.thumbnail.base.ThumbnailBackend.
+    """
+    backend = default.backend
+    source = ImageFile(image_name)
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return backend._get_thumbnail_filename(source, geometry, options)
+
+
+def lookup_thumbnail(image_name, geometry):
+    """Возвращает построенную миниатюру или None, не строя её.
+
+    В отличие от get_thumbnail обращается только к хранилищу ключей.
+    """
+    thumbnail = ImageFile(
+        thumbnail_name(image_name, geometry, THUMBNAIL_GEOMETRIES[geometry]),
+        default.storage,
+    )
+    return default.kvstore.get(thumbnail)
+
+
+def prefetch_thumbnails(posts):
+    """Загружает ключи всех миниатюр постов одним обращением к кэшу.
+
+    Работает, только если в THUMBNAIL_KVSTORE подключено хранилище
+    posts.kvstore.KVStore.
+    """
+    kvstore = default.kvstore
+    if not hasattr(kvstore, 'prefetch'):
+        return
+    keys = [
+        add_prefix(
+            ImageFile(
+                thumbnail_name(post.image.name, geometry, options),
+                default.storage,
+            ).key,
+        )
+        for post in posts
+        # Посты с адаптивными вариантами выводятся без sorl-thumbnail
+        if post.image and not post.image_variants
+        for geometry, options in THUMBNAIL_GEOMETRIES.items()
+    ]
+    if keys:
+        kvstore.prefetch(keys)
+
+
+def delete_thumbnails(image_name):
+    """Удаляет миниатюры изображения и их ключи в sorl-thumbnail."""
+    delete(image_name, delete_file=False)
+
+
+def regenerate_thumbnails(image_name, force=False):
+    """Заново строит миниатюры изображения.
+
+    Возвращает текст ошибки или None, чтобы сбой одного изображения
+    не прерывал пакетную обработку в пуле процессов.
+    """
+    try:
+        if force:
+            delete_thumbnails(image_name)
+        generate_thumbnails(image_name)
+    except Exception as error:
+        return f'{image_name}: {error}'
+    return None
+
+
+def _generate_in_background(post_id, image_name):
+    try:
+        generate_thumbnails(image_name)
+        if variants.save_variants(
+            post_id,
+            image_name,
+            variants.build_variants(image_name),
+        ):
+            # Закэшированные страницы должны получить разметку <picture>
+            bump_generation()
+    except Exception:
+        logger.exception('Не удалось построить миниатюры %s', image_name)
+    finally:
+        with _pending_lock:
+            _pending.discard(image_name)
+        # Поток пула живёт долго: не держим открытым соединение с БД
+        connection.close()
+
+
+def _submit(post_id, image_name):
+    with _pending_lock:
+        if image_name in _pending:
+            return
+        _pending.add(image_name)
+    _get_executor().submit(_generate_in_background, post_id, image_name)
+
+
+def schedule_thumbnails(post):
+    """Ставит построение миниатюр и вариантов картинки поста в очередь
+    пула потоков.
+
+    Задача отправляется после фиксации транзакции, чтобы поток увидел
+    сохранённый файл и не строил миниатюры для отменённых изменений.
+    При POSTS_EAGER_THUMBNAILS = False задачи не ставятся: миниатюры
+    строит команда regenerate_thumbnails.
+    """
+    if not post.image or not settings.POSTS_EAGER_THUMBNAILS:
+        return
+    post_id, image_name = post.pk, post.image.name
+    transaction.on_commit(lambda: _submit(post_id, image_name))
@@ -1,8 +1,270 @@
-from django.core.paginator import Paginator
+import hashlib
+from collections import namedtuple
 
-from posts.constants import MAX_POSTS_ON_PAGE
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import SimpleLazyObject, cached_property
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
 
+from posts.cache import get_generation
+from posts.constants import (
+    MAX_POSTS_ON_PAGE,
+    PAGINATOR_COUNT_TIMEOUT,
+    PAGINATOR_ON_EACH_SIDE,
+    PAGINATOR_ON_ENDS,
+)
 
-def build_page_from_posts(request, posts):
-    page_number = request.GET.get('page', 1)
-    return Paginator(posts, MAX_POSTS_ON_PAGE).get_page(page_number)
+CURSOR_SEPARATOR = '|'
+# Поля ключа курсора: дата публикации и первичный ключ для разрешения
+# совпадений. Порядок совпадает с индексами моделей Post и TimelineEntry.
+CURSOR_KEYS = ('pub_date', 'pk')
+COUNT_KEY_PREFIX = 'posts:count:'
+
+# Количество объектов для постраничного вывода. exact=False означает,
+# что значение могло устареть
+PaginatorCount = namedtuple('PaginatorCount', 'value exact')
+
+
+def encode_cursor(post, keys=CURSOR_KEYS):
+    """Упаковывает ключ (pub_date, id) поста в непрозрачный токен."""
+    date_key, pk_key = keys
+    raw = (
+        f'{getattr(post, date_key).isoformat()}'
+        f'{CURSOR_SEPARATOR}{getattr(post, pk_key)}'
+    )
+    return urlsafe_base64_encode(raw.encode())
+
+
+def decode_cursor(token):
+    """Распаковывает токен курсора. Для неверного токена возвращает None."""
+    if not token:
+        return None
+    try:
+        raw = urlsafe_base64_decode(token).decode()
+        pub_date, pk = raw.rsplit(CURSOR_SEPARATOR, 1)
+        pub_date, pk = parse_datetime(pub_date), int(pk)
+    except (ValueError, TypeError, UnicodeDecodeError):
+        return None
+    if pub_date is None:
+        return None
+    return pub_date, pk
+
+
+class WindowedPage(Page):
+    """Страница, которая показывает ссылки только на соседние страницы."""
+
+    @cached_property
+    def page_links(self):
+        """Номера страниц для навигации вместе с многоточиями.
+
+        Считаются один раз: шаблон навигации выводится над списком
+        постов и под ним.
+        """
+        return list(self.paginator.get_elided_page_range(
+            self.number,
+            on_each_side=PAGINATOR_ON_EACH_SIDE,
+            on_ends=PAGINATOR_ON_ENDS,
+        ))
+
+
+class WindowedPaginator(Paginator):
+    """Paginator с сокращённым списком номеров страниц.
+
+    Вместо всех номеров страниц (page_range) навигация выводит первые и
+    последние on_ends номеров и on_each_side номеров по бокам от
+    текущей, поэтому её размер не зависит от количества страниц.
+    get_elided_page_range перенесён из Django 3.2.
+
+    Если количество объектов уже известно, его можно передать в count,
+    чтобы не выполнять COUNT. count_is_exact=False сообщает шаблону, что
+    переданное количество приблизительное.
+    """
+
+    ELLIPSIS = '…'
+
+    def __init__(
+        self,
+        object_list,
+        per_page,
+        count=None,
+        count_is_exact=True,
+        **kwargs,
+    ):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_is_exact = count is None or count_is_exact
+        if count is not None:
+            self.__dict__['count'] = count
+
+    def _get_page(self, *args, **kwargs):
+        return WindowedPage(*args, **kwargs)
+
+    def get_elided_page_range(self, number=1, *, on_each_side=3, on_ends=2):
+        """Возвращает номера страниц, пропуская дальние многоточием."""
+        number = self.validate_number(number)
+        if self.num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.page_range
+            return
+
+        if number > (1 + on_each_side + on_ends) + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+
+        if number < (self.num_pages - on_each_side - on_ends) - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(self.num_pages - on_ends + 1, self.num_pages + 1)
+        else:
+            yield from range(number + 1, self.num_pages + 1)
+
+
+class CursorPaginator(Paginator):
+    """Постраничный вывод по ключу (pub_date, id) без COUNT и OFFSET.
+
+    Номер страницы и количество страниц условные: курсорная страница
+    знает только, есть ли записи до и после неё. Этого достаточно для
+    has_previous/has_next у обычного объекта Page.
+
+    Поля ключа задаются параметром keys, например, аннотации с датой и
+    идентификатором записи ленты, чтобы сортировка шла по её индексу.
+    """
+
+    is_cursor = True
+
+    def __init__(
+        self,
+        object_list,
+        per_page,
+        after=None,
+        before=None,
+        keys=CURSOR_KEYS,
+    ):
+        super().__init__(object_list, per_page)
+        self.after = after
+        self.before = before
+        self.keys = keys
+
+    @property
+    def num_pages(self):
+        _, number, has_next = self.page_state
+        return number + 1 if has_next else number
+
+    @property
+    def previous_cursor(self):
+        items, number, _ = self.page_state
+        return encode_cursor(items[0], self.keys) if number > 1 else None
+
+    @property
+    def next_cursor(self):
+        items, _, has_next = self.page_state
+        return encode_cursor(items[-1], self.keys) if has_next else None
+
+    def _seek(self, queryset, cursor, lookup):
+        date_key, pk_key = self.keys
+        pub_date, pk = cursor
+        return queryset.filter(
+            Q(**{f'{date_key}__{lookup}': pub_date})
+            | Q(**{date_key: pub_date, f'{pk_key}__{lookup}': pk})
+        )
+
+    def _fetch(self):
+        date_key, pk_key = self.keys
+        queryset = self.object_list
+        if self.before is not None:
+            queryset = self._seek(queryset, self.before, 'gt').order_by(
+                date_key,
+                pk_key,
+            )
+        else:
+            if self.after is not None:
+                queryset = self._seek(queryset, self.after, 'lt')
+            queryset = queryset.order_by(f'-{date_key}', f'-{pk_key}')
+
+        items = list(queryset[:self.per_page + 1])
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page]
+
+        if self.before is not None:
+            items.reverse()
+            return items, has_more, True
+        return items, self.after is not None, has_more
+
+    @cached_property
+    def page_state(self):
+        """Посты страницы, её номер и наличие следующей страницы."""
+        items, has_previous, has_next = self._fetch()
+        if not items and (self.after or self.before):
+            # Курсор указывает за пределы выборки: показываем первую страницу
+            self.after = self.before = None
+            items, has_previous, has_next = self._fetch()
+        return items, 2 if has_previous else 1, has_next
+
+    def cursor_page(self):
+        """Возвращает страницу, на которую указывает курсор.
+
+        Посты и номер страницы ленивые: запрос выполняется, только когда
+        шаблон обращается к постам, has_next или курсорам. Если список
+        взят из кэша фрагментов (post_list_cache), БД не запрашивается.
+        """
+        return Page(
+            SimpleLazyObject(lambda: self.page_state[0]),
+            SimpleLazyObject(lambda: self.page_state[1]),
+            self,
+        )
+
+
+def cached_count(queryset):
+    """Возвращает количество объектов выборки из кэша.
+
+    COUNT выполняется не чаще раза в PAGINATOR_COUNT_TIMEOUT секунд для
+    одного запроса. Значение точное, только если после подсчёта контент
+    не менялся (поколение кэша то же).
+    """
+    key = COUNT_KEY_PREFIX + hashlib.md5(
+        str(queryset.query).encode(),
+    ).hexdigest()
+    generation = get_generation()
+    entry = cache.get(key)
+    if entry is None:
+        entry = {'generation': generation, 'value': queryset.count()}
+        cache.set(key, entry, PAGINATOR_COUNT_TIMEOUT)
+    return PaginatorCount(
+        entry['value'],
+        exact=entry['generation'] == generation,
+    )
+
+
+def build_page_from_posts(request, posts, keys=CURSOR_KEYS, count=None):
+    """Возвращает страницу постов для вывода в шаблоне.
+
+    По умолчанию страницы строятся по курсору из параметров ?after= и
+    ?before=. Устаревший параметр ?page=N обслуживается обычным Paginator,
+    чтобы не ломать сохранённые ссылки.
+
+    Количество постов для ?page=N возвращает count() в виде
+    PaginatorCount, например, по поддерживаемым счётчикам (см.
+    posts.stats). Без count используется cached_count.
+    """
+    if 'page' in request.GET:
+        date_key, pk_key = keys
+        page_number = request.GET.get('page', 1)
+        posts = posts.order_by(f'-{date_key}', f'-{pk_key}')
+        total = count() if count is not None else cached_count(posts)
+        return WindowedPaginator(
+            posts,
+            MAX_POSTS_ON_PAGE,
+            count=total.value,
+            count_is_exact=total.exact,
+        ).get_page(page_number)
+
+    return CursorPaginator(
+        posts,
+        MAX_POSTS_ON_PAGE,
+        after=decode_cursor(request.GET.get('after')),
+        before=decode_cursor(request.GET.get('before')),
+        keys=keys,
+    ).cursor_page()
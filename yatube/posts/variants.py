@@ -0,0 +1,141 @@
+"""Адаптивные варианты картинок постов для <picture> и srcset.
+
+Для каждой картинки строятся варианты нескольких ширин в форматах
+из IMAGE_VARIANT_FORMATS. Файлы лежат рядом с оригиналом, а их имена
+хранятся в Post.image_variants в виде JSON::
+
+    {"webp": {"480": "posts/cat_480w.webp", ...}, "jpeg": {...}}
+"""
+import json
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from posts.constants import (
+    IMAGE_VARIANT_ASPECT,
+    IMAGE_VARIANT_FORMATS,
+    IMAGE_VARIANT_QUALITY,
+    IMAGE_VARIANT_WIDTHS,
+)
+from posts.models import Post
+
+
+def variant_name(image_name, width, extension):
+    """Возвращает имя файла варианта рядом с оригиналом."""
+    stem = os.path.splitext(image_name)[0]
+    return f'{stem}_{width}w.{extension}'
+
+
+def load_variants(post):
+    """Возвращает варианты картинки поста: {формат: {ширина: имя}}."""
+    if not post.image_variants:
+        return {}
+    return {
+        extension: {int(width): name for width, name in names.items()}
+        for extension, names in json.loads(post.image_variants).items()
+    }
+
+
+def _variant_widths(source_width):
+    # Не увеличиваем картинку: варианты шире оригинала не нужны.
+    # Самый узкий вариант строится всегда.
+    widths = [width for width in IMAGE_VARIANT_WIDTHS if width <= source_width]
+    return widths or [min(IMAGE_VARIANT_WIDTHS)]
+
+
+def _save_variant(name, image, image_format):
+    """Записывает файл варианта под именем name.
+
+    Картинки с одинаковым содержимым хранятся одним файлом, поэтому их
+    варианты общие для нескольких постов. Файл не удаляется перед
+    записью, а заменяется переименованием временного, чтобы другой пост
+    ни на миг не остался без варианта.
+    """
+    buffer = BytesIO()
+    image.save(
+        buffer,
+        image_format,
+        quality=IMAGE_VARIANT_QUALITY,
+        optimize=True,
+    )
+    temp_name = default_storage.save(
+        f'{name}.tmp',
+        ContentFile(buffer.getvalue()),
+    )
+    os.replace(default_storage.path(temp_name), default_storage.path(name))
+    return name
+
+
+def build_variants(image_name, force=False):
+    """Строит варианты картинки и возвращает их имена.
+
+    Уже существующие варианты используются как есть, а с force=True
+    строятся заново.
+    """
+    with default_storage.open(image_name) as image_file:
+        image = Image.open(image_file)
+        image = ImageOps.exif_transpose(image).convert('RGB')
+
+    aspect_width, aspect_height = IMAGE_VARIANT_ASPECT
+    variants = {extension: {} for extension in IMAGE_VARIANT_FORMATS}
+    for width in _variant_widths(image.width):
+        names = {
+            extension: variant_name(image_name, width, extension)
+            for extension in IMAGE_VARIANT_FORMATS
+        }
+        missing = [
+            extension
+            for extension, name in names.items()
+            if force or not default_storage.exists(name)
+        ]
+        if missing:
+            size = (width, round(width * aspect_height / aspect_width))
+            resized = ImageOps.fit(image, size, Image.LANCZOS)
+        for extension in missing:
+            _save_variant(
+                names[extension],
+                resized,
+                IMAGE_VARIANT_FORMATS[extension],
+            )
+        for extension, name in names.items():
+            variants[extension][width] = name
+    return variants
+
+
+def delete_variants(variants):
+    """Удаляет файлы вариантов."""
+    for names in variants.values():
+        for name in names.values():
+            default_storage.delete(name)
+
+
+def save_variants(post_id, image_name, variants):
+    """Записывает варианты посту, если его картинка не сменилась.
+
+    Сохраняет через update(), чтобы не вызывать сигналы модели.
+    Возвращает False, если картинку успели заменить. Файлы вариантов
+    тогда удаляются, только если картинка больше не нужна другим постам.
+    """
+    updated = Post.objects.filter(pk=post_id, image=image_name).update(
+        image_variants=json.dumps(variants),
+    )
+    if not updated and not Post.objects.filter(image=image_name).exists():
+        delete_variants(variants)
+    return bool(updated)
+
+
+def build_post_variants(post_id, image_name, force=False):
+    """Строит варианты картинки поста в пуле процессов.
+
+    Возвращает (post_id, image_name, variants, ошибка). Запись в БД
+    остаётся основному процессу, чтобы процессы пула не соперничали
+    за блокировку SQLite.
+    """
+    try:
+        variants = build_variants(image_name, force)
+    except Exception as error:
+        return post_id, image_name, None, f'{image_name}: {error}'
+    return post_id, image_name, variants, None
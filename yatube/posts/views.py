@@ -1,74 +1,131 @@
 """В модуле определяются функции для отображения страниц."""
+from functools import partial
 
 from django.contrib.auth.decorators import login_required
 from django.core.handlers.wsgi import WSGIRequest
-from django.http import HttpResponse
+from django.db.models import F
+from django.http import (
+    HttpResponse,
+    HttpResponseBadRequest,
+    StreamingHttpResponse,
+)
 from django.shortcuts import (
     get_object_or_404,
     redirect,
     render
 )
-from django.views.decorators.cache import cache_page
+from django.utils.http import urlencode
 
+from posts.cache import (
+    cache_page_by_generation,
+    etag_by_generation,
+    get_group_or_404,
+)
+from posts.constants import CACHE_TIMEOUT
+from posts.exporter import EXPORT_FORMATS, export_records, render_records
 from posts.forms import CommentForm, PostForm
-from posts.models import Follow, Group, Post, User
+from posts.models import Follow, Post, User
+from posts.search import build_search_page
+from posts.stats import count_author_posts, count_posts, get_user_stats
+from posts.thumbnails import schedule_thumbnails
 from posts.utils import build_page_from_posts
 
 
-@cache_page(20)
+@etag_by_generation
+@cache_page_by_generation(CACHE_TIMEOUT)
 def index(request: WSGIRequest) -> HttpResponse:
     """Обрабатываем обращения к главной странице сайта."""
     context = {
         'page_obj': build_page_from_posts(
             request,
-            Post.objects.select_related('author'),
+            Post.objects.select_related('author', 'group'),
+            count=count_posts,
         ),
     }
 
     return render(request, 'posts/index.html', context)
 
 
+@etag_by_generation
+@cache_page_by_generation(CACHE_TIMEOUT)
 def group_list(request: WSGIRequest, slug: str) -> HttpResponse:
     """Выводим посты группы с адресом slug."""
-    group = get_object_or_404(Group, slug=slug)
+    group = get_group_or_404(slug)
     context = {
         'group': group,
         'page_obj': build_page_from_posts(
             request,
-            group.posts.all(),
+            group.posts.select_related('author'),
+            count=partial(count_posts, group),
         ),
     }
 
     return render(request, 'posts/group_list.html', context)
 
 
+@etag_by_generation
 def profile(request: WSGIRequest, username: str):
     """Выводим все посты пользователя username."""
-    user = get_object_or_404(User, username=username)
+    user = get_object_or_404(
+        User.objects.select_related('stats'),
+        username=username,
+    )
     is_follow = request.user.is_authenticated and request.user.follower.filter(
         author=user
     ).exists()
 
     context = {
         'author': user,
-        'page_obj': build_page_from_posts(request, user.posts.all()),
+        'stats': get_user_stats(user),
+        'page_obj': build_page_from_posts(
+            request,
+            user.posts.select_related('group'),
+            count=partial(count_author_posts, user),
+        ),
         'is_following': is_follow,
     }
 
     return render(request, 'posts/profile.html', context)
 
 
+@etag_by_generation
 def post_detail(request: WSGIRequest, post_id: int):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'),
+        id=post_id,
+    )
 
     context = {
         'post': post,
-        'comments': post.comments.all(),
+        'stats': get_user_stats(post.author),
+        'comments': post.comments.select_related('author'),
         'form': CommentForm(),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@etag_by_generation
+def search(request: WSGIRequest) -> HttpResponse:
+    """Выводим посты, найденные по тексту поста и комментариев.
+
+    Страницы результатов не кэшируются: запросов бесконечно много, а
+    поиск по индексу и так быстрый. Повторный запрос той же страницы
+    обслуживается условным GET.
+    """
+    query = request.GET.get('q', '').strip()
+    context = {
+        'query': query,
+        'page_query': f'{urlencode({"q": query})}&' if query else '',
+        'page_obj': build_search_page(
+            Post.objects.select_related('author', 'group'),
+            query,
+            request.GET.get('page'),
+        ),
+    }
+
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request: WSGIRequest):
     form = PostForm(
@@ -80,6 +137,7 @@ def post_create(request: WSGIRequest):
         new_post = form.save(commit=False)
         new_post.author = request.user
         new_post.save()
+        schedule_thumbnails(new_post)
 
         return redirect(
             'posts:profile',
@@ -103,6 +161,8 @@ def post_edit(request: WSGIRequest, post_id: int):
     )
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            schedule_thumbnails(post)
 
         return redirect(
             'posts:post_detail',
@@ -132,10 +192,18 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
+    # Сортируем по полям записи ленты, чтобы выборка шла по её индексу
+    posts = Post.objects.filter(
+        timeline_entries__user=request.user,
+    ).select_related('author', 'group').annotate(
+        timeline_date=F('timeline_entries__pub_date'),
+        timeline_post=F('timeline_entries__post'),
+    )
     context = {
         'page_obj': build_page_from_posts(
             request,
-            Post.objects.filter(author__following__user=request.user),
+            posts,
+            keys=('timeline_date', 'timeline_post'),
         ),
     }
 
@@ -159,3 +227,34 @@ def profile_follow(request, username):
 def profile_unfollow(request, username):
     request.user.follower.filter(author__username=username).delete()
     return redirect('posts:profile', username=username)
+
+
+@login_required
+def export(request):
+    """Отдаём файл с постами, комментариями или подписками пользователя.
+
+    Ответ строится потоком по мере чтения из БД, поэтому выгрузка
+    любого размера не держится в памяти целиком. К постам в JSONL
+    прикладываются ветки комментариев.
+    """
+    model = request.GET.get('model', 'post')
+    file_format = request.GET.get('format', 'jsonl')
+    if model not in ('post', 'comment', 'follow') or (
+        file_format not in EXPORT_FORMATS
+    ):
+        return HttpResponseBadRequest('Неизвестный тип или формат выгрузки')
+
+    records = export_records(
+        model,
+        user=request.user,
+        with_comments=model == 'post' and file_format == 'jsonl',
+    )
+    response = StreamingHttpResponse(
+        render_records(model, file_format, records),
+        content_type=EXPORT_FORMATS[file_format],
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{request.user.get_username()}-'
+        f'{model}s.{file_format}"'
+    )
+    return response
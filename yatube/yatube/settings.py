@@ -34,6 +34,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Первым, чтобы метрики учитывали время всех остальных слоёв
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -114,8 +116,19 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_error'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Кэш в файле SQLite общий для всех воркеров на сервере
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache_backends.sqlite.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
     }
 }
+
+# Миниатюры новых изображений строятся заранее в пуле потоков
+POSTS_EAGER_THUMBNAILS = True
+
+# Ключи миниатюр кэшируются в памяти процесса перед общим кэшем и БД
+THUMBNAIL_KVSTORE = 'posts.kvstore.KVStore'
@@ -0,0 +1,10 @@
+"""Настройки Django для запуска тестов."""
+
+from yatube.settings import *  # noqa: F401,F403
+
+# Тесты создают чистую БД, поэтому кэш не должен переживать их запуск
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}